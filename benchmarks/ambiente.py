@@ -0,0 +1,24 @@
+import os
+import tempfile
+from pathlib import Path
+
+# Variáveis de ambiente comuns aos benchmarks; precisam ser definidas antes de importar
+# main/db, que leem a configuração na importação. O que já estiver definido é mantido.
+
+
+def banco_temporario(nome: str) -> None:
+    # SQLite descartável, a não ser que DATABASE_URL aponte para outro banco
+    if not os.getenv("DATABASE_URL"):
+        banco = Path(tempfile.mkdtemp()) / nome
+        os.environ["DATABASE_URL"] = f"sqlite:///{banco}?timeout=30"
+
+
+def ambiente_stub(base_url: str, nome_banco: str) -> None:
+    # API e importador apontados para o stub local
+    os.environ["POKEAPI_BASE_URL"] = base_url
+    # o rate limit de produção não faz sentido contra o stub local
+    os.environ.setdefault("POKEAPI_TAXA", "100000")
+    os.environ.setdefault("POKEAPI_RAJADA", "1000")
+    # cada execução mede a PokeAPI (stub), não o cache HTTP em disco
+    os.environ.setdefault("POKEAPI_CACHE_HTTP", "")
+    banco_temporario(nome_banco)
@@ -0,0 +1,106 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from ambiente import banco_temporario
+
+# Latência de /pokemon/search no índice em memória com uma dex do tamanho da real,
+# conferindo os resultados contra a mesma busca feita em SQL. Falha se o p99 passar do limite.
+
+LIMITE_P99_MS = 1.0
+
+
+def popular(total: int) -> None:
+    from db.database import SessionLocal
+    from db.ingestao import gravar_lote_pokemons
+    from stub_pokeapi import gerar_pokemon
+
+    db = SessionLocal()
+    try:
+        for inicio in range(1, total + 1, 500):
+            gravar_lote_pokemons(db, [gerar_pokemon("http://stub", i) for i in range(inicio, min(total, inicio + 499) + 1)])
+        db.commit()
+    finally:
+        db.close()
+
+
+def buscar_no_banco(db, tipos, movimentos, peso_max) -> list[int]:
+    # mesma busca em SQL, usando os índices (id_tipo, id_pokemon) e (id_movimento, id_pokemon)
+    from sqlalchemy import select
+
+    from models import Movimento, Pokemon, PokemonMovimento, PokemonTipo, Tipo
+
+    consulta = select(Pokemon.id).order_by(Pokemon.id)
+    for nome in tipos:
+        consulta = consulta.where(Pokemon.id.in_(
+            select(PokemonTipo.id_pokemon).join(Tipo, Tipo.id == PokemonTipo.id_tipo).where(Tipo.nome == nome)))
+    for nome in movimentos:
+        consulta = consulta.where(Pokemon.id.in_(
+            select(PokemonMovimento.id_pokemon).join(Movimento, Movimento.id == PokemonMovimento.id_movimento)
+            .where(Movimento.nome == nome)))
+    if peso_max is not None:
+        consulta = consulta.where(Pokemon.peso <= peso_max)
+    return [id_ for (id_,) in db.execute(consulta)]
+
+
+def parse_args_and_run() -> None:
+    parser = argparse.ArgumentParser(description="Mede a latência da busca por tipos/habilidades/movimentos.")
+    parser.add_argument("--total", type=int, default=1300, help="Pokémons no banco (a dex real tem ~1300).")
+    parser.add_argument("--buscas", type=int, default=2000)
+    args = parser.parse_args()
+
+    banco_temporario("busca.db")
+
+    import models  # noqa: F401  (registra as tabelas)
+    from db.database import Base, SessionLocal, engine
+    from services.busca import indice_busca
+    from stub_pokeapi import TIPOS, gerar_pokemon
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    popular(args.total)
+    with SessionLocal() as db:
+        inicio = time.perf_counter()
+        indice_busca.carregar(db)
+        print(f"índice carregado em {(time.perf_counter() - inicio) * 1000:.0f}ms: {indice_busca.estatisticas()}")
+
+    # dois movimentos de um pokémon sorteado, para a maioria das buscas ter resultado
+    aleatorio = random.Random(42)
+    buscas = []
+    for _ in range(args.buscas):
+        movimentos = [m["move"]["name"] for m in gerar_pokemon("http://stub", aleatorio.randint(1, args.total))["moves"]]
+        buscas.append((aleatorio.sample(TIPOS, 1) if aleatorio.random() < 0.5 else [],
+                       aleatorio.sample(movimentos, 2), aleatorio.choice([None, 500])))
+
+    tempos = []
+    for tipos, movimentos, peso_max in buscas:
+        inicio = time.perf_counter()
+        indice_busca.buscar(tipos=tipos, movimentos=movimentos, peso_max=peso_max, limit=100)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    # as 20 primeiras conferidas contra o SQL
+    with SessionLocal() as db:
+        for tipos, movimentos, peso_max in buscas[:20]:
+            _, em_memoria = indice_busca.buscar(tipos=tipos, movimentos=movimentos, peso_max=peso_max)
+            esperado = buscar_no_banco(db, tipos, movimentos, peso_max)
+            if [p["id"] for p in em_memoria] != esperado:
+                print(f"FALHOU: resultado diferente do SQL para {tipos} {movimentos} peso<={peso_max}")
+                sys.exit(1)
+
+    tempos.sort()
+    p99 = tempos[int(len(tempos) * 0.99) - 1]
+    print(f"p50: {statistics.median(tempos):.3f}ms | p99: {p99:.3f}ms | máx: {tempos[-1]:.3f}ms")
+    if p99 > LIMITE_P99_MS:
+        print(f"FALHOU: p99 acima de {LIMITE_P99_MS}ms")
+        sys.exit(1)
+    print("OK: busca abaixo de 1ms e igual ao SQL.")
+
+
+if __name__ == "__main__":
+    parse_args_and_run()
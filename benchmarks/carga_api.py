@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from ambiente import banco_temporario
+from resultados import RAIZ, comparar, resumo_latencias, salvar
+from stub_pokeapi import TAMANHO_CADEIA, esperar_pronto, gerar_pokemon, iniciar_em_processo, nome_pokemon
+
+# Gerador de carga para a API: sobe a PokeAPI falsa e a API (uvicorn) em processos
+# separados, popula o banco e dispara requisições numa taxa fixa (laço aberto). A
+# latência conta do horário agendado até a resposta, então uma API que enfileira
+# não esconde a fila atrás de um cliente que esperou para mandar a próxima.
+#
+# Cenários: quente (pokémons já no banco/cache), frio (cada requisição é um pokémon
+# novo, caminho completo até a PokeAPI), misto (--fracao-fria de frios) e lista (/pokemons).
+CENARIOS = ("quente", "frio", "misto", "lista")
+
+
+def popular(total: int) -> None:
+    import models  # noqa: F401  (registra as tabelas)
+    from db.database import Base, SessionLocal, engine
+    from db.documentos import atualizar_documentos
+    from db.ingestao import gravar_lote_pokemons
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for inicio in range(1, total + 1, 500):
+            gravados = gravar_lote_pokemons(db, [gerar_pokemon("http://stub", i) for i in range(inicio, min(total, inicio + 499) + 1)])
+            atualizar_documentos(db, [poke_id for poke_id, _, _ in gravados])
+        db.commit()
+    finally:
+        db.close()
+
+
+class Caminhos:
+    # próximo caminho de cada cenário; frios nunca se repetem (um por cadeia evolutiva)
+
+    def __init__(self, populados: int, fracao_fria: float, semente: int = 42):
+        self.populados = populados
+        self.fracao_fria = fracao_fria
+        self.sorteio = random.Random(semente)
+        # primeiro membro da primeira cadeia inteira fora do banco
+        self.proximo_frio = -(-populados // TAMANHO_CADEIA) * TAMANHO_CADEIA + 1
+
+    def quente(self) -> str:
+        return f"/pokemon/{nome_pokemon(self.sorteio.randint(1, self.populados))}"
+
+    def frio(self) -> str:
+        poke_id = self.proximo_frio
+        self.proximo_frio += TAMANHO_CADEIA
+        return f"/pokemon/{nome_pokemon(poke_id)}"
+
+    def misto(self) -> str:
+        return self.frio() if self.sorteio.random() < self.fracao_fria else self.quente()
+
+    def lista(self) -> str:
+        return f"/pokemons?limit=50&cursor={self.sorteio.randint(0, max(self.populados - 50, 0))}"
+
+
+async def rodar_cenario(client, proximo, rps: float, duracao: float, max_em_voo: int) -> dict:
+    loop = asyncio.get_running_loop()
+    latencias: list[float] = []
+    status: Counter = Counter()
+    em_voo: set[asyncio.Task] = set()
+    descartadas = 0
+
+    async def requisitar(caminho: str, agendado: float) -> None:
+        try:
+            resposta = await client.get(caminho)
+            status[str(resposta.status_code)] += 1
+        except Exception as e:
+            status[e.__class__.__name__] += 1
+        latencias.append((loop.time() - agendado) * 1000)
+
+    total = int(rps * duracao)
+    inicio = loop.time()
+    for i in range(total):
+        agendado = inicio + i / rps
+        await asyncio.sleep(max(0.0, agendado - loop.time()))
+        if len(em_voo) >= max_em_voo:
+            # API saturada: a requisição não sai, mas conta como descartada
+            descartadas += 1
+            continue
+        tarefa = asyncio.create_task(requisitar(proximo(), agendado))
+        em_voo.add(tarefa)
+        tarefa.add_done_callback(em_voo.discard)
+    await asyncio.gather(*em_voo)
+    decorrido = loop.time() - inicio
+
+    erros = sum(n for codigo, n in status.items() if not codigo.isdigit() or int(codigo) >= 500)
+    return {
+        "rps_alvo": rps,
+        "enviadas": total - descartadas,
+        "descartadas": descartadas,
+        "erros": erros,
+        "vazao_rps": round(len(latencias) / decorrido, 1),
+        **resumo_latencias(latencias),
+        "status": dict(status),
+    }
+
+
+async def executar(url: str, cenarios: list[str], caminhos: Caminhos, rps: float, duracao: float, max_em_voo: int) -> dict:
+    import httpx
+
+    limites = httpx.Limits(max_connections=max_em_voo, max_keepalive_connections=max_em_voo)
+    resultados = {}
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30.0) as client:
+        for cenario in cenarios:
+            resultados[cenario] = await rodar_cenario(client, getattr(caminhos, cenario), rps, duracao, max_em_voo)
+            r = resultados[cenario]
+            print(f"{cenario:7} | {r['enviadas']} enviadas ({r['descartadas']} descartadas, {r['erros']} erros) | "
+                  f"{r['vazao_rps']} req/s | p50 {r['p50_ms']}ms p95 {r['p95_ms']}ms p99 {r['p99_ms']}ms máx {r['max_ms']}ms")
+    return resultados
+
+
+def subir_api(porta: int, base_url_stub: str) -> subprocess.Popen:
+    ambiente = {
+        **os.environ,
+        "POKEAPI_BASE_URL": base_url_stub,
+        # o rate limit de produção e o cache em disco não fazem sentido contra o stub local
+        "POKEAPI_TAXA": os.getenv("POKEAPI_TAXA", "100000"),
+        "POKEAPI_RAJADA": os.getenv("POKEAPI_RAJADA", "1000"),
+        "POKEAPI_CACHE_HTTP": os.getenv("POKEAPI_CACHE_HTTP", ""),
+    }
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(porta),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=RAIZ, env=ambiente,
+    )
+    esperar_pronto(f"http://127.0.0.1:{porta}/", processo)
+    return processo
+
+
+def parse_args_and_run() -> None:
+    parser = argparse.ArgumentParser(description="Carga em /pokemon/{nome} e /pokemons a uma taxa fixa, com p50/p95/p99.")
+    parser.add_argument("--cenarios", default=",".join(CENARIOS), help=f"Lista separada por vírgula: {', '.join(CENARIOS)}.")
+    parser.add_argument("--rps", type=float, default=200.0, help="Requisições por segundo em cada cenário.")
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos de cada cenário.")
+    parser.add_argument("--max-em-voo", type=int, default=200, help="Acima disso, novas requisições são descartadas.")
+    parser.add_argument("--populados", type=int, default=1000, help="Pokémons gravados no banco antes da carga.")
+    parser.add_argument("--fracao-fria", type=float, default=0.1, help="Fração de pokémons novos no cenário misto.")
+    parser.add_argument("--latencia-stub-ms", type=float, default=50.0)
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração das respostas do stub que viram 429.")
+    parser.add_argument("--porta-stub", type=int, default=8001)
+    parser.add_argument("--porta-api", type=int, default=8002)
+    parser.add_argument("--url", default=None, help="API já rodando (com --populados pokémons e o stub como PokeAPI); não sobe nada.")
+    parser.add_argument("--saida", default="benchmarks/resultados/carga_api.json")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior para comparar.")
+    args = parser.parse_args()
+
+    cenarios = [c.strip() for c in args.cenarios.split(",") if c.strip()]
+    invalidos = [c for c in cenarios if c not in CENARIOS]
+    if invalidos:
+        parser.error(f"cenários inválidos: {', '.join(invalidos)}")
+
+    processos = []
+    try:
+        url = args.url
+        if url is None:
+            banco_temporario("carga.db")
+            # pokémons suficientes no stub para todo frio ser inédito
+            frios = int(args.rps * args.duracao) * sum(1 for c in cenarios if c in ("frio", "misto"))
+            stub, base_url = iniciar_em_processo(args.porta_stub, total=args.populados + (frios + 2) * TAMANHO_CADEIA,
+                                                 latencia_ms=args.latencia_stub_ms, taxa_429=args.taxa_429)
+            processos.append(stub)
+            inicio = time.perf_counter()
+            popular(args.populados)
+            print(f"{args.populados} pokémons gravados em {time.perf_counter() - inicio:.1f}s")
+            processos.append(subir_api(args.porta_api, base_url))
+            url = f"http://127.0.0.1:{args.porta_api}"
+
+        resultados = asyncio.run(executar(url, cenarios, Caminhos(args.populados, args.fracao_fria),
+                                          args.rps, args.duracao, args.max_em_voo))
+    finally:
+        for processo in reversed(processos):
+            processo.terminate()
+            processo.wait(timeout=10)
+
+    documento = salvar(args.saida, "carga_api", vars(args), resultados)
+    if args.comparar:
+        comparar(documento, args.comparar)
+
+
+if __name__ == "__main__":
+    parse_args_and_run()
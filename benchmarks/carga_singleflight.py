@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from ambiente import ambiente_stub
+from stub_pokeapi import TAMANHO_CADEIA, iniciar_em_thread, nome_pokemon
+
+# Teste de carga do single-flight: N requisições simultâneas pelo mesmo pokémon
+# frio devem gerar uma única busca na PokeAPI (pokémon + espécie + cadeia), e a
+# cadeia completada em segundo plano deve aparecer em evolucoes logo depois.
+
+
+async def executar(requisicoes: int, nome: str) -> tuple[list[int], set, list[str]]:
+    import httpx
+    from main import app
+    from services.prefetch import fila_prefetch
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=60) as client:
+            respostas = await asyncio.gather(*(client.get(f"/pokemon/{nome}") for _ in range(requisicoes)))
+            await fila_prefetch.esperar()
+            evolucoes = (await client.get(f"/pokemon/{nome}")).json()["evolucoes"]
+    return [r.status_code for r in respostas], {r.json().get("id") for r in respostas}, evolucoes
+
+
+def parse_args_and_run() -> None:
+    parser = argparse.ArgumentParser(description="Carga concorrente sobre um único pokémon frio.")
+    parser.add_argument("--requisicoes", type=int, default=500)
+    parser.add_argument("--latencia-stub-ms", type=float, default=50.0)
+    parser.add_argument("--porta-stub", type=int, default=8001)
+    args = parser.parse_args()
+
+    server, base_url = iniciar_em_thread(args.porta_stub, total=TAMANHO_CADEIA, latencia_ms=args.latencia_stub_ms)
+    ambiente_stub(base_url, "carga.db")
+
+    inicio = time.perf_counter()
+    status, ids, evolucoes = asyncio.run(executar(args.requisicoes, nome_pokemon(1)))
+    duracao = time.perf_counter() - inicio
+
+    # um pokémon pedido + os outros membros da cadeia, uma espécie e uma cadeia
+    # (a lista do catálogo de nomes, carregada na subida, não conta)
+    esperado = {"pokemon": TAMANHO_CADEIA, "pokemon-species": 1, "evolution-chain": 1}
+    contadores = {rota: server.config.app.state.contadores.get(rota, 0) for rota in esperado}
+
+    print(f"{args.requisicoes} requisições em {duracao:.2f}s | status: {sorted(set(status))} | ids: {sorted(ids)}")
+    print(f"Chamadas à PokeAPI: {contadores} (esperado: {esperado})")
+    print(f"Evoluções depois do prefetch: {evolucoes}")
+
+    if contadores != esperado or set(status) != {200} or len(ids) != 1:
+        print("FALHOU: a busca não foi coalescida.")
+        sys.exit(1)
+    if len(evolucoes) != TAMANHO_CADEIA - 1:
+        print("FALHOU: a cadeia evolutiva não foi completada em segundo plano.")
+        sys.exit(1)
+    print("OK: uma única busca na PokeAPI para todas as requisições.")
+
+
+if __name__ == "__main__":
+    parse_args_and_run()
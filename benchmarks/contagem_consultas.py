@@ -0,0 +1,112 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from ambiente import banco_temporario
+
+# Verificação de regressão de N+1: conta as consultas SQL de cada endpoint
+# para bancos de tamanhos diferentes e falha se passar do orçamento fixo.
+
+ORCAMENTO = {
+    "/pokemon/{nome}": 1,  # documento pronto do read model
+    "/pokemon/{nome}?include=movimentos": 2,  # + lista de pokemon_movimento
+    "/pokemon/{nome}/movimentos": 1,  # página + total numa consulta
+    "/pokemon/batch (6 nomes)": 1,  # documentos de todos numa consulta
+    "/pokemon/batch?include=movimentos": 2,  # + movimentos de todos numa consulta
+    "/pokemons": 1,  # colunas desnormalizadas do read model
+}
+
+
+def popular(total: int) -> None:
+    from db.database import SessionLocal
+    from db.documentos import preencher_documentos_faltando
+    from models import Habilidade, Movimento, Pokemon, Tipo
+
+    db = SessionLocal()
+    try:
+        tipos = [Tipo(nome=f"tipo-{i}") for i in range(18)]
+        habilidades = [Habilidade(nome=f"habilidade-{i}") for i in range(50)]
+        movimentos = [Movimento(nome=f"movimento-{i}") for i in range(200)]
+        db.add_all(tipos + habilidades + movimentos)
+        pokemons = []
+        for i in range(1, total + 1):
+            p = Pokemon(id=i, nome=f"pokemon-{i}", altura=i, peso=i, sprite=None)
+            p.tipos = list(dict.fromkeys([tipos[i % 18], tipos[(i * 7) % 18]])) if i % 2 else [tipos[i % 18]]
+            p.habilidades = [habilidades[i % 50], habilidades[(i + 1) % 50]]
+            p.movimentos = movimentos[i % 100:i % 100 + 100]
+            pokemons.append(p)
+        for i, p in enumerate(pokemons):
+            p.evolucoes = [e for e in pokemons[i - i % 3:i - i % 3 + 3] if e is not p]
+        db.add_all(pokemons)
+        db.commit()
+        preencher_documentos_faltando(db)
+    finally:
+        db.close()
+
+
+def medir(total: int) -> dict[str, int]:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from db.database import Base, engine
+    import main
+    from main import app
+    from services.cache import cache_respostas
+
+    # sem aquecimento: a medida é do caminho que lê o banco
+    main.AQUECER_CACHE = False
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    popular(total)
+
+    consultas = []
+
+    def contar(*args):
+        consultas.append(1)
+
+    event.listen(engine, "before_cursor_execute", contar)
+    resultado = {}
+    # time de seis: metade por nome, metade por id
+    equipe = ",".join(f"pokemon-{i}" if i % 2 else str(i) for i in range(max(1, total - 5), total + 1))
+    try:
+        with TestClient(app) as client:
+            for rota, url in (("/pokemon/{nome}", f"/pokemon/pokemon-{total}"),
+                              ("/pokemon/{nome}?include=movimentos", f"/pokemon/pokemon-{total}?include=movimentos"),
+                              ("/pokemon/{nome}/movimentos", f"/pokemon/pokemon-{total}/movimentos?limit=20"),
+                              ("/pokemon/batch (6 nomes)", f"/pokemon/batch?nomes={equipe}"),
+                              ("/pokemon/batch?include=movimentos", f"/pokemon/batch?nomes={equipe}&include=movimentos"),
+                              ("/pokemons", "/pokemons")):
+                cache_respostas.limpar()
+                consultas.clear()
+                client.get(url).raise_for_status()
+                resultado[rota] = len(consultas)
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+    return resultado
+
+
+def parse_args_and_run() -> None:
+    parser = argparse.ArgumentParser(description="Conta as consultas SQL por endpoint em vários tamanhos de banco.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    banco_temporario("consultas.db")
+
+    falhou = False
+    for total in args.tamanhos:
+        contagens = medir(total)
+        for rota, quantidade in contagens.items():
+            estourou = quantidade > ORCAMENTO[rota]
+            falhou |= estourou
+            print(f"{total:>6} pokémons | {rota:<38} | {quantidade} consultas (orçamento {ORCAMENTO[rota]})"
+                  + (" <- ESTOUROU" if estourou else ""))
+
+    if falhou:
+        sys.exit(1)
+    print("OK: número de consultas constante dentro do orçamento.")
+
+
+if __name__ == "__main__":
+    parse_args_and_run()
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from ambiente import ambiente_stub
+from resultados import comparar, salvar
+from stub_pokeapi import iniciar_em_processo
+
+# Tempo do importador de ponta a ponta contra o stub (com latência e 429 configuráveis):
+# duração de cada fase, pokémons por segundo e requisições feitas à PokeAPI. Com
+# --incremental, mede também uma segunda execução com requisições condicionais.
+
+
+def contadores_stub(base_url: str) -> dict:
+    return httpx.get(base_url.replace("/api/v2", "/__contadores")).json()
+
+
+def rodar(importador, base_url: str, args, incremental: bool) -> dict:
+    antes = contadores_stub(base_url)
+    importador.phase_seconds.clear()
+    saida = io.StringIO()
+    inicio = time.perf_counter()
+    # o log por pokémon do importador fica fora da medição
+    with contextlib.redirect_stdout(saida):
+        asyncio.run(importador.import_all_async(
+            concurrency=args.concorrencia, batch_size=args.batch_size, incremental=incremental,
+            writers=args.writers, stats_interval=0,
+        ))
+    total = time.perf_counter() - inicio
+    depois = contadores_stub(base_url)
+
+    from sqlalchemy import func, select
+
+    from db.database import SessionLocal
+    from models import Pokemon, PokemonEvolucao
+
+    with SessionLocal() as db:
+        pokemons = db.execute(select(func.count()).select_from(Pokemon)).scalar()
+        evolucoes = db.execute(select(func.count()).select_from(PokemonEvolucao)).scalar()
+    requisicoes = {rota: depois.get(rota, 0) - antes.get(rota, 0) for rota in depois if depois.get(rota, 0) != antes.get(rota, 0)}
+    return {
+        "total_s": round(total, 3),
+        "fases_s": {fase: round(segundos, 3) for fase, segundos in importador.phase_seconds.items()},
+        "pokemons_por_s": round(pokemons / total, 1) if not incremental else round(args.total / total, 1),
+        "pokemons": pokemons,
+        "evolucoes": evolucoes,
+        "requisicoes_pokeapi": requisicoes,
+        "erros": saida.getvalue().count("[ERRO"),
+    }
+
+
+def parse_args_and_run() -> None:
+    parser = argparse.ArgumentParser(description="Tempo do importador de ponta a ponta contra a PokeAPI falsa.")
+    parser.add_argument("--total", type=int, default=1000, help="Pokémons no stub.")
+    parser.add_argument("--latencia-stub-ms", type=float, default=20.0)
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração das respostas do stub que viram 429.")
+    parser.add_argument("--concorrencia", type=int, default=10)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--incremental", action="store_true", help="Mede também uma reexecução com --incremental.")
+    parser.add_argument("--porta-stub", type=int, default=8001)
+    parser.add_argument("--saida", default="benchmarks/resultados/importador.json")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior para comparar.")
+    args = parser.parse_args()
+
+    stub, base_url = iniciar_em_processo(args.porta_stub, total=args.total, latencia_ms=args.latencia_stub_ms,
+                                         taxa_429=args.taxa_429)
+    try:
+        ambiente_stub(base_url, "importador.db")
+        import importar_async_pokemons as importador
+
+        resultados = {"completa": rodar(importador, base_url, args, incremental=False)}
+        if args.incremental:
+            resultados["incremental"] = rodar(importador, base_url, args, incremental=True)
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+    for nome, r in resultados.items():
+        fases = " | ".join(f"{fase} {segundos}s" for fase, segundos in r["fases_s"].items())
+        print(f"{nome:11} | {r['total_s']}s ({fases}) | {r['pokemons_por_s']} pokémons/s | "
+              f"PokeAPI: {sum(r['requisicoes_pokeapi'].values())} requisições {r['requisicoes_pokeapi']}")
+
+    documento = salvar(args.saida, "importador", vars(args), resultados)
+    if args.comparar:
+        comparar(documento, args.comparar)
+
+
+if __name__ == "__main__":
+    parse_args_and_run()
@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from ambiente import ambiente_stub
+from resultados import percentil
+from stub_pokeapi import TAMANHO_CADEIA, iniciar_em_thread, nome_pokemon
+
+# Mede a latência de buscas "frias" em /pokemon/{nome} (pokémon ausente no banco,
+# caminho completo até a PokeAPI) usando o stub local no lugar de pokeapi.co.
+
+
+async def executar(total: int, concorrencia: int) -> list[float]:
+    import httpx
+    from main import app
+
+    latencias = []
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+
+            async def busca(poke_id: int):
+                async with semaforo:
+                    inicio = time.perf_counter()
+                    resposta = await client.get(f"/pokemon/{nome_pokemon(poke_id)}")
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                    resposta.raise_for_status()
+
+            # só o primeiro membro de cada cadeia: cada busca é realmente fria
+            ids = [i * TAMANHO_CADEIA + 1 for i in range(total)]
+            await asyncio.gather(*(busca(i) for i in ids))
+    return latencias
+
+
+def parse_args_and_run() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de latência de buscas frias em /pokemon/{nome}.")
+    parser.add_argument("--buscas", type=int, default=100)
+    parser.add_argument("--concorrencia", type=int, default=20)
+    parser.add_argument("--latencia-stub-ms", type=float, default=50.0)
+    parser.add_argument("--porta-stub", type=int, default=8001)
+    args = parser.parse_args()
+
+    _, base_url = iniciar_em_thread(args.porta_stub, total=args.buscas * TAMANHO_CADEIA,
+                                    latencia_ms=args.latencia_stub_ms)
+    ambiente_stub(base_url, "benchmark.db")
+
+    inicio = time.perf_counter()
+    latencias = asyncio.run(executar(args.buscas, args.concorrencia))
+    duracao = time.perf_counter() - inicio
+
+    print(f"Buscas frias: {len(latencias)} | concorrência: {args.concorrencia} | latência do stub: {args.latencia_stub_ms}ms")
+    print(f"p50: {statistics.median(latencias):.1f}ms | p99: {percentil(latencias, 99):.1f}ms | "
+          f"máx: {max(latencias):.1f}ms | vazão: {len(latencias) / duracao:.1f} req/s")
+
+
+if __name__ == "__main__":
+    parse_args_and_run()
@@ -0,0 +1,74 @@
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+# Resultados dos benchmarks em JSON: cada execução grava os parâmetros, o commit e os
+# números; --comparar mostra a variação de cada métrica contra um arquivo anterior.
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumo_latencias(latencias_ms: list[float]) -> dict:
+    if not latencias_ms:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    return {
+        "p50_ms": round(percentil(latencias_ms, 50), 3),
+        "p95_ms": round(percentil(latencias_ms, 95), 3),
+        "p99_ms": round(percentil(latencias_ms, 99), 3),
+        "max_ms": round(max(latencias_ms), 3),
+    }
+
+
+def commit_atual() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def salvar(caminho: str, benchmark: str, parametros: dict, resultados: dict) -> dict:
+    documento = {
+        "benchmark": benchmark,
+        "quando": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit_atual(),
+        "python": platform.python_version(),
+        "parametros": parametros,
+        "resultados": resultados,
+    }
+    Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+    Path(caminho).write_text(json.dumps(documento, indent=2, ensure_ascii=False))
+    print(f"Resultados gravados em {caminho}")
+    return documento
+
+
+def _folhas(dados, prefixo: str = "") -> dict[str, float]:
+    if isinstance(dados, dict):
+        folhas = {}
+        for chave, valor in dados.items():
+            folhas.update(_folhas(valor, f"{prefixo}.{chave}" if prefixo else str(chave)))
+        return folhas
+    if isinstance(dados, (int, float)) and not isinstance(dados, bool):
+        return {prefixo: dados}
+    return {}
+
+
+def comparar(atual: dict, caminho_anterior: str) -> None:
+    anterior = json.loads(Path(caminho_anterior).read_text())
+    if anterior.get("benchmark") != atual["benchmark"]:
+        print(f"Aviso: {caminho_anterior} é do benchmark {anterior.get('benchmark')}, não {atual['benchmark']}")
+    antes, depois = _folhas(anterior["resultados"]), _folhas(atual["resultados"])
+    print(f"\nComparação com {caminho_anterior} (commit {anterior.get('commit')} -> {atual.get('commit')}):")
+    for chave in sorted(depois.keys() & antes.keys()):
+        if antes[chave] == depois[chave]:
+            continue
+        variacao = f"{(depois[chave] - antes[chave]) / antes[chave] * 100:+.1f}%" if antes[chave] else "n/a"
+        print(f"  {chave:48} {antes[chave]:>12.3f} -> {depois[chave]:>12.3f}  ({variacao})")
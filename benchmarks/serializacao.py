@@ -0,0 +1,95 @@
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+
+from schemas import PokemonDetalhe, PokemonResumo
+from stub_pokeapi import gerar_pokemon
+
+# Microbenchmark da serialização das respostas com payloads de tamanho real
+# (~100 movimentos no detalhe com ?include=movimentos, só o total no padrão, 1000 itens
+# na lista): caminho antigo (dict -> jsonable_encoder -> json.dumps), modelo Pydantic,
+# orjson e bytes já prontos.
+# Falha se o caminho novo (orjson) não for mais rápido que o antigo.
+
+
+def documento_detalhe(poke_id: int) -> dict:
+    dados = gerar_pokemon("http://stub", poke_id)
+    return {
+        "id": dados["id"],
+        "nome": dados["name"],
+        "altura": dados["height"],
+        "peso": dados["weight"],
+        "sprite": dados["sprites"]["front_default"],
+        "tipos": [t["type"]["name"] for t in dados["types"]],
+        "habilidades": [h["ability"]["name"] for h in dados["abilities"]],
+        "total_movimentos": len(dados["moves"]),
+        "movimentos": [m["move"]["name"] for m in dados["moves"]],
+        "evolucoes": [f"pokemon-{poke_id + 1}", f"pokemon-{poke_id + 2}"],
+    }
+
+
+def medir(funcao, repeticoes: int) -> float:
+    # melhor de 5 rodadas, em microssegundos por chamada
+    return min(timeit.repeat(funcao, number=repeticoes, repeat=5)) / repeticoes * 1e6
+
+
+def parse_args_and_run() -> None:
+    parser = argparse.ArgumentParser(description="Compara os caminhos de serialização das respostas.")
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    args = parser.parse_args()
+
+    detalhe = documento_detalhe(1)
+    padrao = {k: v for k, v in detalhe.items() if k != "movimentos"}
+    lista = [{k: d[k] for k in ("id", "nome", "altura", "peso", "tipos")} for d in map(documento_detalhe, range(1, 1001))]
+    corpo_pronto = ORJSONResponse(content=detalhe).body
+
+    casos = {
+        "detalhe padrão": {
+            "antes (jsonable_encoder + json)": lambda: JSONResponse(content=jsonable_encoder(padrao)).body,
+            "JSONResponse direto (json)": lambda: JSONResponse(content=padrao).body,
+            "modelo Pydantic (model_dump_json)": lambda: PokemonDetalhe.model_validate(padrao).model_dump_json(exclude_unset=True),
+            "orjson": lambda: ORJSONResponse(content=padrao).body,
+        },
+        "detalhe com movimentos": {
+            "antes (jsonable_encoder + json)": lambda: JSONResponse(content=jsonable_encoder(detalhe)).body,
+            "JSONResponse direto (json)": lambda: JSONResponse(content=detalhe).body,
+            "modelo Pydantic (model_dump_json)": lambda: PokemonDetalhe.model_validate(detalhe).model_dump_json(),
+            "orjson": lambda: ORJSONResponse(content=detalhe).body,
+            "bytes prontos (read model/cache)": lambda: Response(content=corpo_pronto, media_type="application/json").body,
+        },
+        "lista (1000 itens)": {
+            "antes (jsonable_encoder + json)": lambda: JSONResponse(content=jsonable_encoder(lista)).body,
+            "JSONResponse direto (json)": lambda: JSONResponse(content=lista).body,
+            "modelo Pydantic (model_dump_json)": lambda: b"[" + b",".join(
+                PokemonResumo.model_validate(item).model_dump_json(exclude_unset=True).encode() for item in lista) + b"]",
+            "orjson": lambda: ORJSONResponse(content=lista).body,
+        },
+    }
+
+    print(f"Payload do detalhe: {len(ORJSONResponse(content=padrao).body)} bytes no padrão, "
+          f"{len(corpo_pronto)} com ?include=movimentos")
+
+    falhou = False
+    for nome, caminhos in casos.items():
+        repeticoes = args.repeticoes if nome.startswith("detalhe") else max(1, args.repeticoes // 100)
+        tempos = {caminho: medir(funcao, repeticoes) for caminho, funcao in caminhos.items()}
+        antes = tempos["antes (jsonable_encoder + json)"]
+        print(f"\n{nome}")
+        for caminho, tempo in tempos.items():
+            print(f"  {caminho:<36} {tempo:>10.1f} µs  ({antes / tempo:>5.1f}x)")
+        falhou |= tempos["orjson"] >= antes
+
+    if falhou:
+        print("\nFALHOU: orjson não foi mais rápido que o caminho antigo.")
+        sys.exit(1)
+    print("\nOK: orjson mais rápido que o caminho antigo.")
+
+
+if __name__ == "__main__":
+    parse_args_and_run()
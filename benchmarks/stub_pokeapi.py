@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+# PokeAPI falsa para benchmarks: gera fixtures determinísticas em memória e
+# responde com uma latência configurável (e uma fração de 429), sem depender de pokeapi.co.
+
+TIPOS = [
+    "normal", "fire", "water", "grass", "electric", "ice", "fighting", "poison", "ground",
+    "flying", "psychic", "bug", "rock", "ghost", "dragon", "dark", "steel", "fairy",
+]
+# tabela de tipos real: atacante -> (2x, 0.5x, 0x)
+EFICACIA = {
+    "normal": ([], ["rock", "steel"], ["ghost"]),
+    "fire": (["grass", "ice", "bug", "steel"], ["fire", "water", "rock", "dragon"], []),
+    "water": (["fire", "ground", "rock"], ["water", "grass", "dragon"], []),
+    "grass": (["water", "ground", "rock"], ["fire", "grass", "poison", "flying", "bug", "dragon", "steel"], []),
+    "electric": (["water", "flying"], ["electric", "grass", "dragon"], ["ground"]),
+    "ice": (["grass", "ground", "flying", "dragon"], ["fire", "water", "ice", "steel"], []),
+    "fighting": (["normal", "ice", "rock", "dark", "steel"], ["poison", "flying", "psychic", "bug", "fairy"], ["ghost"]),
+    "poison": (["grass", "fairy"], ["poison", "ground", "rock", "ghost"], ["steel"]),
+    "ground": (["fire", "electric", "poison", "rock", "steel"], ["grass", "bug"], ["flying"]),
+    "flying": (["grass", "fighting", "bug"], ["electric", "rock", "steel"], []),
+    "psychic": (["fighting", "poison"], ["psychic", "steel"], ["dark"]),
+    "bug": (["grass", "psychic", "dark"], ["fire", "fighting", "poison", "flying", "ghost", "steel", "fairy"], []),
+    "rock": (["fire", "ice", "flying", "bug"], ["fighting", "ground", "steel"], []),
+    "ghost": (["psychic", "ghost"], ["dark"], ["normal"]),
+    "dragon": (["dragon"], ["steel"], ["fairy"]),
+    "dark": (["psychic", "ghost"], ["fighting", "dark", "fairy"], []),
+    "steel": (["ice", "rock", "fairy"], ["fire", "water", "electric", "steel"], []),
+    "fairy": (["fighting", "dragon", "dark"], ["fire", "poison", "steel"], []),
+}
+TOTAL_HABILIDADES = 300
+TOTAL_MOVIMENTOS = 900
+MOVIMENTOS_POR_POKEMON = 100
+TAMANHO_CADEIA = 3
+
+
+def nome_pokemon(poke_id: int) -> str:
+    return f"pokemon-{poke_id}"
+
+
+def id_da_cadeia(poke_id: int) -> int:
+    return (poke_id - 1) // TAMANHO_CADEIA + 1
+
+
+def gerar_pokemon(base_url: str, poke_id: int) -> dict:
+    tipos = [TIPOS[poke_id % len(TIPOS)]]
+    if poke_id % 2 == 0:
+        tipos.append(TIPOS[(poke_id * 7) % len(TIPOS)])
+    movimentos = sorted({(poke_id * 31 + i * 17) % TOTAL_MOVIMENTOS for i in range(MOVIMENTOS_POR_POKEMON)})
+    return {
+        "id": poke_id,
+        "name": nome_pokemon(poke_id),
+        "height": 3 + poke_id % 20,
+        "weight": 40 + (poke_id * 13) % 900,
+        "sprites": {"front_default": f"{base_url}/sprites/{poke_id}.png"},
+        "species": {"name": nome_pokemon(poke_id), "url": f"{base_url}/pokemon-species/{poke_id}"},
+        "types": [{"slot": i + 1, "type": {"name": t}} for i, t in enumerate(dict.fromkeys(tipos))],
+        "abilities": [
+            {"ability": {"name": f"habilidade-{(poke_id + i * 101) % TOTAL_HABILIDADES}"}} for i in range(2)
+        ],
+        "moves": [{"move": {"name": f"movimento-{m}"}} for m in movimentos],
+    }
+
+
+def gerar_especie(base_url: str, poke_id: int) -> dict:
+    return {
+        "id": poke_id,
+        "name": nome_pokemon(poke_id),
+        "evolution_chain": {"url": f"{base_url}/evolution-chain/{id_da_cadeia(poke_id)}"},
+    }
+
+
+def gerar_cadeia(total: int, chain_id: int) -> dict | None:
+    membros = [i for i in range((chain_id - 1) * TAMANHO_CADEIA + 1, chain_id * TAMANHO_CADEIA + 1) if i <= total]
+    if not membros:
+        return None
+
+    def no(indice: int) -> dict:
+        proximos = [no(indice + 1)] if indice + 1 < len(membros) else []
+        return {"species": {"name": nome_pokemon(membros[indice])}, "evolves_to": proximos}
+
+    return {"id": chain_id, "chain": no(0)}
+
+
+def gerar_tipo(base_url: str, nome: str) -> dict | None:
+    if nome not in EFICACIA and nome != "unknown":
+        return None
+
+    def refs(nomes):
+        return [{"name": n, "url": f"{base_url}/type/{n}"} for n in nomes]
+
+    dobro, metade, nada = EFICACIA.get(nome, ([], [], []))
+    recebe = {m: [a for a, rel in EFICACIA.items() if nome in rel[i]] for i, m in enumerate(("double", "half", "no"))}
+    return {
+        "id": TIPOS.index(nome) + 1 if nome in TIPOS else 10001,
+        "name": nome,
+        "damage_relations": {
+            "double_damage_to": refs(dobro), "half_damage_to": refs(metade), "no_damage_to": refs(nada),
+            "double_damage_from": refs(recebe["double"]), "half_damage_from": refs(recebe["half"]),
+            "no_damage_from": refs(recebe["no"]),
+        },
+    }
+
+
+def criar_app(total: int = 1000, latencia_ms: float = 0.0, base_url: str = "http://127.0.0.1:8001/api/v2",
+              taxa_429: float = 0.0, semente: int = 42) -> FastAPI:
+    app = FastAPI()
+    app.state.contadores = {}
+    sorteio = random.Random(semente)
+
+    def resolver_id(identificador: str) -> int | None:
+        # como a PokeAPI: "²" e afins são nomes desconhecidos (404), não ids
+        if identificador.isascii() and identificador.isdigit():
+            poke_id = int(identificador)
+        elif identificador.startswith("pokemon-") and identificador[8:].isascii() and identificador[8:].isdigit():
+            poke_id = int(identificador[8:])
+        else:
+            return None
+        return poke_id if 1 <= poke_id <= total else None
+
+    async def responder(request: Request, rota: str, corpo: dict | None):
+        app.state.contadores[rota] = app.state.contadores.get(rota, 0) + 1
+        if latencia_ms:
+            await asyncio.sleep(latencia_ms / 1000)
+        if taxa_429 and sorteio.random() < taxa_429:
+            # sem Retry-After: o cliente cai no backoff com jitter
+            app.state.contadores["429"] = app.state.contadores.get("429", 0) + 1
+            return JSONResponse(status_code=429, content="Too Many Requests")
+        if corpo is None:
+            return JSONResponse(status_code=404, content="Not Found")
+        # ETag fixo por conteúdo, como a PokeAPI, para testar requisições condicionais
+        etag = '"' + hashlib.md5(json.dumps(corpo, sort_keys=True).encode()).hexdigest() + '"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return JSONResponse(content=corpo, headers={"ETag": etag})
+
+    @app.get("/api/v2/pokemon")
+    async def lista(request: Request, limit: int = 20, offset: int = 0):
+        ids = range(offset + 1, min(total, offset + limit) + 1)
+        return await responder(request, "pokemon-lista", {
+            "count": total,
+            "results": [{"name": nome_pokemon(i), "url": f"{base_url}/pokemon/{i}"} for i in ids],
+        })
+
+    @app.get("/api/v2/pokemon/{identificador}")
+    async def pokemon(request: Request, identificador: str):
+        poke_id = resolver_id(identificador)
+        return await responder(request, "pokemon", gerar_pokemon(base_url, poke_id) if poke_id else None)
+
+    @app.get("/api/v2/pokemon-species/{identificador}")
+    async def especie(request: Request, identificador: str):
+        poke_id = resolver_id(identificador)
+        return await responder(request, "pokemon-species", gerar_especie(base_url, poke_id) if poke_id else None)
+
+    @app.get("/api/v2/evolution-chain/{chain_id}")
+    async def cadeia(request: Request, chain_id: int):
+        return await responder(request, "evolution-chain", gerar_cadeia(total, chain_id))
+
+    @app.get("/api/v2/type")
+    async def lista_tipos(request: Request, limit: int = 20, offset: int = 0):
+        # "unknown" existe na PokeAPI mas não tem relações de dano
+        nomes = (TIPOS + ["unknown"])[offset:offset + limit]
+        return await responder(request, "type-lista", {
+            "count": len(TIPOS) + 1,
+            "results": [{"name": n, "url": f"{base_url}/type/{n}"} for n in nomes],
+        })
+
+    @app.get("/api/v2/type/{nome}")
+    async def tipo(request: Request, nome: str):
+        return await responder(request, "type", gerar_tipo(base_url, nome))
+
+    @app.get("/__contadores")
+    async def contadores():
+        return app.state.contadores
+
+    return app
+
+
+def exportar_api_data(destino: str, total: int = 1000) -> Path:
+    # mesmas fixtures gravadas no layout do api-data (data/api/v2/<recurso>/<id>/index.json),
+    # para o importador rodar com --source sem rede
+    raiz = Path(destino) / "data" / "api" / "v2"
+    base_url = "/api/v2"
+
+    def gravar(recurso: str, corpo: dict) -> None:
+        arquivo = raiz / recurso / "index.json"
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        arquivo.write_text(json.dumps(corpo))
+
+    gravar("pokemon", {"count": total, "results": [
+        {"name": nome_pokemon(i), "url": f"{base_url}/pokemon/{i}/"} for i in range(1, total + 1)
+    ]})
+    for i in range(1, total + 1):
+        gravar(f"pokemon/{i}", gerar_pokemon(base_url, i))
+        gravar(f"pokemon-species/{i}", gerar_especie(base_url, i))
+    for chain_id in range(1, id_da_cadeia(total) + 1):
+        gravar(f"evolution-chain/{chain_id}", gerar_cadeia(total, chain_id))
+    nomes_tipos = TIPOS + ["unknown"]
+    gravar("type", {"count": len(nomes_tipos), "results": [
+        {"name": n, "url": f"{base_url}/type/{gerar_tipo(base_url, n)['id']}/"} for n in nomes_tipos
+    ]})
+    for n in nomes_tipos:
+        tipo = gerar_tipo(base_url, n)
+        gravar(f"type/{tipo['id']}", tipo)
+    return raiz
+
+
+def iniciar_em_thread(porta: int = 8001, **kwargs) -> tuple[uvicorn.Server, str]:
+    # sobe o stub numa thread separada e devolve a base_url para POKEAPI_BASE_URL
+    base_url = f"http://127.0.0.1:{porta}/api/v2"
+    app = criar_app(base_url=base_url, **kwargs)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=porta, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, base_url
+
+
+def iniciar_em_processo(porta: int = 8001, total: int = 1000, latencia_ms: float = 0.0,
+                        taxa_429: float = 0.0) -> tuple[subprocess.Popen, str]:
+    # processo separado: o stub não disputa o GIL com quem está sendo medido
+    processo = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--porta", str(porta), "--total", str(total),
+         "--latencia-ms", str(latencia_ms), "--taxa-429", str(taxa_429), "--log-level", "warning"],
+    )
+    base_url = f"http://127.0.0.1:{porta}/api/v2"
+    esperar_pronto(f"http://127.0.0.1:{porta}/__contadores", processo)
+    return processo, base_url
+
+
+def esperar_pronto(url: str, processo: subprocess.Popen, timeout: float = 60.0) -> None:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"processo saiu com código {processo.returncode} antes de responder em {url}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    processo.terminate()
+    raise RuntimeError(f"{url} não respondeu em {timeout:.0f}s")
+
+
+def parse_args_and_run() -> None:
+    parser = argparse.ArgumentParser(description="PokeAPI falsa para benchmarks locais.")
+    parser.add_argument("--porta", type=int, default=8001)
+    parser.add_argument("--total", type=int, default=1000, help="Quantidade de pokémons gerados.")
+    parser.add_argument("--latencia-ms", type=float, default=float(os.getenv("STUB_LATENCIA_MS", "0")))
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="Fração das respostas devolvidas como 429 (0 a 1).")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--exportar", default=None, help="Grava as fixtures no layout do api-data neste diretório e sai.")
+    args = parser.parse_args()
+    if args.exportar:
+        print(f"Fixtures gravadas em {exportar_api_data(args.exportar, args.total)}")
+        return
+    base_url = f"http://127.0.0.1:{args.porta}/api/v2"
+    uvicorn.run(criar_app(total=args.total, latencia_ms=args.latencia_ms, base_url=base_url, taxa_429=args.taxa_429),
+                host="127.0.0.1", port=args.porta, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    parse_args_and_run()
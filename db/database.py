@@ -1,13 +1,65 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import time
+
+from db.pool import MetricasPool, classe_pool
+from services.metricas import metricas, registrar_etapa
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Pool de conexões: API e importador dividem o mesmo banco, então os limites são configuráveis.
+# pool_size + max_overflow é o máximo de conexões por processo; quem passar disso espera até pool_timeout.
+POOL_SIZE = int(os.getenv("POKEDEX_DB_POOL_SIZE", "10"))
+POOL_MAX_OVERFLOW = int(os.getenv("POKEDEX_DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.getenv("POKEDEX_DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("POKEDEX_DB_POOL_RECYCLE", "1800"))  # segundos; -1 desliga
+POOL_PRE_PING = os.getenv("POKEDEX_DB_PRE_PING", "1") == "1"
+# engine async (asyncpg) para a leitura quente da API, sem passar pelo threadpool
+DB_ASYNC = os.getenv("POKEDEX_DB_ASYNC", "0") == "1"
+DATABASE_URL_ASYNC = os.getenv("DATABASE_URL_ASYNC")
+
+DRIVERS_ASYNC = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+metricas_pool = MetricasPool()
+metricas_pool_async = MetricasPool()
+
+
+def opcoes_pool(url: str, base: type[QueuePool], metricas: MetricasPool) -> dict:
+    opcoes = {"pool_pre_ping": POOL_PRE_PING, "pool_recycle": POOL_RECYCLE}
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # SQLite em memória usa um pool próprio, de uma conexão
+        return opcoes
+    return {
+        **opcoes,
+        "poolclass": classe_pool(base, metricas),
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+    }
+
+
+def url_async(url: str) -> str:
+    url = make_url(url)
+    return url.set(drivername=DRIVERS_ASYNC[url.get_backend_name()]).render_as_string(hide_password=False)
+
+
+engine = create_engine(DATABASE_URL, **opcoes_pool(DATABASE_URL, QueuePool, metricas_pool))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _url_async = DATABASE_URL_ASYNC or url_async(DATABASE_URL)
+    async_engine = create_async_engine(_url_async, **opcoes_pool(_url_async, AsyncAdaptedQueuePool, metricas_pool_async))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 Base = declarative_base()
 
@@ -16,4 +68,63 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Engine async desligado: defina POKEDEX_DB_ASYNC=1 (e instale o asyncpg).")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def estatisticas_pool() -> dict:
+    dados = {"sync": metricas_pool.estatisticas(engine.pool)}
+    if async_engine is not None:
+        dados["async"] = metricas_pool_async.estatisticas(async_engine.sync_engine.pool)
+    return dados
+
+
+# Tempo de cada consulta e de cada commit, para /metrics e para o perfil da requisição
+# (Server-Timing). Os eventos valem para todos os engines, inclusive o async.
+tempo_consultas = metricas.histograma("pokedex_db_consulta_segundos", "Duração das consultas SQL por operação.", ("operacao",))
+tempo_commits = metricas.histograma("pokedex_db_commit_segundos", "Duração dos commits (flush incluído).")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _inicio_consulta(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _fim_consulta(conn, cursor, statement, parameters, context, executemany) -> None:
+    segundos = time.perf_counter() - conn.info["inicio_consultas"].pop()
+    operacao = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+    tempo_consultas.observar(segundos, operacao)
+    registrar_etapa("db", segundos)
+
+
+@event.listens_for(Engine, "handle_error")
+def _consulta_falhou(contexto) -> None:
+    # consulta que falhou não passa pelo after_cursor_execute
+    if contexto.connection is not None and contexto.connection.info.get("inicio_consultas"):
+        contexto.connection.info["inicio_consultas"].pop()
+
+
+@event.listens_for(Session, "before_commit")
+def _inicio_commit(db: Session) -> None:
+    db.info["inicio_commit"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _fim_commit(db: Session) -> None:
+    inicio = db.info.pop("inicio_commit", None)
+    if inicio is not None:
+        segundos = time.perf_counter() - inicio
+        tempo_commits.observar(segundos)
+        registrar_etapa("commit", segundos)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _commit_desfeito(db: Session, transacao) -> None:
+    db.info.pop("inicio_commit", None)
@@ -0,0 +1,110 @@
+import threading
+from typing import Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import Habilidade, Movimento, Tipo
+
+# Dicionário nome -> id em memória para as tabelas pequenas (tipo, habilidade,
+# movimento), compartilhado pela API e pelo importador. Os nomes que faltam são
+# resolvidos em lote e os ids novos só entram no cache depois do commit.
+LINHAS_POR_INSERT = 1000
+
+
+def insert_do_dialeto(db: Session, tabela):
+    # INSERT com suporte a ON CONFLICT (Postgres em produção, SQLite nos benchmarks)
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(tabela)
+    return postgresql.insert(tabela)
+
+
+def insert_ignorando_conflitos(db: Session, tabela):
+    return insert_do_dialeto(db, tabela).on_conflict_do_nothing()
+
+
+class CacheDimensao:
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self._ids: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def aquecer(self, db: Session) -> None:
+        linhas = db.execute(select(self.modelo.nome, self.modelo.id)).all()
+        with self._lock:
+            self._ids = dict(linhas)
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._ids = {}
+
+    def publicar(self, ids: dict[str, int]) -> None:
+        with self._lock:
+            self._ids.update(ids)
+
+    def resolver(self, db: Session, nomes: Iterable[str]) -> dict[str, int]:
+        # Devolve nome -> id, inserindo os que não existem com um INSERT por lote.
+        # O RETURNING só traz as linhas novas; as que já existiam, ou que outro
+        # processo inseriu primeiro, vêm de um SELECT em seguida.
+        nomes = set(nomes)
+        with self._lock:
+            ids = {n: self._ids[n] for n in nomes if n in self._ids}
+        faltando = sorted(nomes - ids.keys())
+        self.hits += len(ids)
+        self.misses += len(faltando)
+        if not faltando:
+            return ids
+
+        novos: dict[str, int] = {}
+        for i in range(0, len(faltando), LINHAS_POR_INSERT):
+            lote = faltando[i:i + LINHAS_POR_INSERT]
+            consulta = insert_ignorando_conflitos(db, self.modelo).values([{"nome": n} for n in lote])
+            novos.update({nome: id_ for id_, nome in db.execute(consulta.returning(self.modelo.id, self.modelo.nome))})
+
+        existentes: dict[str, int] = {}
+        restantes = [n for n in faltando if n not in novos]
+        for i in range(0, len(restantes), LINHAS_POR_INSERT):
+            lote = restantes[i:i + LINHAS_POR_INSERT]
+            consulta = select(self.modelo.nome, self.modelo.id).where(self.modelo.nome.in_(lote))
+            existentes.update(dict(db.execute(consulta).all()))
+
+        # linhas já commitadas podem ir direto para o cache; as novas esperam o commit
+        self.publicar(existentes)
+        db.info.setdefault("dimensoes_pendentes", []).append((self, novos))
+        return {**ids, **existentes, **novos}
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {"itens": len(self._ids), "hits": self.hits, "misses": self.misses}
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_pendentes(db: Session) -> None:
+    for cache, ids in db.info.pop("dimensoes_pendentes", []):
+        cache.publicar(ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendentes(db: Session) -> None:
+    db.info.pop("dimensoes_pendentes", None)
+
+
+tipos = CacheDimensao(Tipo)
+habilidades = CacheDimensao(Habilidade)
+movimentos = CacheDimensao(Movimento)
+TODAS = (tipos, habilidades, movimentos)
+
+
+def aquecer(db: Session) -> None:
+    for cache in TODAS:
+        cache.aquecer(db)
+
+
+def invalidar() -> None:
+    # usado quando um id em cache deixa de existir (ex: banco recriado)
+    for cache in TODAS:
+        cache.invalidar()
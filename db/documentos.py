@@ -0,0 +1,205 @@
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from db.dimensoes import insert_do_dialeto
+from models import Movimento, Pokemon, PokemonDocumento, PokemonMovimento
+from schemas import PokemonDetalhe
+from services.metricas import medir
+
+# Read model desnormalizado: um documento JSON já serializado por pokémon, com as
+# colunas da listagem ao lado. /pokemon/{nome} e /pokemons leem só esta tabela; a
+# API e o importador regravam os documentos na mesma transação em que mudam o pokémon.
+# Os movimentos (a maior parte do payload) ficam fora do documento: só o total vai nele,
+# e a lista sai de pokemon_movimento em ?include=movimentos e /pokemon/{nome}/movimentos.
+LOTE_DOCUMENTOS = 200
+# documentos gravados antes deste campo existir são refeitos na subida
+CAMPO_VERSAO = '"total_movimentos":'
+ID_MAXIMO = 2**31 - 1  # ids são int4 no banco
+
+
+def id_da_chave(chave: str) -> int | None:
+    # id numérico da chave, ou None se ela deve ser tratada como nome: só dígitos ASCII
+    # ("²".isdigit() é verdadeiro, mas int("²") falha) e dentro do int4 das tabelas
+    if not (chave.isascii() and chave.isdigit()):
+        return None
+    digitos = chave.lstrip("0") or "0"
+    if len(digitos) > len(str(ID_MAXIMO)) or int(digitos) > ID_MAXIMO:
+        return None
+    return int(digitos)
+
+
+def serializar_pokemon(pokemon: Pokemon, total_movimentos: int) -> dict:
+    return {
+        "id": pokemon.id,
+        "nome": pokemon.nome,
+        "altura": pokemon.altura,
+        "peso": pokemon.peso,
+        "sprite": pokemon.sprite,
+        "tipos": [t.nome for t in pokemon.tipos],
+        "habilidades": [h.nome for h in pokemon.habilidades],
+        "total_movimentos": total_movimentos,
+        "evolucoes": [e.nome for e in pokemon.evolucoes]
+    }
+
+
+def codificar(documento: dict) -> bytes:
+    # validado contra o modelo de resposta na gravação; a leitura só devolve os bytes
+    with medir("serializacao"):
+        return orjson.dumps(PokemonDetalhe.model_validate(documento).model_dump(exclude_unset=True))
+
+
+def carregar_pokemons(db: Session, filtro) -> list[Pokemon]:
+    # relações carregadas em lote (uma consulta por relação), sem lazy load por item
+    return (
+        db.query(Pokemon)
+        .options(
+            selectinload(Pokemon.tipos),
+            selectinload(Pokemon.habilidades),
+            selectinload(Pokemon.evolucoes),
+        )
+        .filter(filtro)
+        .all()
+    )
+
+
+def contar_movimentos(db: Session, ids: list[int]) -> dict[int, int]:
+    # um GROUP BY pelo índice (id_pokemon, id_movimento), sem carregar os nomes
+    consulta = (
+        select(PokemonMovimento.id_pokemon, func.count())
+        .where(PokemonMovimento.id_pokemon.in_(ids))
+        .group_by(PokemonMovimento.id_pokemon)
+    )
+    return dict(db.execute(consulta).all())
+
+
+def linha_documento(pokemon: Pokemon, total_movimentos: int) -> dict:
+    documento = serializar_pokemon(pokemon, total_movimentos)
+    return {
+        "id": pokemon.id,
+        "nome": pokemon.nome,
+        "altura": pokemon.altura,
+        "peso": pokemon.peso,
+        "sprite": pokemon.sprite,
+        "tipos": ",".join(documento["tipos"]),
+        "documento": codificar(documento).decode("utf-8"),
+    }
+
+
+def atualizar_documentos(db: Session, ids) -> list[dict]:
+    # Regrava os documentos dos ids a partir das tabelas normalizadas. Sem commit.
+    ids = sorted(set(ids))
+    linhas = []
+    for i in range(0, len(ids), LOTE_DOCUMENTOS):
+        ids_lote = ids[i:i + LOTE_DOCUMENTOS]
+        totais = contar_movimentos(db, ids_lote)
+        lote = [linha_documento(p, totais.get(p.id, 0)) for p in carregar_pokemons(db, Pokemon.id.in_(ids_lote))]
+        if not lote:
+            continue
+        consulta = insert_do_dialeto(db, PokemonDocumento).values(lote)
+        db.execute(consulta.on_conflict_do_update(
+            index_elements=[PokemonDocumento.id],
+            set_={**{c: consulta.excluded[c] for c in lote[0] if c != "id"}, "atualizado_em": func.now()},
+        ))
+        linhas += lote
+    return linhas
+
+
+def consulta_documento(chave: str):
+    # leitura quente: uma consulta por chave primária (ou pelo índice de nome)
+    poke_id = id_da_chave(chave)
+    filtro = PokemonDocumento.id == poke_id if poke_id is not None else PokemonDocumento.nome == chave
+    return select(PokemonDocumento.id, PokemonDocumento.nome, PokemonDocumento.documento).where(filtro)
+
+
+def carregar_documento(db: Session, chave: str) -> tuple[int, str, bytes] | None:
+    linha = db.execute(consulta_documento(chave)).first()
+    if linha is None:
+        return None
+    return linha.id, linha.nome, linha.documento.encode("utf-8")
+
+
+def carregar_documentos(db: Session, chaves: list[str]) -> dict[str, tuple[int, str, bytes]]:
+    # vários documentos numa consulta só (ids pela chave primária, nomes pelo índice)
+    if not chaves:
+        return {}
+    ids = [poke_id for poke_id in map(id_da_chave, chaves) if poke_id is not None]
+    nomes = [c for c in chaves if id_da_chave(c) is None]
+    consulta = select(PokemonDocumento.id, PokemonDocumento.nome, PokemonDocumento.documento).where(
+        PokemonDocumento.id.in_(ids) | PokemonDocumento.nome.in_(nomes)
+    )
+    documentos = {}
+    for linha in db.execute(consulta):
+        documento = linha.id, linha.nome, linha.documento.encode("utf-8")
+        documentos[str(linha.id)] = documentos[linha.nome] = documento
+    return {chave: documentos[chave] for chave in chaves if chave in documentos}
+
+
+async def carregar_documento_async(db: AsyncSession, chave: str) -> tuple[int, str, bytes] | None:
+    # mesma consulta pelo engine async (asyncpg), direto do event loop
+    linha = (await db.execute(consulta_documento(chave))).first()
+    if linha is None:
+        return None
+    return linha.id, linha.nome, linha.documento.encode("utf-8")
+
+
+def consulta_movimentos(chave: str, q: str | None, cursor: int | None, limit: int | None):
+    # movimentos de um pokémon na ordem da PokeAPI, pelo índice (id_pokemon, id_movimento);
+    # o cursor é o id da linha de pokemon_movimento e o total ignora cursor e limit
+    id_pokemon = id_da_chave(chave)
+    if id_pokemon is None:
+        id_pokemon = select(Pokemon.id).where(Pokemon.nome == chave).scalar_subquery()
+    filtros = [PokemonMovimento.id_pokemon == id_pokemon]
+    if q:
+        filtros.append(Movimento.nome.contains(q, autoescape=True))
+    total = (
+        select(func.count()).select_from(PokemonMovimento)
+        .join(Movimento, Movimento.id == PokemonMovimento.id_movimento)
+        .where(*filtros).correlate(None).scalar_subquery()
+    )
+    consulta = (
+        select(Movimento.nome, PokemonMovimento.id, total.label("total"))
+        .join(Movimento, Movimento.id == PokemonMovimento.id_movimento)
+        .where(*filtros)
+        .order_by(PokemonMovimento.id)
+    )
+    if cursor is not None:
+        consulta = consulta.where(PokemonMovimento.id > cursor)
+    if limit is not None:
+        consulta = consulta.limit(limit)
+    return consulta
+
+
+def carregar_movimentos(db: Session, chave: str) -> list[str]:
+    return [nome for nome, _, _ in db.execute(consulta_movimentos(chave, None, None, None))]
+
+
+def carregar_movimentos_lote(db: Session, ids: list[int]) -> dict[int, list[str]]:
+    # movimentos de vários pokémons numa consulta, na ordem da PokeAPI
+    if not ids:
+        return {}
+    consulta = (
+        select(PokemonMovimento.id_pokemon, Movimento.nome)
+        .join(Movimento, Movimento.id == PokemonMovimento.id_movimento)
+        .where(PokemonMovimento.id_pokemon.in_(ids))
+        .order_by(PokemonMovimento.id_pokemon, PokemonMovimento.id)
+    )
+    movimentos = {poke_id: [] for poke_id in ids}
+    for poke_id, nome in db.execute(consulta):
+        movimentos[poke_id].append(nome)
+    return movimentos
+
+
+def preencher_documentos_faltando(db: Session) -> int:
+    # pokémons gravados antes do read model (ou por código antigo) ganham o documento; commit por lote
+    faltando = [
+        poke_id for (poke_id,) in db.execute(
+            select(Pokemon.id).outerjoin(PokemonDocumento, PokemonDocumento.id == Pokemon.id)
+            .where(PokemonDocumento.id.is_(None) | ~PokemonDocumento.documento.contains(CAMPO_VERSAO, autoescape=True))
+        )
+    ]
+    for i in range(0, len(faltando), LOTE_DOCUMENTOS):
+        atualizar_documentos(db, faltando[i:i + LOTE_DOCUMENTOS])
+        db.commit()
+    return len(faltando)
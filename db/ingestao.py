@@ -0,0 +1,150 @@
+import csv
+import io
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from db import dimensoes
+from db.dimensoes import insert_ignorando_conflitos
+from models import Pokemon, PokemonHabilidade, PokemonMovimento, PokemonTipo, TipoEficacia, TipoForca, TipoFraqueza
+from services.cache_negativo import apagar_inexistentes
+from services.notificacoes import CANAL_TIPOS, notificar_alteracao
+
+# Ingestão em lote dos payloads da PokeAPI: poucas instruções por lote em vez de
+# um SELECT/INSERT por tipo, habilidade e movimento de cada pokémon.
+
+
+def copiar_linhas(db: Session, tabela, colunas: list[str], linhas: list[dict]) -> None:
+    # COPY no Postgres (psycopg2); nos outros bancos, executemany
+    if not linhas:
+        return
+    conexao = db.connection()
+    if conexao.dialect.name == "postgresql" and conexao.dialect.driver == "psycopg2":
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for linha in linhas:
+            escritor.writerow([linha[c] for c in colunas])
+        buffer.seek(0)
+        with conexao.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {tabela.name} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        return
+    db.execute(insert(tabela), linhas)
+
+
+def linha_pokemon(dados: dict) -> dict:
+    return {
+        "id": dados["id"],
+        "nome": dados["name"].lower(),
+        "altura": dados.get("height"),
+        "peso": dados.get("weight"),
+        "sprite": (dados.get("sprites") or {}).get("front_default"),
+    }
+
+
+def gravar_associacoes(db: Session, payloads: list[dict]) -> None:
+    # tipos, habilidades e movimentos de vários pokémons: ids do cache de dimensões + COPY
+    tipos = dimensoes.tipos.resolver(db, (t["type"]["name"] for d in payloads for t in d.get("types", [])))
+    habilidades = dimensoes.habilidades.resolver(db, (h["ability"]["name"] for d in payloads for h in d.get("abilities", [])))
+    movimentos = dimensoes.movimentos.resolver(db, (m["move"]["name"] for d in payloads for m in d.get("moves", [])))
+
+    linhas_tipo, linhas_habilidade, linhas_movimento = [], [], []
+    for dados in payloads:
+        poke_id = dados["id"]
+        linhas_tipo += [
+            {"id_pokemon": poke_id, "id_tipo": tipos[n]}
+            for n in dict.fromkeys(t["type"]["name"] for t in dados.get("types", []))
+        ]
+        linhas_habilidade += [
+            {"id_pokemon": poke_id, "id_habilidade": habilidades[n]}
+            for n in dict.fromkeys(h["ability"]["name"] for h in dados.get("abilities", []))
+        ]
+        linhas_movimento += [
+            {"id_pokemon": poke_id, "id_movimento": movimentos[n]}
+            for n in dict.fromkeys(m["move"]["name"] for m in dados.get("moves", []))
+        ]
+
+    copiar_linhas(db, PokemonTipo.__table__, ["id_pokemon", "id_tipo"], linhas_tipo)
+    copiar_linhas(db, PokemonHabilidade.__table__, ["id_pokemon", "id_habilidade"], linhas_habilidade)
+    copiar_linhas(db, PokemonMovimento.__table__, ["id_pokemon", "id_movimento"], linhas_movimento)
+
+
+def gravar_lote_pokemons(db: Session, payloads: list[dict]) -> list[tuple[int, str, list[str]]]:
+    # Grava um lote de pokémons com suas relações, sem commit.
+    # Devolve (id, nome, tipos) só dos que foram inseridos agora; os que já existiam são ignorados.
+    por_id = {dados["id"]: dados for dados in payloads}
+    if not por_id:
+        return []
+
+    existentes = {id_ for (id_,) in db.execute(select(Pokemon.id).where(Pokemon.id.in_(list(por_id))))}
+    novos = [dados for id_, dados in por_id.items() if id_ not in existentes]
+    if not novos:
+        return []
+
+    # ON CONFLICT DO NOTHING: se outro processo inseriu o mesmo pokémon, ele só não volta no RETURNING
+    consulta = insert_ignorando_conflitos(db, Pokemon).values([linha_pokemon(d) for d in novos])
+    inseridos = {id_ for (id_,) in db.execute(consulta.returning(Pokemon.id))}
+    novos = [dados for dados in novos if dados["id"] in inseridos]
+
+    gravar_associacoes(db, novos)
+    # um nome que a PokeAPI respondia 404 e agora existe sai do cache negativo
+    apagar_inexistentes(db, [(dados["id"], dados["name"].lower()) for dados in novos])
+    return [
+        (dados["id"], dados["name"].lower(), list(dict.fromkeys(t["type"]["name"] for t in dados.get("types", []))))
+        for dados in novos
+    ]
+
+
+def substituir_lote_pokemons(db: Session, payloads: list[dict]) -> list[int]:
+    # Atualiza pokémons que mudaram na PokeAPI: colunas por UPDATE em lote e
+    # associações apagadas e regravadas. Sem commit.
+    por_id = {dados["id"]: dados for dados in payloads}
+    if not por_id:
+        return []
+    ids = list(por_id)
+    db.execute(update(Pokemon), [linha_pokemon(d) for d in por_id.values()])
+    for tabela in (PokemonTipo, PokemonHabilidade, PokemonMovimento):
+        db.execute(delete(tabela).where(tabela.id_pokemon.in_(ids)))
+    gravar_associacoes(db, list(por_id.values()))
+    return ids
+
+
+# damage_relations do /type da PokeAPI -> multiplicador, do ponto de vista de quem ataca
+MULTIPLICADORES_ATAQUE = {"double_damage_to": 2.0, "half_damage_to": 0.5, "no_damage_to": 0.0}
+MULTIPLICADORES_DEFESA = {"double_damage_from": 2.0, "half_damage_from": 0.5, "no_damage_from": 0.0}
+
+
+def gravar_relacoes_tipos(db: Session, payloads: list[dict]) -> int:
+    # Substitui tipo_eficacia, tipo_forca e tipo_fraqueza dos tipos recebidos. Sem commit.
+    # Devolve quantos pares atacante/defensor têm multiplicador diferente de 1.
+    if not payloads:
+        return 0
+    relacoes = [(d["name"], d.get("damage_relations") or {}) for d in payloads]
+    nomes = {nome for nome, _ in relacoes}
+    nomes.update(t["name"] for _, r in relacoes for lista in r.values() for t in lista)
+    ids = dimensoes.tipos.resolver(db, nomes)
+
+    eficacia: dict[tuple[int, int], float] = {}
+    linhas_forca, linhas_fraqueza = [], []
+    for nome, r in relacoes:
+        tipo_id = ids[nome]
+        for chave, multiplicador in MULTIPLICADORES_ATAQUE.items():
+            for alvo in r.get(chave, []):
+                eficacia[(tipo_id, ids[alvo["name"]])] = multiplicador
+        for chave, multiplicador in MULTIPLICADORES_DEFESA.items():
+            for atacante in r.get(chave, []):
+                eficacia[(ids[atacante["name"]], tipo_id)] = multiplicador
+        linhas_forca += [{"id_tipo": tipo_id, "id_forte_contra": ids[t["name"]]} for t in r.get("double_damage_to", [])]
+        linhas_fraqueza += [{"id_tipo": tipo_id, "id_fraco_contra": ids[t["name"]]} for t in r.get("double_damage_from", [])]
+
+    tipo_ids = [ids[nome] for nome, _ in relacoes]
+    db.execute(delete(TipoEficacia).where(TipoEficacia.id_atacante.in_(tipo_ids) | TipoEficacia.id_defensor.in_(tipo_ids)))
+    db.execute(delete(TipoForca).where(TipoForca.id_tipo.in_(tipo_ids)))
+    db.execute(delete(TipoFraqueza).where(TipoFraqueza.id_tipo.in_(tipo_ids)))
+    copiar_linhas(db, TipoEficacia.__table__, ["id_atacante", "id_defensor", "multiplicador"], [
+        {"id_atacante": a, "id_defensor": d, "multiplicador": m} for (a, d), m in eficacia.items()
+    ])
+    copiar_linhas(db, TipoForca.__table__, ["id_tipo", "id_forte_contra"], linhas_forca)
+    copiar_linhas(db, TipoFraqueza.__table__, ["id_tipo", "id_fraco_contra"], linhas_fraqueza)
+    # avisa os workers da API para recarregar a matriz de tipos
+    notificar_alteracao(db, tipo_ids, canal=CANAL_TIPOS)
+    return len(eficacia)
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+# Métricas do pool de conexões: quanto tempo cada checkout esperou por uma conexão,
+# quantos estouraram o pool_timeout e quão cheio o pool está agora.
+AMOSTRAS_ESPERA = 1000
+
+
+class MetricasPool:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._esperas: deque[float] = deque(maxlen=AMOSTRAS_ESPERA)  # segundos, últimos checkouts
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar(self, segundos: float) -> None:
+        with self._lock:
+            self._esperas.append(segundos)
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+    def registrar_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def estatisticas(self, pool) -> dict:
+        with self._lock:
+            esperas = sorted(self._esperas)
+            dados = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "espera_media_ms": round(self.espera_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "espera_p99_ms": round(esperas[max(int(len(esperas) * 0.99) - 1, 0)] * 1000, 3) if esperas else 0.0,
+                "espera_max_ms": round(self.espera_max * 1000, 3),
+            }
+        if isinstance(pool, QueuePool):
+            # capacidade = pool_size + max_overflow; saturação 1.0 = próximo checkout espera
+            capacidade = pool.size() + pool._max_overflow
+            dados.update({
+                "tamanho": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "em_uso": pool.checkedout(),
+                "livres": pool.checkedin(),
+                "overflow_em_uso": max(pool.overflow(), 0),
+                "saturacao": round(pool.checkedout() / capacidade, 3) if capacidade > 0 else 0.0,
+            })
+        return dados
+
+
+def classe_pool(base: type[QueuePool], metricas: MetricasPool) -> type[QueuePool]:
+    # subclasse que mede a espera no _do_get; sobrevive ao recreate() do engine (dispose, failover)
+    class PoolMedido(base):
+
+        def _do_get(self):
+            inicio = time.perf_counter()
+            try:
+                conexao = super()._do_get()
+            except exc.TimeoutError:
+                metricas.registrar_timeout()
+                raise
+            metricas.registrar(time.perf_counter() - inicio)
+            return conexao
+
+    return PoolMedido
@@ -1,15 +1,133 @@
-from fastapi import FastAPI, Depends
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import orjson
+from fastapi import FastAPI, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-import requests
 
 # importando o banco e modelos
-from db.database import get_db, Base, engine
+from db import dimensoes
+from db.database import get_db, Base, engine, SessionLocal, AsyncSessionLocal, async_engine, estatisticas_pool
+from db.dimensoes import insert_ignorando_conflitos
+from db.documentos import (
+    atualizar_documentos, carregar_documento, carregar_documento_async, carregar_documentos, carregar_movimentos,
+    carregar_movimentos_lote, consulta_movimentos, id_da_chave, preencher_documentos_faltando,
+)
+from db.ingestao import gravar_lote_pokemons
 from models import *
+from schemas import (
+    ConfrontoEntrada, ConfrontoResultado, Eficacia, EficaciaPokemon, Erro, ItemLote, LoteEntrada, PokemonDetalhe,
+    PokemonResumo, Sugestoes,
+)
+from services.busca import indice_busca
+from services.cache import cache_respostas
+from services.cache_negativo import cache_negativo
+from services.metricas import MiddlewareMetricas, medir, metricas
+from services.nomes import indice_nomes
+from services.notificacoes import CANAL_TIPOS, OuvinteAlteracoes, notificar_alteracao
+from services.pokeapi import CircuitoAberto, ErroUpstream, PayloadInvalido, pokeapi, extrair_nomes_cadeia
+from services.popularidade import POPULARIDADE_INTERVALO, popularidade
+from services.prefetch import fila_prefetch
+from services.singleflight import buscas_em_voo, normalizar_chave, uma_vez_entre_workers
+from services.tipos import TipoDesconhecido, matriz_tipos
 
 # cria todas as tabelas definidas nos modelos
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+# gravações feitas pelo importador ou por outros workers invalidam o cache deste processo
+ouvinte_alteracoes = OuvinteAlteracoes(engine)
+ouvinte_alteracoes.registrar(lambda ids: cache_respostas.invalidar(*ids))
+ouvinte_alteracoes.registrar(lambda ids: com_sessao(matriz_tipos.atualizar_pokemons, ids))
+ouvinte_alteracoes.registrar(lambda ids: com_sessao(indice_busca.atualizar, ids))
+ouvinte_alteracoes.registrar(lambda ids: com_sessao(indice_nomes.atualizar, ids))
+ouvinte_alteracoes.registrar(lambda ids: com_sessao(cache_negativo.esquecer_pokemons, ids))
+ouvinte_alteracoes.registrar(lambda ids: com_sessao(matriz_tipos.carregar), canal=CANAL_TIPOS)
+
+# catálogo de nomes da PokeAPI: com ele, nomes inexistentes são recusados sem ir à PokeAPI
+CARREGAR_CATALOGO = os.getenv("POKEDEX_CATALOGO", "1") == "1"
+# documentos do read model carregados no cache de respostas na subida
+AQUECER_CACHE = os.getenv("POKEDEX_AQUECER_CACHE", "1") == "1"
+# os N nomes mais pedidos (tabela pokemon_popularidade) vão para o cache antes dos demais;
+# os que não estiverem no banco são buscados na PokeAPI pela fila de prefetch
+AQUECER_TOP_N = int(os.getenv("POKEDEX_AQUECER_TOP_N", "100"))
+# membros da cadeia evolutiva buscados em segundo plano; com 0, dentro da requisição
+PREFETCH_CADEIAS = os.getenv("POKEDEX_PREFETCH", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # cliente HTTP compartilhado (pool de conexões) durante toda a vida da aplicação
+    await pokeapi.iniciar()
+    # read model: completa documentos que faltarem e já deixa os mais usados em memória
+    await run_in_threadpool(com_sessao, preencher_documentos_faltando)
+    fila_prefetch.iniciar()
+    if AQUECER_TOP_N > 0:
+        await aquecer_mais_pedidos()
+    if AQUECER_CACHE:
+        await run_in_threadpool(com_sessao, aquecer_cache)
+    # dicionários nome -> id de tipos, habilidades e movimentos já quentes
+    await run_in_threadpool(com_sessao, dimensoes.aquecer)
+    # matriz de eficácia e tipos de cada pokémon para os endpoints de confronto
+    await run_in_threadpool(com_sessao, matriz_tipos.carregar)
+    # bitsets por tipo, habilidade e movimento para /pokemon/search
+    await run_in_threadpool(com_sessao, indice_busca.carregar)
+    # trie/trigramas dos nomes do banco; o catálogo completo chega em segundo plano
+    await run_in_threadpool(com_sessao, indice_nomes.carregar)
+    tarefa_catalogo = asyncio.create_task(carregar_catalogo()) if CARREGAR_CATALOGO else None
+    tarefa_popularidade = asyncio.create_task(gravar_popularidade())
+    ouvinte_alteracoes.iniciar()
+    yield
+    ouvinte_alteracoes.parar()
+    if tarefa_catalogo is not None:
+        tarefa_catalogo.cancel()
+    tarefa_popularidade.cancel()
+    await run_in_threadpool(com_sessao, popularidade.gravar)
+    # cadeias ainda na fila têm alguns segundos para terminar antes do cliente HTTP fechar
+    await fila_prefetch.parar()
+    await pokeapi.fechar()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+async def aquecer_mais_pedidos():
+    chaves = await run_in_threadpool(com_sessao, popularidade.mais_pedidos, AQUECER_TOP_N)
+    faltando = await run_in_threadpool(com_sessao, aquecer_populares, chaves)
+    for chave in faltando:
+        if not cache_negativo.contem(chave):
+            fila_prefetch.agendar(f"pokemon:{chave}", lambda chave=chave: buscas_em_voo.executar(chave, lambda: buscar_e_salvar(chave)))
+
+
+async def gravar_popularidade():
+    while True:
+        await asyncio.sleep(POPULARIDADE_INTERVALO)
+        try:
+            await run_in_threadpool(com_sessao, popularidade.gravar)
+        except Exception as e:
+            # as contagens voltam para a memória e vão na próxima gravação
+            print(f"[Aviso] contagens de popularidade não gravadas: {e}")
+
+
+async def carregar_catalogo():
+    try:
+        indice_nomes.carregar_catalogo(await pokeapi.buscar_catalogo())
+    except ErroUpstream as e:
+        # sem catálogo, nomes desconhecidos continuam indo à PokeAPI
+        print(f"[Aviso] catálogo de nomes não carregado: {e}")
+
+
+# orjson em vez do json da biblioteca padrão para tudo que não volta como bytes prontos
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# latência por rota, consultas por requisição e Server-Timing sob demanda (X-Pokedex-Perfil: 1)
+app.add_middleware(MiddlewareMetricas)
+
+MAX_TENTATIVAS_ESCRITA = 5
+LIMITE_MAXIMO_LISTA = 1000  # /pokemons e /pokemon/search
+LIMITE_LOTE = 50  # nomes por /pokemon/batch
 
 
 @app.get("/")
@@ -18,164 +136,810 @@ def root():
 
 
 
-def get_or_create_tipo(db: Session, nome: str):
-    
-    tipo = db.query(Tipo).filter(Tipo.nome == nome).first()
-    if not tipo:
-        tipo = Tipo(nome=nome)
-        db.add(tipo)
-        db.flush()  
-    return tipo
-
-def get_or_create_habilidade(db: Session, nome: str):
-    habilidade = db.query(Habilidade).filter(Habilidade.nome == nome).first()
-    if not habilidade:
-        habilidade = Habilidade(nome=nome)
-        db.add(habilidade)
-        db.flush()
-    return habilidade
-
-def get_or_create_movimento(db: Session, nome: str):
-    movimento = db.query(Movimento).filter(Movimento.nome == nome).first()
-    if not movimento:
-        movimento = Movimento(nome=nome)
-        db.add(movimento)
-        db.flush()
-    return movimento
-
-
-
-@app.get("/pokemon/{nome}")
-def pegar_pokemon(nome: str, db: Session = Depends(get_db)):
-    nome = nome.lower()
-    pokemon_db = db.query(Pokemon).filter(Pokemon.nome == nome).first()
-
-    if pokemon_db:  # busca a informação no banco
-        return {
-            "id": pokemon_db.id,
-            "nome": pokemon_db.nome,
-            "altura": pokemon_db.altura,
-            "peso": pokemon_db.peso,
-            "sprite": pokemon_db.sprite,
-            "tipos": [t.nome for t in pokemon_db.tipos],
-            "habilidades": [h.nome for h in pokemon_db.habilidades],
-            "movimentos": [m.nome for m in pokemon_db.movimentos],
-            "evolucoes": [e.nome for e in pokemon_db.evolucoes]
-        }
-
-    # se não tiver no banco, vai buscar na API
-    url = f"https://pokeapi.co/api/v2/pokemon/{nome}"
-    resposta = requests.get(url)
-
-    if resposta.status_code != 200:
-        return {"erro": "Pokemon não encontrado."}, 404
-
-    dados = resposta.json()
-
-    # criação do Pokémon
-    novo_pokemon = Pokemon(
-        id=dados["id"],
-        nome=dados["name"].lower(),
-        altura=dados["height"],
-        peso=dados["weight"],
-        sprite=dados["sprites"]["front_default"]
+def com_sessao(funcao, *args):
+    # sessão curta, aberta e fechada dentro da mesma thread do threadpool
+    db = SessionLocal()
+    try:
+        return funcao(db, *args)
+    finally:
+        db.close()
+
+
+def chave_impossivel(chave: str) -> bool:
+    # vazia ou id fora do int4: 404 sem ir ao banco nem à PokeAPI
+    return not chave or (chave.isascii() and chave.isdigit() and id_da_chave(chave) is None)
+
+
+def filtro_pokemon(nome: str):
+    # aceita tanto o nome quanto o id da PokeAPI
+    poke_id = id_da_chave(nome)
+    if poke_id is not None:
+        return Pokemon.id == poke_id
+    return Pokemon.nome == nome
+
+
+def carregar_pokemon(db: Session, nome: str) -> tuple[int, str, bytes] | None:
+    # (id, nome, JSON pronto) direto do read model: uma consulta, sem ORM
+    documento = carregar_documento(db, nome)
+    if documento is not None:
+        return documento
+    # pokémon gravado sem documento (ex: por uma versão antiga do importador): monta e grava agora
+    poke_id = db.execute(select(Pokemon.id).where(filtro_pokemon(nome))).scalar()
+    if poke_id is None:
+        return None
+    atualizar_documentos(db, [poke_id])
+    db.commit()
+    return carregar_documento(db, str(poke_id))
+
+
+def aquecer_cache(db: Session) -> int:
+    # enche o cache de respostas com os documentos até o limite de bytes
+    geracao = cache_respostas.geracao()
+    consulta = (
+        select(PokemonDocumento.id, PokemonDocumento.nome, PokemonDocumento.documento)
+        .order_by(PokemonDocumento.id)
+        .execution_options(yield_per=TAMANHO_LOTE_STREAM)
     )
+    total = 0
+    for poke_id, nome, documento in db.execute(consulta):
+        corpo = documento.encode("utf-8")
+        if cache_respostas.estatisticas()["bytes"] + len(corpo) > cache_respostas.max_bytes:
+            break
+        cache_respostas.guardar(poke_id, nome, corpo, geracao)
+        total += 1
+    return total
+
+
+def aquecer_populares(db: Session, chaves: list[str]) -> list[str]:
+    # documentos dos mais pedidos direto no cache; devolve as chaves que não estão no banco
+    geracao = cache_respostas.geracao()
+    faltando = []
+    for chave in chaves:
+        documento = carregar_documento(db, chave)
+        if documento is None:
+            faltando.append(chave)
+            continue
+        poke_id, nome, corpo = documento
+        cache_respostas.guardar(poke_id, nome, corpo, geracao)
+    return faltando
+
+
+def nomes_existentes(db: Session, nomes: list[str]) -> set[str]:
+    if not nomes:
+        return set()
+    return {n for (n,) in db.query(Pokemon.nome).filter(Pokemon.nome.in_(nomes)).all()}
+
+
+def salvar_pokemon(db: Session, dados: dict) -> tuple[int, str, bytes]:
+    # roda numa thread do threadpool: toda a escrita no banco fica fora do event loop
+    for tentativa in range(1, MAX_TENTATIVAS_ESCRITA + 1):
+        try:
+            return _salvar_pokemon(db, dados)
+        except IntegrityError:
+            # outra requisição inseriu o mesmo pokémon antes de nós, ou algum id
+            # do cache de dimensões ficou velho (ex: banco recriado)
+            db.rollback()
+            dimensoes.invalidar()
+            existente = carregar_pokemon(db, str(dados["id"]))
+            if existente:
+                return existente
+            if tentativa == MAX_TENTATIVAS_ESCRITA:
+                raise
 
-    db.add(novo_pokemon)
-
-    # associa os tipos usando a função get_or_create_tipo
-    for t in dados["types"]:
-        tipo_nome = t["type"]["name"]
-        tipo_db = get_or_create_tipo(db, tipo_nome)
-        novo_pokemon.tipos.append(tipo_db)
-    #associando as habilidades
-    for h in dados["abilities"]:
-        habilidade_nome =h["ability"]["name"]
-        habilidade_db = get_or_create_habilidade(db, habilidade_nome)
-        novo_pokemon.habilidades.append(habilidade_db)
-    
-    for m in dados["moves"]:
-        movimento_nome = m["move"]["name"]
-        movimento_db = get_or_create_movimento(db, movimento_nome)
-        novo_pokemon.movimentos.append(movimento_db)
-
-    #associando as Evoluções
-    evol_url = f"https://pokeapi.co/api/v2/pokemon-species/{nome}"
-    evol_resposta = requests.get(evol_url)
-    if evol_resposta.status_code == 200:
-        evol_data = evol_resposta.json()
-        chain_url = evol_data["evolution_chain"]["url"]
-        chain_resposta = requests.get(chain_url)
-        if chain_resposta.status_code == 200:
-            chain = chain_resposta.json()["chain"]
-
-            def parse_chain(chain_node):
-                nome_chain = chain_node["species"]["name"].lower()
-                if nome_chain != nome:
-                    evo_db = db.query(Pokemon).filter(Pokemon.nome == nome_chain).first()
-                    
-                    if not evo_db:
-                        evol_url = f"https://pokeapi.co/api/v2/pokemon/{nome_chain}"
-                        evo_resposta = requests.get(evol_url)
-                        if evo_resposta.status_code == 200:
-                            evo_dados = evo_resposta.json()
-                            evo_db = Pokemon(
-                                id=evo_dados["id"],
-                                nome=evo_dados["name"].lower(),
-                                altura=evo_dados["height"],
-                                peso=evo_dados["weight"],
-                                sprite=evo_dados["sprites"]["front_default"]
-                            )
-                            db.add(evo_db)
-
-                            # Associa tipos, habilidades e movimentos da evolução
-                            for t in evo_dados["types"]:
-                                tipo_db = get_or_create_tipo(db, t["type"]["name"])
-                                evo_db.tipos.append(tipo_db)
-                            for h in evo_dados["abilities"]:
-                                hab_db = get_or_create_habilidade(db, h["ability"]["name"])
-                                evo_db.habilidades.append(hab_db)
-                            for m in evo_dados["moves"]:
-                                mov_db = get_or_create_movimento(db, m["move"]["name"])
-                                evo_db.movimentos.append(mov_db)
-                        
-                            db.flush()  # garante que evo_db tenha ID
-
-                    if evo_db:
-                        novo_pokemon.evolucoes.append(evo_db)
-                for next_node in chain_node["evolves_to"]:
-                    parse_chain(next_node)
-            
-            parse_chain(chain)
-
-    # commit único após adicionar Pokémon e tipos
+
+def _salvar_pokemon(db: Session, dados: dict) -> tuple[int, str, bytes]:
+    # só o pokémon pedido; a cadeia vem depois, em segundo plano
+    _salvar_pokemons(db, [dados])
+    return carregar_pokemon(db, str(dados["id"]))
+
+
+def salvar_pokemons(db: Session, lista: list[dict]) -> dict[int, tuple[int, str, bytes]]:
+    # vários pokémons numa transação (misses de /pokemon/batch); devolve os documentos por id
+    for tentativa in range(1, MAX_TENTATIVAS_ESCRITA + 1):
+        try:
+            _salvar_pokemons(db, lista)
+            break
+        except IntegrityError:
+            # mesmo tratamento de salvar_pokemon: a próxima volta ignora os que outro processo gravou
+            db.rollback()
+            dimensoes.invalidar()
+            if tentativa == MAX_TENTATIVAS_ESCRITA:
+                raise
+    ids = [str(dados["id"]) for dados in lista]
+    documentos = carregar_documentos(db, ids)
+    for chave in ids:
+        if chave not in documentos:
+            documentos[chave] = carregar_pokemon(db, chave)
+    return {int(chave): documento for chave, documento in documentos.items() if documento}
+
+
+def _salvar_pokemons(db: Session, lista: list[dict]) -> list[int]:
+    # ids de tipo/habilidade/movimento do cache; documentos do read model na mesma transação
+    inseridos = gravar_lote_pokemons(db, lista)
+    if not inseridos:
+        # outro processo gravou os mesmos pokémons primeiro
+        db.rollback()
+        return []
+    gravados = [poke_id for poke_id, _, _ in inseridos]
+    atualizar_documentos(db, gravados)
+    notificar_alteracao(db, gravados)
     db.commit()
-    db.refresh(novo_pokemon)
+    depois_de_gravar(db, inseridos, gravados)
+    return gravados
+
+
+def depois_de_gravar(db: Session, inseridos: list[tuple[int, str, list[str]]], alterados: list[int]) -> None:
+    # caches e índices deste processo; os outros workers recebem o NOTIFY. Pokémons recém
+    # inseridos não tinham nada no cache para invalidar: a busca que os gravou guarda a resposta
+    novos = {poke_id for poke_id, _, _ in inseridos}
+    cache_respostas.invalidar(*(poke_id for poke_id in alterados if poke_id not in novos))
+    matriz_tipos.registrar_pokemons(inseridos)
+    indice_busca.atualizar(db, alterados)
+    indice_nomes.atualizar(db, alterados)
+    cache_negativo.esquecer(*(chave for poke_id, nome, _ in inseridos for chave in (str(poke_id), nome)))
+
+
+def ligar_cadeia(db: Session, nomes_cadeia: list[str], novas: dict[str, dict]) -> int:
+    # membros novos gravados em lote e todos os membros da cadeia ligados entre si,
+    # na ordem da cadeia, como faz a fase de relações do importador
+    for tentativa in range(1, MAX_TENTATIVAS_ESCRITA + 1):
+        try:
+            return _ligar_cadeia(db, nomes_cadeia, novas)
+        except IntegrityError:
+            # membro gravado por outra requisição no meio do caminho: a próxima volta o ignora
+            db.rollback()
+            dimensoes.invalidar()
+            if tentativa == MAX_TENTATIVAS_ESCRITA:
+                raise
+
+
+def _ligar_cadeia(db: Session, nomes_cadeia: list[str], novas: dict[str, dict]) -> int:
+    inseridos = gravar_lote_pokemons(db, list(novas.values()))
+    ids_cadeia = dict(db.execute(select(Pokemon.nome, Pokemon.id).where(Pokemon.nome.in_(nomes_cadeia))).all())
+    # o nome da espécie nem sempre é o nome do pokémon (ex: deoxys -> deoxys-normal)
+    ids_cadeia.update({n: e["id"] for n, e in novas.items()})
+    membros = list(dict.fromkeys(ids_cadeia[n] for n in nomes_cadeia if n in ids_cadeia))
+    evolucoes = [
+        {"id_pokemon": poke_id, "id_evolucao": evo_id} for poke_id in membros for evo_id in membros if evo_id != poke_id
+    ]
+    ligados = []
+    if evolucoes:
+        consulta = insert_ignorando_conflitos(db, PokemonEvolucao).values(evolucoes).returning(PokemonEvolucao.id_pokemon)
+        ligados = [poke_id for (poke_id,) in db.execute(consulta)]
+
+    alterados = list(dict.fromkeys([*(poke_id for poke_id, _, _ in inseridos), *ligados]))
+    if not alterados:
+        db.rollback()
+        return 0
+    atualizar_documentos(db, alterados)
+    notificar_alteracao(db, alterados)
+    db.commit()
+    depois_de_gravar(db, inseridos, alterados)
+    return len(alterados)
+
+
+async def buscar_cadeia(nome: str, dados: dict, especie: dict | None) -> list[str]:
+    # nomes da cadeia em ordem, com o pokémon pedido no lugar da própria espécie
+    # (formas alternativas, ex: deoxys-normal, não têm espécie com o mesmo nome)
+    if especie is None:
+        especie_url = dados.get("species", {}).get("url")
+        if not especie_url:
+            return []
+        especie = await pokeapi.buscar_json(especie_url)
+        if especie is None:
+            return []
+
+    chain_url = (especie.get("evolution_chain") or {}).get("url")
+    if not chain_url:
+        return []
+    cadeia = await pokeapi.buscar_cadeia_evolutiva(chain_url)
+    if cadeia is None:
+        return []
+    nome_especie = especie.get("name", nome)
+    return list(dict.fromkeys(nome if n == nome_especie else n for n in extrair_nomes_cadeia(cadeia["chain"])))
+
+
+async def completar_cadeia(dados: dict) -> int:
+    # em segundo plano, depois da resposta: espécie, cadeia e membros que faltam no banco
+    nome_api = dados["name"].lower()
+    nomes_cadeia = await buscar_cadeia(nome_api, dados, None)
+    if len(nomes_cadeia) < 2:
+        return 0
+    ja_salvos = await run_in_threadpool(com_sessao, nomes_existentes, nomes_cadeia)
+    faltando = [n for n in nomes_cadeia if n not in ja_salvos]
+    resultados = await asyncio.gather(*(pokeapi.buscar_pokemon(n) for n in faltando))
+    novas = {n: e for n, e in zip(faltando, resultados) if e}
+    return await run_in_threadpool(com_sessao, ligar_cadeia, nomes_cadeia, novas)
+
+
+async def buscar_e_salvar(nome: str) -> tuple[int, str, bytes] | None:
+    # caminho de cache-miss: roda uma única vez por nome graças ao single-flight e, com
+    # POKEDEX_ADVISORY_LOCK=1, uma vez entre todos os workers
+    async def reler() -> tuple[bool, tuple[int, str, bytes] | None]:
+        # outro worker (ou uma busca anterior) pode ter salvo depois da leitura de quem chamou
+        pokemon = await run_in_threadpool(com_sessao, carregar_pokemon, nome)
+        if pokemon:
+            return True, pokemon
+        # outro worker já viu a PokeAPI responder 404 para este nome
+        if await run_in_threadpool(com_sessao, cache_negativo.contem_no_banco, nome):
+            return True, None
+        return False, None
+
+    pronto, pokemon = await reler()
+    if pronto:
+        return pokemon
+    return await uma_vez_entre_workers(nome, reler, lambda: buscar_na_pokeapi(nome))
+
+
+async def buscar_na_pokeapi(nome: str) -> tuple[int, str, bytes] | None:
+    # vai buscar na API só o pokémon pedido
+    dados = await pokeapi.buscar_pokemon(nome)
+    if dados is None:
+        await run_in_threadpool(com_sessao, cache_negativo.registrar, nome)
+        return None
+    pokemon = await run_in_threadpool(com_sessao, salvar_pokemon, dados)
+
+    if not PREFETCH_CADEIAS:
+        await completar_cadeia(dados)
+        return await run_in_threadpool(com_sessao, carregar_pokemon, str(dados["id"]))
+    agendar_cadeia(dados)
+    return pokemon
+
+
+def agendar_cadeia(dados: dict) -> None:
+    # evoluções: a resposta sai sem esperar; a fila busca e liga a cadeia, uma vez por espécie
+    chave = dados.get("species", {}).get("url") or dados["name"].lower()
+    fila_prefetch.agendar(f"cadeia:{chave}", lambda: completar_cadeia(dados))
+
+
+async def buscar_e_salvar_lote(chaves: list[str]) -> dict[str, tuple[int, str, bytes] | Exception | None]:
+    # cache-miss de vários nomes: buscas na PokeAPI em paralelo e uma gravação só para todos
+    # outra busca pode ter gravado (ou visto o 404) enquanto esperávamos
+    resultados: dict = await run_in_threadpool(com_sessao, carregar_documentos, chaves)
+    chaves = [chave for chave in chaves if chave not in resultados]
+    registrados = await run_in_threadpool(com_sessao, cache_negativo.contidos_no_banco, chaves)
+    resultados.update({chave: None for chave in registrados})
+    chaves = [chave for chave in chaves if chave not in registrados]
+    respostas = await asyncio.gather(*(pokeapi.buscar_pokemon(chave) for chave in chaves), return_exceptions=True)
+    encontrados = {}
+    for chave, resposta in zip(chaves, respostas):
+        if isinstance(resposta, asyncio.CancelledError):
+            raise resposta
+        if isinstance(resposta, Exception):
+            # erro só deste nome: vira item com erro, os outros seguem
+            avisar_falha_lote(chave, resposta)
+            resultados[chave] = resposta
+        elif resposta is None:
+            await run_in_threadpool(com_sessao, cache_negativo.registrar, chave)
+            resultados[chave] = None
+        else:
+            encontrados[chave] = resposta
+    if encontrados:
+        lista = list({dados["id"]: dados for dados in encontrados.values()}.values())
+        documentos = await salvar_lote(lista)
+        for chave, dados in encontrados.items():
+            resultados[chave] = documentos.get(dados["id"])
+        lista = [dados for dados in lista if isinstance(documentos.get(dados["id"]), tuple)]
+        if PREFETCH_CADEIAS:
+            for dados in lista:
+                agendar_cadeia(dados)
+        else:
+            await asyncio.gather(*(completar_cadeia(dados) for dados in lista))
+            # documentos relidos com as evoluções
+            documentos = await run_in_threadpool(com_sessao, carregar_documentos, [str(dados["id"]) for dados in lista])
+            for chave, dados in encontrados.items():
+                resultados[chave] = documentos.get(str(dados["id"]), resultados[chave])
+    return resultados
+
+
+async def salvar_lote(lista: list[dict]) -> dict[int, tuple[int, str, bytes] | Exception]:
+    # uma transação para o lote; se ela falhar (ex: payload com campo faltando), cada
+    # pokémon é gravado sozinho e só os que falharem voltam como erro
+    try:
+        return await run_in_threadpool(com_sessao, salvar_pokemons, lista)
+    except Exception as e:
+        if len(lista) == 1:
+            avisar_falha_lote(str(lista[0]["id"]), e)
+            return {lista[0]["id"]: e}
+    documentos = {}
+    for dados in lista:
+        try:
+            documentos.update(await run_in_threadpool(com_sessao, salvar_pokemons, [dados]))
+        except Exception as e:
+            avisar_falha_lote(str(dados["id"]), e)
+            documentos[dados["id"]] = e
+    return documentos
+
+
+def avisar_falha_lote(chave: str, erro: Exception) -> None:
+    if not isinstance(erro, ErroUpstream) or isinstance(erro, PayloadInvalido):
+        print(f"[Aviso] /pokemon/batch: {chave} falhou: {erro.__class__.__name__}: {erro}")
+
+
+# declarada antes de /pokemon/{nome} para "search" não ser tratado como nome
+@app.get("/pokemon/search", response_model=list[PokemonResumo])
+async def buscar_pokemons(
+    tipos: str | None = None,
+    habilidades: str | None = None,
+    movimentos: str | None = None,
+    altura_min: int | None = None,
+    altura_max: int | None = None,
+    peso_min: int | None = None,
+    peso_max: int | None = None,
+    limit: int | None = Query(None, ge=1, le=LIMITE_MAXIMO_LISTA),
+    cursor: int | None = None,
+):
+    # filtros combinados com AND, resolvidos no índice em memória (services/busca.py)
+    total, resultado = indice_busca.buscar(
+        tipos=parametro_lista(tipos),
+        habilidades=parametro_lista(habilidades),
+        movimentos=parametro_lista(movimentos),
+        altura_min=altura_min, altura_max=altura_max,
+        peso_min=peso_min, peso_max=peso_max,
+        cursor=cursor, limit=limit + 1 if limit is not None else None,
+    )
+    # um item a mais só para saber se existe próxima página
+    proxima = limit is not None and len(resultado) > limit
+    if proxima:
+        resultado = resultado[:limit]
+    resposta = ORJSONResponse(content=resultado, headers={"X-Total": str(total)})
+    if proxima:
+        resposta.headers["X-Proximo-Cursor"] = str(resultado[-1]["id"])
+    return resposta
+
+
+@app.get("/pokemon/suggest", response_model=Sugestoes)
+async def sugerir_pokemons(q: str, limit: int = Query(10, ge=1, le=50)):
+    # autocomplete: prefixo pela trie e, se faltar, nomes parecidos (trigramas + distância de edição)
+    return ORJSONResponse(content={"q": q, "sugestoes": indice_nomes.sugerir(q, limit)})
+
+
+def resposta_nao_encontrado(nome: str) -> ORJSONResponse:
+    return ORJSONResponse(status_code=404, content={"erro": "Pokemon não encontrado.", "sugestoes": indice_nomes.sugerir(nome, 5)})
+
+
+# partes do detalhe que ficam fora do documento e só vêm quando pedidas em ?include=
+INCLUDES_DETALHE = {"movimentos"}
+
+
+def include_invalido(incluir: list[str]) -> ORJSONResponse | None:
+    invalidos = [i for i in incluir if i not in INCLUDES_DETALHE]
+    if invalidos:
+        return ORJSONResponse(status_code=400, content={"erro": f"include inválido: {', '.join(invalidos)}"})
+    return None
 
-    return {
-        "id": novo_pokemon.id,
-        "nome": novo_pokemon.nome,
-        "altura": novo_pokemon.altura,
-        "peso": novo_pokemon.peso,
-        "sprite": novo_pokemon.sprite,
-        "tipos": [tipo.nome for tipo in novo_pokemon.tipos],
-        "habilidades": [h.nome for h in novo_pokemon.habilidades],
-        "movimentos": [m.nome for m in novo_pokemon.movimentos],
-        "evolucoes": [e.nome for e in novo_pokemon.evolucoes]
-    }
 
+async def buscar_faltando(chaves: list[str]) -> list:
+    # nomes fora do banco: os que já têm uma busca em voo esperam por ela; os outros
+    # entram numa busca em lote, registrada no single-flight nome a nome
+    # (erro de digitação: com o catálogo carregado, nem vai à PokeAPI)
+    validas = [chave for chave in chaves if not indice_nomes.catalogo_carregado or indice_nomes.existe(chave)]
+    livres = [chave for chave in validas if not buscas_em_voo.em_andamento(chave)]
+    lote = asyncio.ensure_future(buscar_e_salvar_lote(livres)) if livres else None
 
-@app.get("/pokemons")
-def listar_pokemons(db: Session = Depends(get_db)):
-    pokemons = db.query(Pokemon).all()
+    async def do_lote(chave: str):
+        resultado = (await lote)[chave]
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
 
+    # registradas antes de qualquer await, para outra requisição já encontrar as buscas em voo
+    tarefas = {chave: buscas_em_voo.iniciar(chave, lambda chave=chave: do_lote(chave)) for chave in validas}
+
+    async def resolver(chave: str):
+        return await asyncio.shield(tarefas[chave]) if chave in tarefas else None
+
+    return await asyncio.gather(*(resolver(chave) for chave in chaves), return_exceptions=True)
+
+
+async def carregar_lote(chaves: list[str]) -> dict[str, tuple[int, str, bytes] | Exception | None]:
+    # cache em memória, depois uma consulta ao read model para todos os que faltarem e,
+    # para os que nem no banco estão, as buscas na PokeAPI em paralelo
+    geracao = cache_respostas.geracao()
+    resultados = {}
+    no_banco = []
+    for chave in chaves:
+        item = cache_respostas.obter_item(chave)
+        if item is not None:
+            resultados[chave] = item
+        elif chave_impossivel(chave) or cache_negativo.contem(chave):
+            resultados[chave] = None
+        else:
+            no_banco.append(chave)
+
+    documentos = await run_in_threadpool(com_sessao, carregar_documentos, no_banco) if no_banco else {}
+    for documento in documentos.values():
+        cache_respostas.guardar(*documento, geracao)
+    resultados.update(documentos)
+
+    faltando = [chave for chave in no_banco if chave not in documentos]
+    buscados = await buscar_faltando(faltando) if faltando else []
+    for chave, resultado in zip(faltando, buscados):
+        if isinstance(resultado, asyncio.CancelledError):
+            raise resultado
+        if isinstance(resultado, tuple):
+            cache_respostas.guardar(*resultado, geracao)
+        resultados[chave] = resultado
+    return resultados
+
+
+def item_lote(nome: str, resultado, movimentos: dict[int, list[str]] | None) -> bytes:
+    if isinstance(resultado, tuple):
+        poke_id, _, corpo = resultado
+        if movimentos is not None:
+            corpo = emendar_movimentos(corpo, movimentos.get(poke_id, []))
+        # o documento entra como está, sem desserializar
+        return b'{"chave":' + orjson.dumps(nome) + b',"status":200,"pokemon":' + corpo + b"}"
+    if resultado is None:
+        return orjson.dumps({"chave": nome, "status": 404, "erro": "Pokemon não encontrado.", "sugestoes": indice_nomes.sugerir(nome, 5)})
+    if isinstance(resultado, ErroUpstream) and not isinstance(resultado, PayloadInvalido):
+        return orjson.dumps({"chave": nome, "status": 503, "erro": "PokeAPI indisponível, tente novamente mais tarde."})
+    # resposta inválida da PokeAPI ou falha ao gravar só este pokémon
+    return orjson.dumps({"chave": nome, "status": 502, "erro": "Resposta inválida da PokeAPI."})
+
+
+async def responder_lote(nomes: list[str], incluir: list[str]) -> Response:
+    erro = include_invalido(incluir)
+    if erro is not None:
+        return erro
+    if not nomes or len(nomes) > LIMITE_LOTE:
+        return ORJSONResponse(status_code=400, content={"erro": f"Informe de 1 a {LIMITE_LOTE} nomes."})
+
+    chaves = [chave_lote(nome) for nome in nomes]
+    resultados = await carregar_lote(list(dict.fromkeys(chaves)))
+    movimentos = None
+    if "movimentos" in incluir:
+        ids = list(dict.fromkeys(r[0] for r in resultados.values() if isinstance(r, tuple)))
+        movimentos = await run_in_threadpool(com_sessao, carregar_movimentos_lote, ids)
+    for chave in chaves:
+        if isinstance(resultados[chave], tuple):
+            popularidade.registrar(chave)
+
+    # um item por nome, na ordem pedida (repetidos inclusive)
+    with medir("serializacao"):
+        corpo = b"[" + b",".join(item_lote(nome, resultados[chave], movimentos) for nome, chave in zip(nomes, chaves)) + b"]"
+    return Response(content=corpo, media_type="application/json")
+
+
+def chave_lote(nome: str) -> str:
+    # nome que nem normaliza vira chave vazia: 404 só no item dele, os outros seguem
+    try:
+        return normalizar_chave(nome)
+    except Exception as e:
+        avisar_falha_lote(nome, e)
+        return ""
+
+
+@app.get("/pokemon/batch", response_model=list[ItemLote], responses={400: {"model": Erro}})
+async def pegar_lote(nomes: str, include: str | None = None):
+    # /pokemon/batch?nomes=bulbasaur,4,squirtle: o time inteiro numa requisição
+    return await responder_lote([n.strip() for n in nomes.split(",") if n.strip()], parametro_lista(include))
+
+
+@app.post("/pokemon/batch", response_model=list[ItemLote], responses={400: {"model": Erro}})
+async def pegar_lote_post(entrada: LoteEntrada):
+    return await responder_lote([str(n) for n in entrada.nomes], [i.strip().lower() for i in entrada.include or []])
+
+
+@app.get("/pokemon/{nome}", response_model=PokemonDetalhe, responses={400: {"model": Erro}, 404: {"model": Erro}, 502: {"model": Erro}, 503: {"model": Erro}})
+async def pegar_pokemon(nome: str, include: str | None = None):
+    nome = normalizar_chave(nome)
+    incluir = parametro_lista(include)
+    erro = include_invalido(incluir)
+    if erro is not None:
+        return erro
+    # "/pokemon/%20" e ids fora do int4 nunca vão ao banco nem à PokeAPI
+    if chave_impossivel(nome):
+        return resposta_nao_encontrado(nome)
+
+    # nomes quentes saem direto do cache, sem tocar no SQLAlchemy
+    geracao = cache_respostas.geracao()
+    corpo = cache_respostas.obter(nome)
+    if corpo is not None:
+        popularidade.registrar(nome)
+        return await resposta_detalhe(nome, corpo, incluir)
+    # nomes que a PokeAPI já respondeu 404 não vão nem ao banco nem à PokeAPI até o TTL vencer
+    if cache_negativo.contem(nome):
+        return resposta_nao_encontrado(nome)
+
+    # busca a informação no banco (fora do event loop); a sessão é fechada na
+    # mesma thread, então nenhuma conexão fica presa enquanto esperamos a PokeAPI
+    pokemon = None
+    if AsyncSessionLocal is not None:
+        # com o engine async ligado, o documento sai do read model sem passar pelo threadpool
+        async with AsyncSessionLocal() as db:
+            pokemon = await carregar_documento_async(db, nome)
+    if pokemon is None:
+        pokemon = await run_in_threadpool(com_sessao, carregar_pokemon, nome)
+    if pokemon:
+        popularidade.registrar(nome)
+        return await responder_pokemon(pokemon, geracao, incluir)
+
+    # erro de digitação: com o catálogo carregado, responde com sugestões sem chamar a PokeAPI
+    if indice_nomes.catalogo_carregado and not indice_nomes.existe(nome):
+        return resposta_nao_encontrado(nome)
+
+    # requisições simultâneas pelo mesmo nome esperam a mesma busca
+    try:
+        pokemon = await buscas_em_voo.executar(nome, lambda: buscar_e_salvar(nome))
+    except ErroUpstream as e:
+        return resposta_upstream_indisponivel(e)
+    if pokemon is None:
+        return resposta_nao_encontrado(nome)
+    popularidade.registrar(nome)
+    return await responder_pokemon(pokemon, geracao, incluir)
+
+
+def resposta_upstream_indisponivel(erro: ErroUpstream) -> ORJSONResponse:
+    if isinstance(erro, PayloadInvalido):
+        return ORJSONResponse(status_code=502, content={"erro": "Resposta inválida da PokeAPI."})
+    # falha rápida enquanto a PokeAPI estiver fora: o que já está no banco continua sendo servido
+    headers = {"Retry-After": str(int(erro.retry_after) + 1)} if isinstance(erro, CircuitoAberto) else {}
+    return ORJSONResponse(status_code=503, content={"erro": "PokeAPI indisponível, tente novamente mais tarde."}, headers=headers)
+
+
+async def responder_pokemon(pokemon: tuple[int, str, bytes], geracao: int, incluir: list[str]) -> Response:
+    # o documento já vem serializado do read model: só guarda os bytes no cache
+    poke_id, nome, corpo = pokemon
+    cache_respostas.guardar(poke_id, nome, corpo, geracao)
+    return await resposta_detalhe(str(poke_id), corpo, incluir)
+
+
+async def resposta_detalhe(chave: str, corpo: bytes, incluir: list[str]) -> Response:
+    if "movimentos" in incluir:
+        # lista lida de pokemon_movimento, só quando pedida
+        movimentos = await run_in_threadpool(com_sessao, carregar_movimentos, chave)
+        with medir("serializacao"):
+            corpo = emendar_movimentos(corpo, movimentos)
+    return Response(content=corpo, media_type="application/json")
+
+
+def emendar_movimentos(corpo: bytes, movimentos: list[str]) -> bytes:
+    # lista emendada no fim do documento, sem desserializá-lo
+    return corpo[:-1] + b',"movimentos":' + orjson.dumps(movimentos) + b"}"
+
+
+def pagina_movimentos(db: Session, nome: str, q: str | None, cursor: int | None, limit: int) -> tuple[int, list] | None:
+    # (total, linhas) ou None se o pokémon não estiver no banco
+    linhas = db.execute(consulta_movimentos(nome, q, cursor, limit)).all()
+    if linhas:
+        return linhas[0].total, linhas
+    if db.execute(select(Pokemon.id).where(filtro_pokemon(nome))).scalar() is None:
+        return None
+    # página vazia (filtro sem resultado ou cursor depois do fim): o total sai sem o cursor
+    return db.execute(select(consulta_movimentos(nome, q, None, None).subquery().c.total).limit(1)).scalar() or 0, []
+
+
+@app.get("/pokemon/{nome}/movimentos", response_model=list[str], responses={404: {"model": Erro}, 503: {"model": Erro}})
+async def listar_movimentos(
+    nome: str,
+    q: str | None = None,
+    limit: int = Query(50, ge=1, le=LIMITE_MAXIMO_LISTA),
+    cursor: int | None = None,
+):
+    # movimentos paginados (keyset) e filtrados por trecho do nome, direto de pokemon_movimento
+    nome = normalizar_chave(nome)
+    q = q.strip().lower() if q else None
+    # uma linha a mais só para saber se existe próxima página
+    pagina = await run_in_threadpool(com_sessao, pagina_movimentos, nome, q, cursor, limit + 1)
+    if pagina is None:
+        # pokémon fora do banco: mesmo caminho do detalhe (cache negativo, catálogo, PokeAPI)
+        resposta = await pegar_pokemon(nome)
+        if resposta.status_code != 200:
+            return resposta
+        pagina = await run_in_threadpool(com_sessao, pagina_movimentos, nome, q, cursor, limit + 1) or (0, [])
+    total, linhas = pagina
+    proxima = len(linhas) > limit
+    linhas = linhas[:limit]
+    resposta = ORJSONResponse(content=[linha.nome for linha in linhas], headers={"X-Total": str(total)})
+    if proxima:
+        resposta.headers["X-Proximo-Cursor"] = str(linhas[-1].id)
+    return resposta
+
+
+def parametro_lista(valor: str | None) -> list[str]:
+    # "fire, Flying" -> ["fire", "flying"]
+    return [v.strip().lower() for v in valor.split(",") if v.strip()] if valor else []
+
+
+# colunas que podem ser pedidas em /pokemons?fields=...; todas saem do read model, sem joins
+CAMPOS_LISTA = {
+    "id": PokemonDocumento.id,
+    "nome": PokemonDocumento.nome,
+    "altura": PokemonDocumento.altura,
+    "peso": PokemonDocumento.peso,
+    "sprite": PokemonDocumento.sprite,
+    "tipos": PokemonDocumento.tipos,
+}
+CAMPOS_LISTA_PADRAO = ["id", "nome", "altura", "peso", "tipos"]
+TAMANHO_LOTE_STREAM = 1000
+
+
+def consulta_lista(campos: list[str], cursor: int | None, limit: int | None):
+    # keyset no id: cada página começa depois do último id da anterior
+    colunas = [PokemonDocumento.id] + [CAMPOS_LISTA[c] for c in campos if c != "id"]
+    consulta = select(*colunas).order_by(PokemonDocumento.id)
+    if cursor is not None:
+        consulta = consulta.where(PokemonDocumento.id > cursor)
+    if limit is not None:
+        consulta = consulta.limit(limit)
+    return consulta
+
+
+def montar_linhas(linhas, campos: list[str]) -> list[dict]:
     resultado = []
-    for p in pokemons:
-        resultado.append({
-            "id": p.id,
-            "nome": p.nome,
-            "altura": p.altura,
-            "peso": p.peso,
-            "tipos": [t.nome for t in p.tipos]
-        })
+    for linha in linhas:
+        item = {}
+        for campo in campos:
+            if campo == "tipos":
+                item["tipos"] = linha.tipos.split(",") if linha.tipos else []
+            else:
+                item[campo] = getattr(linha, campo)
+        resultado.append(item)
     return resultado
+
+
+def gerar_ndjson(campos: list[str], cursor: int | None, limit: int | None):
+    # cursor do lado do servidor (yield_per): a memória fica constante mesmo exportando tudo
+    db = SessionLocal()
+    try:
+        consulta = consulta_lista(campos, cursor, limit).execution_options(yield_per=TAMANHO_LOTE_STREAM)
+        for lote in db.execute(consulta).partitions():
+            linhas = montar_linhas(lote, campos)
+            yield b"".join(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE) for item in linhas)
+    finally:
+        db.close()
+
+
+@app.get("/pokemons", response_model=list[PokemonResumo], responses={400: {"model": Erro}})
+def listar_pokemons(
+    limit: int | None = Query(None, ge=1, le=LIMITE_MAXIMO_LISTA),
+    cursor: int | None = None,
+    fields: str | None = None,
+    stream: str | None = None,
+    db: Session = Depends(get_db),
+):
+    campos = [c.strip() for c in fields.split(",") if c.strip()] if fields else CAMPOS_LISTA_PADRAO
+    invalidos = [c for c in campos if c not in CAMPOS_LISTA]
+    if invalidos or not campos:
+        return ORJSONResponse(status_code=400, content={"erro": f"Campos inválidos: {', '.join(invalidos)}"})
+
+    if stream is not None:
+        if stream != "ndjson":
+            return ORJSONResponse(status_code=400, content={"erro": "Formato de stream inválido, use stream=ndjson."})
+        return StreamingResponse(gerar_ndjson(campos, cursor, limit), media_type="application/x-ndjson")
+
+    # uma linha a mais só para saber se existe próxima página
+    linhas = db.execute(consulta_lista(campos, cursor, limit + 1 if limit is not None else None)).all()
+    proxima = limit is not None and len(linhas) > limit
+    if proxima:
+        linhas = linhas[:limit]
+    resultado = montar_linhas(linhas, campos)
+    with medir("serializacao"):
+        resposta = ORJSONResponse(content=resultado)
+    if proxima:
+        # próxima página: /pokemons?limit=...&cursor=<valor deste header>
+        resposta.headers["X-Proximo-Cursor"] = str(linhas[-1].id)
+    return resposta
+
+
+def resposta_tipos_indisponiveis() -> ORJSONResponse:
+    return ORJSONResponse(status_code=503, content={"erro": "Tabela de tipos vazia, rode o importador primeiro."})
+
+
+# Confrontos de tipos: tudo sai da matriz em memória (services/tipos.py), sem tocar no banco
+@app.get("/tipos/defesa", response_model=Eficacia)
+async def eficacia_defesa(tipos: str):
+    if not matriz_tipos.carregada:
+        return resposta_tipos_indisponiveis()
+    lista = parametro_lista(tipos)
+    try:
+        return ORJSONResponse(content={"tipos": lista, "multiplicadores": matriz_tipos.defesa(lista)})
+    except TipoDesconhecido as e:
+        return ORJSONResponse(status_code=400, content={"erro": str(e)})
+
+
+@app.get("/tipos/ataque", response_model=Eficacia)
+async def eficacia_ataque(tipos: str):
+    if not matriz_tipos.carregada:
+        return resposta_tipos_indisponiveis()
+    lista = parametro_lista(tipos)
+    try:
+        return ORJSONResponse(content={"tipos": lista, "multiplicadores": matriz_tipos.ataque(lista)})
+    except TipoDesconhecido as e:
+        return ORJSONResponse(status_code=400, content={"erro": str(e)})
+
+
+@app.get("/pokemon/{nome}/eficacia", response_model=EficaciaPokemon)
+async def eficacia_pokemon(nome: str):
+    if not matriz_tipos.carregada:
+        return resposta_tipos_indisponiveis()
+    pokemon = matriz_tipos.tipos_do_pokemon(normalizar_chave(nome))
+    if pokemon is None:
+        return ORJSONResponse(status_code=404, content={"erro": "Pokemon não encontrado."})
+    try:
+        return ORJSONResponse(content={
+            **pokemon, "defesa": matriz_tipos.defesa(pokemon["tipos"]), "ataque": matriz_tipos.ataque(pokemon["tipos"]),
+        })
+    except TipoDesconhecido as e:
+        return ORJSONResponse(status_code=400, content={"erro": str(e)})
+
+
+@app.post("/tipos/confronto", response_model=ConfrontoResultado)
+async def confronto_tipos(entrada: ConfrontoEntrada):
+    if not matriz_tipos.carregada:
+        return resposta_tipos_indisponiveis()
+    ataque = [t.strip().lower() for t in entrada.ataque or []]
+    if entrada.atacante is not None:
+        atacante = matriz_tipos.tipos_do_pokemon(normalizar_chave(str(entrada.atacante)))
+        if atacante is None:
+            return ORJSONResponse(status_code=404, content={"erro": "Pokemon atacante não encontrado."})
+        ataque += atacante["tipos"]
+    if not ataque:
+        return ORJSONResponse(status_code=400, content={"erro": "Informe ataque ou atacante."})
+
+    alvos = [normalizar_chave(str(a)) for a in entrada.alvos] if entrada.alvos is not None else None
+    try:
+        resultados, nao_encontrados = matriz_tipos.confronto(ataque, alvos)
+    except TipoDesconhecido as e:
+        return ORJSONResponse(status_code=400, content={"erro": str(e)})
+
+    if alvos is None:
+        # dex inteira: os mais afetados primeiro
+        resultados.sort(key=lambda r: -r["multiplicador"])
+    if entrada.limite is not None:
+        resultados = resultados[:entrada.limite]
+    return ORJSONResponse(content={
+        "ataque": list(dict.fromkeys(ataque)), "resultados": resultados, "nao_encontrados": nao_encontrados,
+    })
+
+
+# contadores que os serviços já mantêm, lidos na hora do scrape de /metrics
+metricas.coletada("pokedex_cache_respostas_total", "Consultas ao cache de respostas por resultado.", "counter", ("resultado",),
+                  lambda: {(chave,): cache_respostas.estatisticas()[chave] for chave in ("hits", "misses", "evictions", "expirados")})
+metricas.coletada("pokedex_cache_respostas_bytes", "Bytes ocupados pelo cache de respostas.", "gauge", (),
+                  lambda: {(): cache_respostas.estatisticas()["bytes"]})
+metricas.coletada("pokedex_cache_negativo_total", "Consultas ao cache negativo por resultado.", "counter", ("resultado",),
+                  lambda: {(chave,): cache_negativo.estatisticas()[chave] for chave in ("hits", "hits_banco", "misses", "registrados")})
+metricas.coletada("pokedex_dimensoes_total", "Consultas ao cache de nome -> id por tabela e resultado.", "counter", ("tabela", "resultado"),
+                  lambda: {(cache.modelo.__tablename__, chave): cache.estatisticas()[chave]
+                           for cache in dimensoes.TODAS for chave in ("hits", "misses")})
+metricas.coletada("pokedex_pokeapi_cache_http_total", "Consultas ao cache HTTP em disco da PokeAPI por resultado.", "counter", ("resultado",),
+                  lambda: {(chave,): pokeapi.cache.estatisticas()[chave]
+                           for chave in ("hits", "revalidados", "velhos_servidos", "misses", "gravados", "evictions")})
+metricas.coletada("pokedex_pokeapi_em_voo", "Requisições à PokeAPI em andamento e limite AIMD atual.", "gauge", ("tipo",),
+                  lambda: {("em_voo",): pokeapi.estatisticas()["em_voo"], ("limite",): pokeapi.estatisticas()["concorrencia_atual"]})
+metricas.coletada("pokedex_pokeapi_circuito_aberto", "1 enquanto o circuit breaker da PokeAPI estiver aberto.", "gauge", (),
+                  lambda: {(): int(pokeapi.estatisticas()["circuito"] == "aberto")})
+metricas.coletada("pokedex_db_pool", "Conexões do pool por engine e estado.", "gauge", ("engine", "estado"),
+                  lambda: {(nome, chave): dados.get(chave) for nome, dados in estatisticas_pool().items()
+                           for chave in ("em_uso", "livres", "overflow_em_uso", "saturacao")})
+metricas.coletada("pokedex_db_pool_checkouts_total", "Checkouts e timeouts do pool por engine.", "counter", ("engine", "resultado"),
+                  lambda: {(nome, chave): dados[chave] for nome, dados in estatisticas_pool().items() for chave in ("checkouts", "timeouts")})
+
+metricas.coletada("pokedex_prefetch_tarefas_total", "Tarefas da fila de prefetch por resultado.", "counter", ("resultado",),
+                  lambda: {(chave,): fila_prefetch.estatisticas()[chave]
+                           for chave in ("agendadas", "duplicadas", "descartadas", "concluidas", "falhas")})
+metricas.coletada("pokedex_prefetch_pendentes", "Tarefas na fila de prefetch ou rodando.", "gauge", (),
+                  lambda: {(): fila_prefetch.estatisticas()["pendentes"]})
+
+
+@app.get("/metrics", include_in_schema=False)
+def exportar_metricas():
+    return Response(content=metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/estatisticas")
+def estatisticas():
+    return {
+        "cache": cache_respostas.estatisticas(),
+        "cache_negativo": cache_negativo.estatisticas(),
+        "pokeapi": pokeapi.estatisticas(),
+        "tipos": matriz_tipos.estatisticas(),
+        "busca": indice_busca.estatisticas(),
+        "nomes": indice_nomes.estatisticas(),
+        "dimensoes": {cache.modelo.__tablename__: cache.estatisticas() for cache in dimensoes.TODAS},
+        "pool": estatisticas_pool(),
+        "prefetch": fila_prefetch.estatisticas(),
+        "popularidade": popularidade.estatisticas(),
+    }
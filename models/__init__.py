@@ -9,3 +9,8 @@ from .pokemon_movimento import PokemonMovimento
 from .pokemon_evolucao import PokemonEvolucao
 from .tipo_forca import TipoForca
 from .tipo_fraqueza import TipoFraqueza
+from .tipo_eficacia import TipoEficacia
+from .importacao_estado import ImportacaoEstado
+from .pokemon_inexistente import PokemonInexistente
+from .pokemon_documento import PokemonDocumento
+from .pokemon_popularidade import PokemonPopularidade
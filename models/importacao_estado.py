@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+from db.database import Base
+
+class ImportacaoEstado(Base):
+    __tablename__ = "importacao_estado"  # checkpoint do importador, uma linha por id da PokeAPI
+
+    id_pokemon = Column(Integer, primary_key=True)  # id pokeapi
+    fase_base = Column(String, default="pendente")  # pendente | concluida | inexistente | erro
+    fase_relacoes = Column(String, default="pendente")  # pendente | concluida | erro
+    etag = Column(String, nullable=True)  # validadores HTTP para o modo --incremental
+    last_modified = Column(String, nullable=True)
+    payload_hash = Column(String, nullable=True)  # sha256 do JSON recebido
+    atualizado_em = Column(DateTime, server_default=func.now(), onupdate=func.now())
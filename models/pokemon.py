@@ -12,7 +12,8 @@ class Pokemon(Base):
     peso = Column(Integer)
     sprite = Column(String)
 
-    tipos = relationship("Tipo", secondary="pokemon_tipo", back_populates="pokemons")
-    habilidades = relationship("Habilidade", secondary="pokemon_habilidade", back_populates="pokemons")
-    movimentos = relationship("Movimento", secondary="pokemon_movimento", back_populates="pokemons")
+    # na ordem em que vieram da PokeAPI (slot 1 antes do slot 2 etc.)
+    tipos = relationship("Tipo", secondary="pokemon_tipo", back_populates="pokemons", order_by="PokemonTipo.id")
+    habilidades = relationship("Habilidade", secondary="pokemon_habilidade", back_populates="pokemons", order_by="PokemonHabilidade.id")
+    movimentos = relationship("Movimento", secondary="pokemon_movimento", back_populates="pokemons", order_by="PokemonMovimento.id")
     evolucoes = relationship("Pokemon", secondary="pokemon_evolucao", primaryjoin="Pokemon.id==PokemonEvolucao.id_pokemon", secondaryjoin="Pokemon.id==PokemonEvolucao.id_evolucao")
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, func
+from db.database import Base
+
+class PokemonDocumento(Base):
+    __tablename__ = "pokemon_documento"  # read model: resposta pronta de /pokemon/{nome} + colunas de /pokemons
+
+    id = Column(Integer, ForeignKey("pokemon.id"), primary_key=True)  # id pokeapi
+    nome = Column(String, unique=True, index=True)
+    altura = Column(Integer)
+    peso = Column(Integer)
+    sprite = Column(String)
+    tipos = Column(String)  # desnormalizado: "grass,poison"
+    documento = Column(Text, nullable=False)  # JSON já serializado
+    atualizado_em = Column(DateTime, server_default=func.now(), onupdate=func.now())
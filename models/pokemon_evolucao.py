@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
 from db.database import Base
 
 class PokemonEvolucao(Base):
     __tablename__ = "pokemon_evolucao"  # tabela intermediária N:N
+    __table_args__ = (UniqueConstraint("id_pokemon", "id_evolucao", name="uq_pokemon_evolucao"),)
 
     id = Column(Integer, primary_key=True, index=True)
     id_pokemon = Column(Integer, ForeignKey("pokemon.id"))  # Pokémon base
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index, UniqueConstraint
 from db.database import Base
 
 class PokemonHabilidade(Base):
     __tablename__ = "pokemon_habilidade"
+    __table_args__ = (
+        UniqueConstraint("id_pokemon", "id_habilidade", name="uq_pokemon_habilidade"),  # também serve de índice pokémon -> habilidade
+        Index("ix_pokemon_habilidade_habilidade_pokemon", "id_habilidade", "id_pokemon"),  # filtros "quem tem este habilidade"
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_pokemon = Column(Integer, ForeignKey("pokemon.id"))
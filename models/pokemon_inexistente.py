@@ -0,0 +1,8 @@
+from sqlalchemy import Column, DateTime, String
+from db.database import Base
+
+class PokemonInexistente(Base):
+    __tablename__ = "pokemon_inexistente"  # cache negativo compartilhado entre os workers da API
+
+    chave = Column(String, primary_key=True)  # nome ou id normalizado que a PokeAPI respondeu 404
+    expira_em = Column(DateTime, nullable=False, index=True)  # UTC; as linhas vencidas são apagadas no registrar
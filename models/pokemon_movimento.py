@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index, UniqueConstraint
 from db.database import Base
 
 class PokemonMovimento(Base):
     __tablename__ = "pokemon_movimento"
+    __table_args__ = (
+        UniqueConstraint("id_pokemon", "id_movimento", name="uq_pokemon_movimento"),  # também serve de índice pokémon -> movimento
+        Index("ix_pokemon_movimento_movimento_pokemon", "id_movimento", "id_pokemon"),  # filtros "quem tem este movimento"
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_pokemon = Column(Integer, ForeignKey("pokemon.id"))
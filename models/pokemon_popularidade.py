@@ -0,0 +1,9 @@
+from sqlalchemy import Column, DateTime, Integer, String, func
+from db.database import Base
+
+class PokemonPopularidade(Base):
+    __tablename__ = "pokemon_popularidade"  # buscas com sucesso em /pokemon/{nome}, somadas entre os workers
+
+    chave = Column(String, primary_key=True)  # nome ou id normalizado, como foi pedido
+    acessos = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from db.database import Base
 
 class PokemonTipo(Base):
     __tablename__ = "pokemon_tipo"
+    __table_args__ = (
+        UniqueConstraint("id_pokemon", "id_tipo", name="uq_pokemon_tipo"),  # também serve de índice pokémon -> tipo
+        Index("ix_pokemon_tipo_tipo_pokemon", "id_tipo", "id_pokemon"),  # filtros "quem tem este tipo"
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     id_pokemon = Column(Integer, ForeignKey("pokemon.id"))
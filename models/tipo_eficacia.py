@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey
+from db.database import Base
+
+class TipoEficacia(Base):
+    __tablename__ = "tipo_eficacia"  # multiplicador de dano atacante -> defensor (só os diferentes de 1)
+
+    id_atacante = Column(Integer, ForeignKey("tipo.id"), primary_key=True)
+    id_defensor = Column(Integer, ForeignKey("tipo.id"), primary_key=True)
+    multiplicador = Column(Float, nullable=False)  # 2, 0.5 ou 0
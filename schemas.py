@@ -0,0 +1,91 @@
+from pydantic import BaseModel, Field
+
+# Modelos de resposta da API. Eles documentam o contrato no OpenAPI e validam os
+# documentos na hora da gravação; na leitura, os endpoints devolvem bytes já
+# serializados (read model/cache) ou dicts serializados com orjson, sem passar
+# pelo jsonable_encoder.
+
+
+class PokemonDetalhe(BaseModel):
+    id: int
+    nome: str
+    altura: int | None = None
+    peso: int | None = None
+    sprite: str | None = None
+    tipos: list[str]
+    habilidades: list[str]
+    total_movimentos: int
+    movimentos: list[str] | None = None  # só com ?include=movimentos
+    evolucoes: list[str]
+
+
+class PokemonResumo(BaseModel):
+    # /pokemons?fields=... devolve só os campos pedidos
+    id: int | None = None
+    nome: str | None = None
+    altura: int | None = None
+    peso: int | None = None
+    sprite: str | None = None
+    tipos: list[str] | None = None
+
+
+class Sugestao(BaseModel):
+    id: int
+    nome: str
+    no_banco: bool
+
+
+class Sugestoes(BaseModel):
+    q: str
+    sugestoes: list[Sugestao]
+
+
+class Erro(BaseModel):
+    erro: str
+    sugestoes: list[Sugestao] | None = None
+
+
+class LoteEntrada(BaseModel):
+    nomes: list[str | int] = Field(..., min_length=1)  # nomes ou ids, na ordem da resposta
+    include: list[str] | None = None  # como em /pokemon/{nome}?include=
+
+
+class ItemLote(BaseModel):
+    # um item por nome pedido: o pokémon (status 200) ou o erro daquele nome (404/502/503)
+    chave: str
+    status: int
+    pokemon: PokemonDetalhe | None = None
+    erro: str | None = None
+    sugestoes: list[Sugestao] | None = None
+
+
+class Eficacia(BaseModel):
+    tipos: list[str]
+    multiplicadores: dict[str, float]
+
+
+class EficaciaPokemon(BaseModel):
+    id: int
+    nome: str
+    tipos: list[str]
+    defesa: dict[str, float]
+    ataque: dict[str, float]
+
+
+class ConfrontoEntrada(BaseModel):
+    ataque: list[str] | None = None  # tipos de ataque...
+    atacante: str | int | None = None  # ...ou um pokémon, usando os tipos dele
+    alvos: list[str | int] | None = None  # o time; sem alvos, a dex inteira
+    limite: int | None = Field(None, ge=1)  # só os N mais afetados
+
+
+class ConfrontoItem(BaseModel):
+    id: int
+    nome: str
+    multiplicador: float
+
+
+class ConfrontoResultado(BaseModel):
+    ataque: list[str]
+    resultados: list[ConfrontoItem]
+    nao_encontrados: list[str]
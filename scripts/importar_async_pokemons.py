@@ -1,84 +1,231 @@
 import asyncio
-import httpx
+import hashlib
 import argparse
+import json
+import os
 import sys
-from httpx import HTTPStatusError
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from sqlalchemy.orm import Session
+from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Tuple
-import time # Importado para delay no retry
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 from db.database import SessionLocal, engine, Base
-from models import Pokemon, Tipo, Habilidade, Movimento
-
-POKEAPI_LIST_URL = "https://pokeapi.co/api/v2/pokemon?limit=5000"
-POKEAPI_POKEMON_URL = "https://pokeapi.co/api/v2/pokemon/{}"
-POKEAPI_SPECIES_URL = "https://pokeapi.co/api/v2/pokemon-species/{}"
+from models import Pokemon, PokemonEvolucao, ImportacaoEstado
+from db import dimensoes
+from db.dimensoes import insert_do_dialeto, insert_ignorando_conflitos
+from db.documentos import atualizar_documentos, preencher_documentos_faltando
+from db.ingestao import gravar_lote_pokemons, gravar_relacoes_tipos, substituir_lote_pokemons
+from services.metricas import metricas
+from services.notificacoes import notificar_alteracao
+from services.pokeapi import POKEAPI_BASE_URL, ClientePokeAPI, ErroUpstream
+
+POKEAPI_LIST_URL = f"{POKEAPI_BASE_URL}/pokemon?limit=5000"
+POKEAPI_POKEMON_URL = f"{POKEAPI_BASE_URL}/pokemon/{{}}"
+POKEAPI_SPECIES_URL = f"{POKEAPI_BASE_URL}/pokemon-species/{{}}"
+POKEAPI_TYPE_LIST_URL = f"{POKEAPI_BASE_URL}/type?limit=100"
 DEFAULT_CONCURRENCY = 10
-MAX_RETRIES = 15
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_WRITERS = 2
+DEFAULT_STATS_INTERVAL = 5.0
+BATCH_LINGER = 0.5  # segundos que um escritor espera para completar um lote parcial
+WRITE_ATTEMPTS = 3
+
+async def get_pokemon_list(client: ClientePokeAPI) -> list[dict]:
+    resp = await client.requisitar(POKEAPI_LIST_URL)
+    resp.raise_for_status()
+    return resp.json().get("results", [])
+
+async def fetch_pokemon_conditional(client: ClientePokeAPI, identifier: int | str, etag: str | None = None,
+                                    last_modified: str | None = None) -> Tuple[str, dict | None, str | None, str | None]:
+    #Busca com validadores HTTP: devolve (status, dados, etag, last_modified), status = ok | not_modified | not_found | error.
+    #Retries, backoff com jitter, Retry-After e circuit breaker ficam no ClientePokeAPI.
+    url = POKEAPI_POKEMON_URL.format(identifier)
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        resp = await client.requisitar(url, headers=headers)
+    except ErroUpstream as e:
+        print(f"[Aviso] {identifier}: {e}")
+        return ("error", None, None, None)
+    if resp.status_code == 304:
+        return ("not_modified", None, etag, last_modified)
+    if resp.status_code == 404:
+        return ("not_found", None, None, None)
+    if resp.status_code != 200:
+        return ("error", None, None, None)
+    try:
+        dados = resp.json()
+    except ValueError as e:
+        #200 com corpo truncado ou que não é JSON: conta como erro e sai do cache em disco
+        await client.recusar_payload(url)
+        print(f"[Aviso] {identifier}: resposta da PokeAPI não é JSON válido: {e}")
+        return ("error", None, None, None)
+    return ("ok", dados, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
 
-def get_or_create_tipo(db: Session, nome: str):
-    tipo = db.query(Tipo).filter(Tipo.nome == nome).first()
-    if not tipo:
-        tipo = Tipo(nome=nome)
-        db.add(tipo)
-        
-    return tipo
+async def fetch_pokemon_detail(client: ClientePokeAPI, identifier: int | str) -> dict | None:
+    status, dados, _, _ = await fetch_pokemon_conditional(client, identifier)
+    return dados
 
-def get_or_create_habilidade(db: Session, nome: str):
-    hab = db.query(Habilidade).filter(Habilidade.nome == nome).first()
-    if not hab:
-        hab = Habilidade(nome=nome)
-        db.add(hab)
-        
-    return hab
 
-def get_or_create_movimento(db: Session, nome: str):
-    mov = db.query(Movimento).filter(Movimento.nome == nome).first()
-    if not mov:
-        mov = Movimento(nome=nome)
-        db.add(mov)
-        
-    return mov
+#Fontes de importação: a PokeAPI ao vivo ou um dump local no layout do api-data
+#(data/api/v2/<recurso>/<id>/index.json), em diretório ou tarball. As duas entregam
+#os mesmos payloads para as mesmas fases de gravação.
 
+class RemoteSource:
 
+    def __init__(self, client: ClientePokeAPI):
+        self.client = client
 
-async def get_pokemon_list() -> list[dict]:
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.get(POKEAPI_LIST_URL)
+    async def list_pokemon(self) -> list[dict]:
+        return await get_pokemon_list(self.client)
+
+    async def list_types(self) -> list[dict]:
+        resp = await self.client.requisitar(POKEAPI_TYPE_LIST_URL)
         resp.raise_for_status()
         return resp.json().get("results", [])
 
-async def fetch_pokemon_detail(client: httpx.AsyncClient, identifier: int | str, retries: int = MAX_RETRIES) -> dict | None:
-    url = POKEAPI_POKEMON_URL.format(identifier)
-    for attempt in range(1, retries + 1):
-        try:
-            resp = await client.get(url)
-            if resp.status_code == 404:
-                return None
-            resp.raise_for_status()
-            return resp.json()
-        except (httpx.RequestError, HTTPStatusError) as e:
-            await asyncio.sleep(attempt)
-    return None
-
-async def fetch_evolution_chain(client: httpx.AsyncClient, species_id: int) -> List[str]:
-    species_url = POKEAPI_SPECIES_URL.format(species_id)
+    async def fetch_pokemon(self, identifier: int, etag: str | None = None, last_modified: str | None = None) -> tuple:
+        return await fetch_pokemon_conditional(self.client, identifier, etag, last_modified)
+
+    async def get_json(self, url: str) -> dict | None:
+        return await self.client.buscar_json(url)
+
+
+#Campos do /pokemon usados na gravação: o JSON completo do api-data tem ~300 KB por
+#pokémon (game_indices, version_group_details...), e só isso volta do processo filho.
+POKEMON_FIELDS = ("id", "name", "height", "weight", "species", "types", "abilities")
+
+
+def load_json_file(path: str, kind: str) -> dict | None:
+    #Roda nos processos do pool: lê e faz o parse de um arquivo do dump
     try:
-        species_resp = await client.get(species_url)
-        species_resp.raise_for_status()
-        species_data = species_resp.json()
-        
-        chain_url = species_data.get("evolution_chain", {}).get("url")
-        if not chain_url:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    if kind == "pokemon":
+        trimmed = {k: data.get(k) for k in POKEMON_FIELDS}
+        trimmed["sprites"] = {"front_default": (data.get("sprites") or {}).get("front_default")}
+        trimmed["moves"] = [{"move": {"name": m["move"]["name"]}} for m in data.get("moves", [])]
+        return trimmed
+    return data
+
+
+def resource_path(url: str) -> str:
+    #".../api/v2/pokemon-species/1/" ou "/api/v2/pokemon-species/1/" -> "pokemon-species/1"
+    if url.startswith(POKEAPI_BASE_URL):
+        url = url[len(POKEAPI_BASE_URL):]
+    elif "/api/v2/" in url:
+        url = url.split("/api/v2/", 1)[1]
+    return url.split("?", 1)[0].strip("/")
+
+
+class LocalSource:
+    #Dump local da PokeAPI: diretório (raiz do api-data ou o próprio api/v2) ou tarball,
+    #extraído uma vez num diretório temporário. O parse dos JSONs roda num pool de processos.
+    RESOURCES = ("pokemon", "pokemon-species", "evolution-chain", "type")
+
+    def __init__(self, path: str, workers: int | None = None):
+        self.path = Path(path)
+        self.workers = workers or os.cpu_count() or 1
+        self.root: Path | None = None
+        self._tmp: tempfile.TemporaryDirectory | None = None
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def __aenter__(self) -> "LocalSource":
+        base = self.path
+        if self.path.is_file():
+            self._tmp = tempfile.TemporaryDirectory(prefix="pokeapi-dump-")
+            await asyncio.to_thread(self._extract, self._tmp.name)
+            base = Path(self._tmp.name)
+        self.root = self._find_root(base)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+    def _extract(self, destination: str) -> None:
+        #só os recursos usados pelo importador saem do tarball
+        with tarfile.open(self.path) as tar:
+            members = [m for m in tar if m.isfile() and any(f"/{r}/" in f"/{m.name}" for r in self.RESOURCES)]
+            tar.extractall(destination, members=members, filter="data")
+
+    @staticmethod
+    def _find_root(base: Path) -> Path:
+        candidates = [base, base / "data" / "api" / "v2", base / "api" / "v2"]
+        candidates += [c / "data" / "api" / "v2" for c in base.iterdir() if c.is_dir()]
+        for candidate in candidates:
+            if (candidate / "pokemon" / "index.json").is_file():
+                return candidate
+        raise FileNotFoundError(f"{base}: pokemon/index.json não encontrado (esperado o layout do api-data)")
+
+    async def _load(self, resource: str, kind: str = "") -> dict | None:
+        path = str(self.root / resource / "index.json")
+        return await asyncio.get_running_loop().run_in_executor(self._pool, load_json_file, path, kind)
+
+    async def list_pokemon(self) -> list[dict]:
+        return ((await self._load("pokemon")) or {}).get("results", [])
+
+    async def list_types(self) -> list[dict]:
+        return ((await self._load("type")) or {}).get("results", [])
+
+    async def fetch_pokemon(self, identifier: int, etag: str | None = None, last_modified: str | None = None) -> tuple:
+        #sem validadores HTTP: o --incremental compara o hash do payload
+        dados = await self._load(f"pokemon/{identifier}", "pokemon")
+        return ("ok", dados, None, None) if dados else ("not_found", None, None, None)
+
+    async def get_json(self, url: str) -> dict | None:
+        return await self._load(resource_path(url))
+
+
+ImportSource = RemoteSource | LocalSource
+
+
+class EvolutionChainCache:
+    #Memoiza espécies e cadeias por URL: cada cadeia (ex: os 9 da família do Eevee)
+    #é baixada uma vez só, e pedidos simultâneos pela mesma URL esperam a mesma task.
+
+    def __init__(self, source: ImportSource, semaphore: asyncio.Semaphore):
+        self.source = source
+        self.semaphore = semaphore
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.requests = 0
+
+    async def _fetch(self, url: str) -> dict | None:
+        async with self.semaphore:
+            self.requests += 1
+            return await self.source.get_json(url)
+
+    async def get(self, url: str) -> dict | None:
+        task = self._tasks.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._tasks[url] = task
+        return await task
+
+    async def chain_url(self, species_id: int) -> str:
+        #"" quando a espécie não tem cadeia evolutiva
+        species_data = await self.get(POKEAPI_SPECIES_URL.format(species_id))
+        return ((species_data or {}).get("evolution_chain") or {}).get("url") or ""
+
+    async def chain_names(self, chain_url: str) -> List[str]:
+        chain_data = await self.get(chain_url)
+        if not chain_data:
             return []
-            
-        chain_resp = await client.get(chain_url)
-        chain_resp.raise_for_status()
-        chain_data = chain_resp.json()["chain"]
 
         def extract_chain(chain_node, names=None):
             if names is None:
@@ -91,215 +238,480 @@ async def fetch_evolution_chain(client: httpx.AsyncClient, species_id: int) -> L
             
             return names
 
-        all_names = extract_chain(chain_data)
-        return list(set(all_names))
-        
-    except Exception as e:
-        return []
+        return list(dict.fromkeys(extract_chain(chain_data["chain"])))
 
 def create_tables_if_needed():
     Base.metadata.create_all(bind=engine)
 
 
 
-def insert_base_pokemon_sync(db: Session, dados: dict, max_retries: int = 15) -> Tuple[int, str, List[str]] | None:
-    
-    poke_id = dados.get("id")
-    nome = dados["name"].lower()
-    
-    for attempt in range(1, max_retries + 1):
-        try:
-            # Checa se o Pokémon Base já foi inserido
-            existing = db.query(Pokemon).filter(Pokemon.id == poke_id).first()
-            if existing:
-                return None
-            
-            # Cria o Pokémon Base
-            novo_pokemon = Pokemon(
-                id=poke_id,
-                nome=nome,
-                altura=dados.get("height"),
-                peso=dados.get("weight"),
-                sprite=dados.get("sprites", {}).get("front_default")
-            )
-            db.add(novo_pokemon)
-            
-            # 
-            for t in dados.get("types", []):
-                novo_pokemon.tipos.append(get_or_create_tipo(db, t["type"]["name"]))
-            for h in dados.get("abilities", []):
-                novo_pokemon.habilidades.append(get_or_create_habilidade(db, h["ability"]["name"]))
-            for m in dados.get("moves", []):
-                novo_pokemon.movimentos.append(get_or_create_movimento(db, m["move"]["name"]))
+#Checkpoint: a tabela importacao_estado guarda o status de cada id por fase, permitindo
+#retomar uma importação interrompida e re-sincronizar só o que mudou (--incremental).
 
-            
-            db.commit() 
-            
-            types_list = [t.nome for t in novo_pokemon.tipos]
-            print(f"[{poke_id}] Importado Base: {nome} -> Tipos: {', '.join(types_list)}")
-            
-            return (poke_id, nome, types_list)
+def payload_hash(dados: dict) -> str:
+    return hashlib.sha256(json.dumps(dados, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
 
-        except IntegrityError as e:
-            
-            db.rollback() 
-            if attempt < max_retries:
-                
-                time.sleep(0.01 * attempt) # Pequeno delay para evitar deadlock
-                continue
+
+def load_import_state(ids: list[int]) -> Dict[int, dict]:
+    #Carrega o estado dos ids; pokémons que já estavam no banco sem checkpoint
+    #(importações antigas ou a API) entram como Fase 1 concluída.
+    db = SessionLocal()
+    try:
+        state = {}
+        for i in range(0, len(ids), 1000):
+            chunk = ids[i:i + 1000]
+            for row in db.query(ImportacaoEstado).filter(ImportacaoEstado.id_pokemon.in_(chunk)):
+                state[row.id_pokemon] = {
+                    "fase_base": row.fase_base,
+                    "fase_relacoes": row.fase_relacoes,
+                    "etag": row.etag,
+                    "last_modified": row.last_modified,
+                    "payload_hash": row.payload_hash,
+                }
+            sem_estado = [i for i in chunk if i not in state]
+            if sem_estado:
+                existentes = [poke_id for (poke_id,) in db.query(Pokemon.id).filter(Pokemon.id.in_(sem_estado))]
+                rows = [{"id_pokemon": poke_id, "fase_base": "concluida", "etag": None, "last_modified": None, "payload_hash": None}
+                        for poke_id in existentes]
+                save_import_state(db, rows)
+                for row in rows:
+                    state[row["id_pokemon"]] = {**row, "fase_relacoes": "pendente"}
+        db.commit()
+        return state
+    finally:
+        db.close()
+
+
+def save_import_state(db: Session, rows: list[dict]) -> None:
+    #Upsert do checkpoint na mesma transação dos dados: ou os dois ficam gravados, ou nenhum
+    if not rows:
+        return
+    stmt = insert_do_dialeto(db, ImportacaoEstado).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ImportacaoEstado.id_pokemon],
+        set_={**{c: stmt.excluded[c] for c in rows[0] if c != "id_pokemon"}, "atualizado_em": func.now()},
+    )
+    db.execute(stmt)
+
+
+def write_base_batch_sync(items: list[tuple], state: Dict[int, dict], db: Session | None = None) -> list[Tuple[str, int | None, List[str] | None]]:
+    # Grava um lote inteiro da Fase 1 numa transação: pokémons novos, pokémons alterados
+    # (modo --incremental) e o checkpoint de cada id. O estado em memória só muda depois do commit.
+    novos, alterados, rows, statuses = [], [], [], {}
+    for identifier, status, dados, etag, last_modified in items:
+        previous = state.get(identifier) or {}
+        done_before = previous.get("fase_base") == "concluida"
+        if status == "ok":
+            digest = payload_hash(dados)
+            if not done_before:
+                novos.append(dados)
+            elif previous.get("payload_hash") != digest:
+                alterados.append(dados)
             else:
-                raise e # Lança o erro se as retries acabarem
-        
-        except Exception as e:
-            db.rollback()
-            raise e # Lança o erro se for qualquer outra exceção
+                statuses[identifier] = "unchanged"
+            rows.append({"id_pokemon": identifier, "fase_base": "concluida", "etag": etag,
+                         "last_modified": last_modified, "payload_hash": digest})
+        elif status == "not_modified":
+            statuses[identifier] = "unchanged"
+        elif status == "not_found":
+            statuses[identifier] = "missing"
+            rows.append({"id_pokemon": identifier, "fase_base": "inexistente", "etag": None,
+                         "last_modified": None, "payload_hash": None})
+        else:
+            statuses[identifier] = "error"
+            if not done_before:
+                rows.append({"id_pokemon": identifier, "fase_base": "erro", "etag": None,
+                             "last_modified": None, "payload_hash": None})
+
+    own_session = db is None
+    db = db or SessionLocal(expire_on_commit=False)
+    try:
+        inserted = gravar_lote_pokemons(db, novos)
+        updated = substituir_lote_pokemons(db, alterados)
+        save_import_state(db, rows)
+        # read model regravado na mesma transação; avisa a API para invalidar o cache destes pokémons
+        atualizar_documentos(db, [poke_id for poke_id, _, _ in inserted] + updated)
+        notificar_alteracao(db, [poke_id for poke_id, _, _ in inserted] + updated)
+        db.commit()
+    except Exception:
+        db.rollback()
+        dimensoes.invalidar()
+        raise
+    finally:
+        if own_session:
+            db.close()
+
+    for poke_id, nome, types_list in inserted:
+        print(f"[{poke_id}] Importado Base: {nome} -> Tipos: {', '.join(types_list)}")
+        statuses[poke_id] = "imported"
+    for poke_id in updated:
+        print(f"[{poke_id}] Atualizado: payload mudou na PokeAPI")
+        statuses[poke_id] = "updated"
+    for dados in novos:
+        statuses.setdefault(dados["id"], "skipped")
+    for row in rows:
+        state[row["id_pokemon"]] = {**(state.get(row["id_pokemon"]) or {"fase_relacoes": "pendente"}), **row}
+    return [(statuses.get(identifier, "skipped"), identifier, None) for identifier, *_ in items]
+
+
+def write_base_batch_with_retries(db: Session, items: list[tuple], state: Dict[int, dict]) -> list[Tuple[str, int | None, List[str] | None]]:
+    # com vários escritores, um lote pode perder a corrida por uma dimensão nova ou pelo lock do banco
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        try:
+            return write_base_batch_sync(items, state, db)
+        except (IntegrityError, OperationalError):
+            if attempt == WRITE_ATTEMPTS:
+                raise
 
-    return None 
 
-async def process_pokemon_base(client: httpx.AsyncClient, identifier: int | str, semaphore: asyncio.Semaphore) -> Tuple[str, int | None, List[str] | None]:
-    #Processa a importação básica na Fase 1. A fase 1 é onde ele vai apenas importar no banco de dados, sem atribuir relações as evoluções
-    async with semaphore:
-        db = SessionLocal(expire_on_commit=False)
+async def fetch_pokemon_base(source: ImportSource, identifier: int, previous: dict | None) -> tuple:
+    #Fase 1: só a busca na PokeAPI (condicional se já tivermos os validadores); a gravação acontece em lote
+    try:
+        previous = previous or {}
+        return (identifier, *await source.fetch_pokemon(identifier, previous.get("etag"), previous.get("last_modified")))
+    except Exception:
+        return (identifier, "error", None, None, None)
+
+
+#Métricas do importador no formato do Prometheus: --metrics-file grava o arquivo a cada
+#relatório (para o textfile collector do node_exporter), junto com as métricas de PokeAPI e banco.
+imported_items = metricas.contador("pokedex_importador_itens_total", "Pokémons processados pelo importador por fase e resultado.", ("fase", "status"))
+phase_seconds: Dict[str, float] = {}
+metricas.coletada("pokedex_importador_fase_segundos", "Duração de cada fase do importador.", "gauge", ("fase",),
+                  lambda: {(phase,): seconds for phase, seconds in phase_seconds.items()})
+current_pipeline: list = []  # PipelineStats da Fase 1 em andamento
+metricas.coletada("pokedex_importador_pipeline", "Estado da pipeline da Fase 1 (fila e estágios ocupados).", "gauge", ("medida",),
+                  lambda: {("fila",): current_pipeline[-1].queue.qsize(), ("buscando",): current_pipeline[-1].fetching,
+                           ("gravando",): current_pipeline[-1].writing} if current_pipeline else {})
+
+
+def write_metrics_file(path: str | None) -> None:
+    if not path:
+        return
+    # escrita atômica: o coletor nunca lê um arquivo pela metade
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(metricas.exportar())
+    os.replace(tmp, path)
+
+
+#Fase 1 em pipeline: N buscadores colocam os payloads numa fila limitada e M escritores
+#a esvaziam em lotes, cada um com a sua sessão. Uma gravação lenta só segura a rede
+#quando a fila enche (backpressure); a concorrência de cada estágio é ajustada à parte.
+
+class PipelineStats:
+
+    def __init__(self, queue: asyncio.Queue, fetchers: int, writers: int):
+        self.queue = queue
+        self.fetchers = fetchers
+        self.writers = writers
+        self.fetched = 0
+        self.written = 0
+        self.batches = 0
+        self.fetching = 0
+        self.writing = 0
+        self.queue_full = 0  # buscadores que esperaram vaga na fila
+        self.started = time.monotonic()
+        self._last = (self.started, 0, 0)
+
+    def report(self) -> str:
+        # vazão desde o último relatório, não a média da execução inteira
+        now = time.monotonic()
+        last_time, last_fetched, last_written = self._last
+        elapsed = max(now - last_time, 1e-9)
+        self._last = (now, self.fetched, self.written)
+        return (f"[pipeline] busca: {self.fetched} ({(self.fetched - last_fetched) / elapsed:.1f}/s, "
+                f"{self.fetching}/{self.fetchers} em voo) | fila: {self.queue.qsize()}/{self.queue.maxsize} "
+                f"({self.queue_full} esperas) | gravação: {self.written} em {self.batches} lotes "
+                f"({(self.written - last_written) / elapsed:.1f}/s, {self.writing}/{self.writers} gravando)")
+
+    def summary(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (f"[pipeline] {self.fetched} buscados e {self.written} gravados em {elapsed:.1f}s "
+                f"({self.written / elapsed:.1f}/s, lote médio {self.written / max(self.batches, 1):.0f}, "
+                f"fila cheia {self.queue_full} vezes)")
+
+
+async def fetch_stage(source: ImportSource, pending, state: Dict[int, dict], queue: asyncio.Queue, stats: PipelineStats) -> None:
+    # pending é um iterador compartilhado: cada id sai para um único buscador
+    for identifier in pending:
+        stats.fetching += 1
         try:
-            dados = await fetch_pokemon_detail(client, identifier)
-            if not dados:
-                return ("skipped", None, None)
-            
-            try:
-                
-                result = await asyncio.to_thread(insert_base_pokemon_sync, db, dados)
-                
-                if not result:
-                    return ("skipped", dados["id"], None) 
-                
-                return ("imported", result[0], [result[1]]) 
-            
-            except Exception as thread_e:
-                
-                if isinstance(thread_e, IntegrityError):
-                    print(f"[ERRO FINAL] ID {identifier} falhou após {15} retries por Colisão de Integridade.")
-                else:
-                    print(f"[ERRO DB INSERÇÃO] ID {identifier}: {thread_e.__class__.__name__}: {thread_e}")
-                
-                return ("error", None, None)
-            
-        except Exception as e:
-            
-            return ("error", None, None)
+            item = await fetch_pokemon_base(source, identifier, state.get(identifier))
         finally:
-            db.close()
+            stats.fetching -= 1
+        stats.fetched += 1
+        if queue.full():
+            stats.queue_full += 1
+        await queue.put(item)
 
-#Fase 2 criando as relações de evolução. Nessa fase ele vai atribuir as evoluções aos pokémons já importados na fase 1.
 
-def resolve_evolution_relations_sync(db: Session, current_pokemon_id: int, chain_names: list[str]) -> int:
-    #Cria as relações de evolução N:N no DB.
-    if not chain_names:
-        return 0
-
-    pokemon_base = db.query(Pokemon).filter(Pokemon.id == current_pokemon_id).first()
-    if not pokemon_base:
-         return 0 
+async def write_stage(state: Dict[int, dict], queue: asyncio.Queue, batch_size: int, stats: PipelineStats, results: list) -> None:
+    # junta até batch_size itens (ou o que chegar em BATCH_LINGER segundos) e grava numa transação
+    loop = asyncio.get_running_loop()
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        finished = False
+        while not finished:
+            item = await queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + BATCH_LINGER
+            while len(batch) < batch_size:
+                try:
+                    item = queue.get_nowait() if not queue.empty() else await asyncio.wait_for(queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    finished = True
+                    break
+                batch.append(item)
+
+            stats.writing += 1
+            try:
+                written = await asyncio.to_thread(write_base_batch_with_retries, db, batch, state)
+            except Exception as e:
+                print(f"[ERRO DB INSERÇÃO] Lote de {len(batch)} pokémons: {e.__class__.__name__}: {e}")
+                written = [("error", item[0], None) for item in batch]
+            finally:
+                stats.writing -= 1
+            results.extend(written)
+            for status, _, _ in written:
+                imported_items.inc("base", status)
+            stats.written += len(batch)
+            stats.batches += 1
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+async def report_stats(stats: PipelineStats, interval: float, metrics_file: str | None) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        print(stats.report())
+        await asyncio.to_thread(write_metrics_file, metrics_file)
+
+
+async def import_base_pipeline(source: ImportSource, ids: list[int], state: Dict[int, dict], fetchers: int, writers: int,
+                               batch_size: int, queue_size: int | None = None,
+                               stats_interval: float = DEFAULT_STATS_INTERVAL, metrics_file: str | None = None) -> list[Tuple[str, int | None, List[str] | None]]:
+    # fila padrão: um lote cheio esperando por escritor, o bastante para a rede não parar durante um commit
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or batch_size * writers)
+    stats = PipelineStats(queue, fetchers, writers)
+    current_pipeline[:] = [stats]
+    results: list = []
+    pending = iter(ids)
+
+    reporter = asyncio.create_task(report_stats(stats, stats_interval, metrics_file)) if stats_interval > 0 else None
+    write_tasks = [asyncio.create_task(write_stage(state, queue, batch_size, stats, results)) for _ in range(writers)]
+    try:
+        await asyncio.gather(*(fetch_stage(source, pending, state, queue, stats) for _ in range(fetchers)))
+        for _ in write_tasks:
+            await queue.put(None)
+        await asyncio.gather(*write_tasks)
+    finally:
+        for task in write_tasks:
+            task.cancel()
+        if reporter:
+            reporter.cancel()
+    print(stats.summary())
+    return results
 
-    relations_created = 0
-    
-    all_pokemons_in_chain = db.query(Pokemon.nome, Pokemon.id).filter(Pokemon.nome.in_(chain_names)).all()
-    name_to_id_map = {name: id for name, id in all_pokemons_in_chain}
-
-    for evo_name in chain_names:
-        evo_id = name_to_id_map.get(evo_name)
-        if evo_id and evo_id != current_pokemon_id:
-            pokemon_evolucao = db.query(Pokemon).filter(Pokemon.id == evo_id).first()
-            if pokemon_evolucao:
-                if pokemon_evolucao not in pokemon_base.evolucoes:
-                    pokemon_base.evolucoes.append(pokemon_evolucao)
-                    relations_created += 1
+#Fase 2 criando as relações de evolução. Nessa fase ele vai atribuir as evoluções aos pokémons já importados na fase 1.
 
+def link_chain_relations_sync(member_ids: list[int], chain_names: list[str]) -> int:
+    #Cria todas as relações de evolução de uma cadeia num único INSERT em lote
+    #(ON CONFLICT DO NOTHING na unique de id_pokemon/id_evolucao) e marca a Fase 2 como concluída.
+    db = SessionLocal()
     try:
-        db.commit() 
-    except Exception as e:
+        chain_ids = [poke_id for (poke_id,) in db.query(Pokemon.id).filter(Pokemon.nome.in_(chain_names))] if chain_names else []
+        existing = set(
+            db.query(PokemonEvolucao.id_pokemon, PokemonEvolucao.id_evolucao)
+            .filter(PokemonEvolucao.id_pokemon.in_(member_ids))
+            .all()
+        ) if chain_ids else set()
+        rows = [
+            {"id_pokemon": poke_id, "id_evolucao": evo_id}
+            for poke_id in member_ids for evo_id in chain_ids
+            if evo_id != poke_id and (poke_id, evo_id) not in existing
+        ]
+        linked = []
+        if rows:
+            stmt = insert_ignorando_conflitos(db, PokemonEvolucao).values(rows).returning(PokemonEvolucao.id_pokemon)
+            linked = [poke_id for (poke_id,) in db.execute(stmt)]
+            atualizar_documentos(db, linked)
+            notificar_alteracao(db, linked)
+        db.query(ImportacaoEstado).filter(ImportacaoEstado.id_pokemon.in_(member_ids)).update(
+            {ImportacaoEstado.fase_relacoes: "concluida", ImportacaoEstado.atualizado_em: func.now()},
+            synchronize_session=False,
+        )
+        db.commit()
+        return len(linked)
+    except Exception:
         db.rollback()
-        raise e # Garante que o erro seja propagado
-        
-    return relations_created
+        raise
+    finally:
+        db.close()
 
 
-async def process_pokemon_relations(client: httpx.AsyncClient, identifier: int | str, semaphore: asyncio.Semaphore) -> Tuple[str, int, int]:
-    #Processa a criação de relações na Fase 2.
-    async with semaphore:
-        db = SessionLocal(expire_on_commit=False)
+async def import_relations(source: ImportSource, pending_ids: list[int], semaphore: asyncio.Semaphore) -> Tuple[int, int, int]:
+    #Fase 2 por cadeia: N espécies + 1 requisição por cadeia distinta, em vez de 2N.
+    #Devolve (relações criadas, erros, requisições feitas).
+    cache = EvolutionChainCache(source, semaphore)
+
+    async def chain_url_or_none(poke_id: int) -> str | None:
         try:
-            existing = db.query(Pokemon).filter(Pokemon.id == identifier if isinstance(identifier, int) else Pokemon.nome == identifier).first()
-            if not existing:
-                return ("skipped", identifier, 0)
+            return await cache.chain_url(poke_id)
+        except Exception:
+            return None  # fica pendente para a próxima execução
 
-            chain_names = await fetch_evolution_chain(client, existing.id)
-            
-            try:
-                evo_relations_created = await asyncio.to_thread(resolve_evolution_relations_sync, db, existing.id, chain_names)
-                print(f"[{existing.id}] Relações: {existing.nome} -> {evo_relations_created} novas evoluções ligadas.")
-                return ("processed", existing.id, evo_relations_created)
-            except Exception as thread_e:
-                 db.rollback()
-                 print(f"[ERRO DB LIGAÇÃO] ID {identifier}: {thread_e.__class__.__name__}: {thread_e}")
-                 return ("error", identifier, 0)
-            
+    chain_urls = await asyncio.gather(*(chain_url_or_none(poke_id) for poke_id in pending_ids))
+    errors = sum(1 for url in chain_urls if url is None)
+
+    members_by_chain: Dict[str, list[int]] = {}
+    for poke_id, url in zip(pending_ids, chain_urls):
+        if url is not None:
+            members_by_chain.setdefault(url, []).append(poke_id)
+
+    async def link_chain(url: str, member_ids: list[int]) -> Tuple[int, int]:
+        try:
+            names = await cache.chain_names(url) if url else []
+            linked = await asyncio.to_thread(link_chain_relations_sync, member_ids, names)
+            print(f"[cadeia {url.rstrip('/').split('/')[-1] or '-'}] {len(member_ids)} pokémons -> {linked} novas evoluções ligadas.")
+            return (linked, 0)
         except Exception as e:
-            db.rollback()
-            return ("error", identifier, 0)
-        finally:
-            db.close()
+            print(f"[ERRO DB LIGAÇÃO] Cadeia {url or '-'}: {e.__class__.__name__}: {e}")
+            return (0, len(member_ids))
 
+    results = await asyncio.gather(*(link_chain(url, ids) for url, ids in members_by_chain.items()))
+    return (sum(r[0] for r in results), errors + sum(r[1] for r in results), cache.requests)
 
-async def import_all_async(start: int = 1, end: int | None = None, concurrency: int = DEFAULT_CONCURRENCY):
-    create_tables_if_needed()
 
-    list_data = await get_pokemon_list()
+#Tabela de eficácia: ~20 requisições ao /type, gravadas numa transação só (tipo_eficacia, tipo_forca e tipo_fraqueza)
+
+def write_type_relations_sync(payloads: list[dict]) -> int:
+    db = SessionLocal()
+    try:
+        pairs = gravar_relacoes_tipos(db, payloads)
+        db.commit()
+        return pairs
+    except Exception:
+        db.rollback()
+        dimensoes.invalidar()
+        raise
+    finally:
+        db.close()
+
+
+async def import_type_relations(source: ImportSource, semaphore: asyncio.Semaphore) -> int:
+    types = await source.list_types()
+
+    async def fetch_type(url: str) -> dict | None:
+        async with semaphore:
+            return await source.get_json(url)
+
+    payloads = await asyncio.gather(*(fetch_type(item["url"]) for item in types))
+    return await asyncio.to_thread(write_type_relations_sync, [p for p in payloads if p])
+
+
+async def import_all_async(start: int = 1, end: int | None = None, concurrency: int = DEFAULT_CONCURRENCY, batch_size: int = DEFAULT_BATCH_SIZE, incremental: bool = False, source_path: str | None = None, workers: int | None = None,
+                           writers: int = DEFAULT_WRITERS, queue_size: int | None = None, stats_interval: float = DEFAULT_STATS_INTERVAL,
+                           metrics_file: str | None = None):
+    create_tables_if_needed()
+    with SessionLocal() as db:
+        dimensoes.aquecer(db)
+        # pokémons de importações anteriores ao read model ganham o documento
+        filled = preencher_documentos_faltando(db)
+        if filled:
+            print(f"--- Read model: {filled} documentos criados para pokémons já importados ---")
+
+    pipeline = (writers, queue_size, stats_interval, metrics_file)
+    if source_path:
+        async with LocalSource(source_path, workers) as source:
+            print(f"--- Fonte: dump local {source.root} ({source.workers} processos de parse) ---")
+            # sem rate limit: o bastante em voo para manter todos os processos ocupados
+            await run_phases(source, start, end, max(concurrency, source.workers * 2), batch_size, incremental, *pipeline)
+        return
+
+    # um único cliente (pool de conexões, rate limit e circuit breaker) para as duas fases
+    async with ClientePokeAPI(concorrencia=concurrency) as client:
+        await run_phases(RemoteSource(client), start, end, concurrency, batch_size, incremental, *pipeline)
+
+
+async def run_phases(source: ImportSource, start: int, end: int | None, concurrency: int, batch_size: int, incremental: bool,
+                     writers: int = DEFAULT_WRITERS, queue_size: int | None = None, stats_interval: float = DEFAULT_STATS_INTERVAL,
+                     metrics_file: str | None = None):
+    list_data = await source.list_pokemon()
     ids = [int(item["url"].rstrip("/").split("/")[-1]) for item in list_data]
     if end is None:
         end = max(ids)
     ids_to_process = [i for i in ids if start <= i <= end]
 
-    print(f"--- FASE 1: Importando {len(ids_to_process)} Pokémons (Base) com {concurrency} requisições simultâneas ---")
+    # ids já concluídos são pulados antes de qualquer requisição; no modo incremental
+    # eles são buscados de novo, mas com If-None-Match/If-Modified-Since
+    state = await asyncio.to_thread(load_import_state, ids_to_process)
+    done = [i for i in ids_to_process if (state.get(i) or {}).get("fase_base") in ("concluida", "inexistente")]
+    ids_to_fetch = ids_to_process if incremental else [i for i in ids_to_process if i not in set(done)]
+
+    mode = "incremental" if incremental else "retomando"
+    print(f"--- FASE 1: Importando {len(ids_to_fetch)} Pokémons (Base) com {concurrency} buscadores e {writers} escritores "
+          f"({mode}: {len(done)} já concluídos) ---")
 
     semaphore = asyncio.Semaphore(concurrency)
+
+    try:
+        phase_started = time.monotonic()
+        pairs = await import_type_relations(source, semaphore)
+        phase_seconds["tipos"] = time.monotonic() - phase_started
+        print(f"--- TIPOS: tabela de eficácia atualizada ({pairs} confrontos diferentes de 1x) ---\n")
+    except Exception as e:
+        print(f"[ERRO TIPOS] Tabela de eficácia não atualizada: {e.__class__.__name__}: {e}\n")
     
     #Executa a fase 1 (Importação Base)
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        base_tasks = [process_pokemon_base(client, poke_id, semaphore) for poke_id in ids_to_process]
-        base_results = await asyncio.gather(*base_tasks)
-
-    # Coleta os IDs dos Pokémons importados para a Fase 2
-    imported_ids = [result[1] for result in base_results if result[0] == "imported" and result[1] is not None]
+    phase_started = time.monotonic()
+    base_results = await import_base_pipeline(source, ids_to_fetch, state, concurrency, writers, batch_size, queue_size,
+                                               stats_interval, metrics_file)
+    phase_seconds["base"] = time.monotonic() - phase_started
 
     processed = len(base_results)
     imported = sum(1 for status, id, name in base_results if status == "imported")
-    skipped = sum(1 for status, id, name in base_results if status == "skipped")
+    updated = sum(1 for status, id, name in base_results if status == "updated")
+    unchanged = sum(1 for status, id, name in base_results if status == "unchanged")
+    skipped = sum(1 for status, id, name in base_results if status in ("skipped", "missing"))
     errors = sum(1 for status, id, name in base_results if status == "error")
 
-    print(f"\n--- FASE 1 Concluída. Importados: {imported} | Pulados: {skipped} | Erros: {errors} ---")
+    print(f"\n--- FASE 1 Concluída. Importados: {imported} | Atualizados: {updated} | Inalterados: {unchanged} "
+          f"| Pulados: {skipped} | Erros: {errors} ---")
+
+    # Fase 2 para todo id com a Fase 1 concluída e relações pendentes, não só os desta execução
+    pending_ids = [i for i in ids_to_process
+                   if (state.get(i) or {}).get("fase_base") == "concluida"
+                   and (state.get(i) or {}).get("fase_relacoes") != "concluida"]
     
-    if imported_ids:
-        print(f"\n--- FASE 2: Criando Relações de Evolução para {len(imported_ids)} Pokémons ---")
+    if pending_ids:
+        print(f"\n--- FASE 2: Criando Relações de Evolução para {len(pending_ids)} Pokémons ---")
         
         #Executa a fase 2 de Relações de Evolução
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            relation_tasks = [process_pokemon_relations(client, poke_id, semaphore) for poke_id in imported_ids]
-            relation_results = await asyncio.gather(*relation_tasks)
-
-        relations_linked = sum(result[2] for result in relation_results if result[0] == "processed")
-        
-        errors_fase2 = sum(1 for result in relation_results if result[0] == "error")
+        phase_started = time.monotonic()
+        relations_linked, errors_fase2, requests_fase2 = await import_relations(source, pending_ids, semaphore)
+        phase_seconds["relacoes"] = time.monotonic() - phase_started
+        imported_items.inc("relacoes", "ligadas", valor=relations_linked)
+        imported_items.inc("relacoes", "error", valor=errors_fase2)
 
-        print(f"\n--- FASE 2 Concluída. Total de Novas Relações Ligadas: {relations_linked} ---")
+        print(f"\n--- FASE 2 Concluída. Total de Novas Relações Ligadas: {relations_linked} "
+              f"({requests_fase2} leituras de espécie/cadeia na fonte) ---")
 
     # Resumo Final
     print("\n-- Resumo Final do Processo --")
     print(f"Total de Pokémons Tentados: {processed}")
     print(f"Pokémons Base Importados com Sucesso: {imported}")
+    if incremental:
+        print(f"Pokémons Atualizados: {updated} | Inalterados: {unchanged}")
     print(f"Erros na Fase de Importação Base: {errors}")
-    if imported_ids:
+    if pending_ids:
         print(f"Relações de Evolução Criadas: {relations_linked}")
         print(f"Erros na Fase de Ligação de Evoluções: {errors_fase2}")
+    write_metrics_file(metrics_file)
 
 
 def parse_args_and_run() -> None:
@@ -307,8 +719,19 @@ def parse_args_and_run() -> None:
     parser.add_argument("--start", type=int, default=1)
     parser.add_argument("--end", type=int, default=None)
     parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Pokémons gravados por transação na Fase 1.")
+    parser.add_argument("--incremental", action="store_true", help="Rebusca os já importados com requisições condicionais e atualiza só o que mudou.")
+    parser.add_argument("--source", default=None, help="Dump local da PokeAPI no layout do api-data (diretório ou tarball) em vez da API ao vivo.")
+    parser.add_argument("--workers", type=int, default=None, help="Processos de parse do dump local (padrão: número de CPUs).")
+    parser.add_argument("--writers", type=int, default=DEFAULT_WRITERS, help="Escritores da Fase 1, cada um com a sua sessão.")
+    parser.add_argument("--queue-size", type=int, default=None, help="Payloads buscados esperando gravação (padrão: batch-size x writers).")
+    parser.add_argument("--metrics-file", default=None, help="Grava as métricas (formato Prometheus) neste arquivo a cada relatório e no fim.")
+    parser.add_argument("--stats-interval", type=float, default=DEFAULT_STATS_INTERVAL, help="Segundos entre relatórios da pipeline (0 desliga).")
     args = parser.parse_args()
-    asyncio.run(import_all_async(start=args.start, end=args.end, concurrency=args.concurrency))
+    asyncio.run(import_all_async(start=args.start, end=args.end, concurrency=args.concurrency, batch_size=args.batch_size,
+                                 incremental=args.incremental, source_path=args.source, workers=args.workers,
+                                 writers=args.writers, queue_size=args.queue_size, stats_interval=args.stats_interval,
+                                 metrics_file=args.metrics_file))
 
 if __name__ == "__main__":
     parse_args_and_run()
\ No newline at end of file
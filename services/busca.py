@@ -0,0 +1,150 @@
+import threading
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Habilidade, Movimento, Pokemon, PokemonHabilidade, PokemonMovimento, PokemonTipo, Tipo
+
+# Índice invertido em memória para /pokemon/search: um bitset (int do Python) por
+# tipo, habilidade e movimento, com um bit por pokémon. "Fogo e aprende X e Y" vira
+# um AND de três inteiros; as faixas de altura/peso saem de arrays do NumPy.
+RELACOES = {
+    "tipos": (PokemonTipo, PokemonTipo.id_tipo, Tipo),
+    "habilidades": (PokemonHabilidade, PokemonHabilidade.id_habilidade, Habilidade),
+    "movimentos": (PokemonMovimento, PokemonMovimento.id_movimento, Movimento),
+}
+
+
+def consultar_pokemons(db: Session, ids: list[int] | None = None) -> dict[int, dict]:
+    # colunas e nomes das relações de vários pokémons: uma consulta por tabela
+    consulta = select(Pokemon.id, Pokemon.nome, Pokemon.altura, Pokemon.peso)
+    if ids is not None:
+        consulta = consulta.where(Pokemon.id.in_(ids))
+    pokemons = {
+        id_: {"id": id_, "nome": nome, "altura": altura, "peso": peso, "tipos": [], "habilidades": [], "movimentos": []}
+        for id_, nome, altura, peso in db.execute(consulta)
+    }
+    for campo, (associacao, coluna, modelo) in RELACOES.items():
+        consulta = (
+            select(associacao.id_pokemon, modelo.nome)
+            .join(modelo, modelo.id == coluna)
+            .order_by(associacao.id)
+        )
+        if ids is not None:
+            consulta = consulta.where(associacao.id_pokemon.in_(ids))
+        for id_pokemon, nome in db.execute(consulta):
+            if id_pokemon in pokemons:
+                pokemons[id_pokemon][campo].append(nome)
+    return pokemons
+
+
+class IndiceBusca:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._posicoes: dict[int, int] = {}  # id do pokémon -> bit
+        self._pokemons: list[dict] = []  # por bit
+        self._bitsets: dict[str, dict[str, int]] = {campo: {} for campo in RELACOES}
+        self._todos = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._alturas = np.zeros(0)
+        self._pesos = np.zeros(0)
+
+    def carregar(self, db: Session) -> None:
+        pokemons = consultar_pokemons(db)
+        with self._lock:
+            self._posicoes = {}
+            self._pokemons = []
+            self._bitsets = {campo: {} for campo in RELACOES}
+            self._todos = 0
+            self._gravar(pokemons.values())
+
+    def atualizar(self, db: Session, ids: list[int]) -> None:
+        # pokémons gravados pela API ou, via NOTIFY, por outro processo
+        if not ids:
+            return
+        pokemons = consultar_pokemons(db, list(ids))
+        with self._lock:
+            self._gravar(pokemons.values())
+
+    def _gravar(self, pokemons) -> None:
+        for pokemon in pokemons:
+            bit = self._posicoes.get(pokemon["id"])
+            if bit is None:
+                bit = len(self._pokemons)
+                self._posicoes[pokemon["id"]] = bit
+                self._pokemons.append(pokemon)
+                self._todos |= 1 << bit
+            else:
+                # pokémon alterado: tira o bit dos valores antigos antes de marcar os novos
+                antigo = self._pokemons[bit]
+                for campo in RELACOES:
+                    for nome in antigo[campo]:
+                        self._bitsets[campo][nome] &= ~(1 << bit)
+                self._pokemons[bit] = pokemon
+            for campo in RELACOES:
+                bitsets = self._bitsets[campo]
+                for nome in pokemon[campo]:
+                    bitsets[nome] = bitsets.get(nome, 0) | (1 << bit)
+        # NaN fica fora de qualquer faixa
+        self._ids = np.array([p["id"] for p in self._pokemons], dtype=np.int64)
+        self._alturas = np.array([np.nan if p["altura"] is None else p["altura"] for p in self._pokemons], dtype=float)
+        self._pesos = np.array([np.nan if p["peso"] is None else p["peso"] for p in self._pokemons], dtype=float)
+
+    @staticmethod
+    def _bitset_faixa(valores: np.ndarray, minimo: int | None, maximo: int | None) -> int:
+        mascara = np.ones(len(valores), dtype=bool)
+        if minimo is not None:
+            mascara &= valores >= minimo
+        if maximo is not None:
+            mascara &= valores <= maximo
+        return int.from_bytes(np.packbits(mascara, bitorder="little").tobytes(), "little")
+
+    def buscar(self, tipos: list[str] = (), habilidades: list[str] = (), movimentos: list[str] = (),
+               altura_min: int | None = None, altura_max: int | None = None,
+               peso_min: int | None = None, peso_max: int | None = None,
+               cursor: int | None = None, limit: int | None = None) -> tuple[int, list[dict]]:
+        # Todos os filtros são combinados com AND. Devolve (total encontrado, página ordenada por id).
+        with self._lock:
+            resultado = self._todos
+            for campo, nomes in (("tipos", tipos), ("habilidades", habilidades), ("movimentos", movimentos)):
+                bitsets = self._bitsets[campo]
+                for nome in nomes:
+                    resultado &= bitsets.get(nome, 0)
+                    if not resultado:
+                        return 0, []
+            if altura_min is not None or altura_max is not None:
+                resultado &= self._bitset_faixa(self._alturas, altura_min, altura_max)
+            if peso_min is not None or peso_max is not None:
+                resultado &= self._bitset_faixa(self._pesos, peso_min, peso_max)
+            if not resultado:
+                return 0, []
+
+            bits = np.unpackbits(
+                np.frombuffer(resultado.to_bytes((len(self._pokemons) + 7) // 8, "little"), dtype=np.uint8),
+                bitorder="little",
+            )
+            posicoes = np.flatnonzero(bits)
+            ids = self._ids[posicoes]
+            ordem = np.argsort(ids, kind="stable")
+            total = len(ordem)
+            if cursor is not None:
+                ordem = ordem[ids[ordem] > cursor]
+            if limit is not None:
+                ordem = ordem[:limit]
+            pagina = [self._pokemons[p] for p in posicoes[ordem].tolist()]
+        return total, [
+            {"id": p["id"], "nome": p["nome"], "altura": p["altura"], "peso": p["peso"], "tipos": p["tipos"]}
+            for p in pagina
+        ]
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "pokemons": len(self._pokemons),
+                **{campo: len(bitsets) for campo, bitsets in self._bitsets.items()},
+            }
+
+
+indice_busca = IndiceBusca()
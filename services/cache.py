@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cache das respostas já serializadas de /pokemon/{nome}
+CACHE_MAX_BYTES = int(os.getenv("POKEDEX_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("POKEDEX_CACHE_TTL", "300"))
+
+
+class CacheRespostas:
+    # LRU limitado por bytes, com TTL, guardando o JSON final de cada pokémon.
+    # As entradas ficam indexadas pelo id; nome e id apontam para a mesma entrada.
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._itens: OrderedDict[int, tuple[bytes, float, str]] = OrderedDict()
+        self._chaves: dict[str, int] = {}
+        self._bytes = 0
+        self._geracao = 0
+        self._versoes: dict[int, int] = {}  # geração da última invalidação de cada id
+        self._versao_minima = 0  # geração do último limpar(), vale para todos os ids
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirados = 0
+        self.invalidacoes = 0
+
+    def geracao(self) -> int:
+        # lida antes de consultar o banco; se o mesmo id for invalidado no meio, o resultado não é guardado
+        return self._geracao
+
+    def obter(self, chave: str) -> bytes | None:
+        item = self.obter_item(chave)
+        return item[2] if item is not None else None
+
+    def obter_item(self, chave: str) -> tuple[int, str, bytes] | None:
+        # (id, nome, corpo), no formato do read model
+        with self._lock:
+            poke_id = self._chaves.get(chave)
+            item = self._itens.get(poke_id) if poke_id is not None else None
+            if item is None:
+                self.misses += 1
+                return None
+            corpo, expira_em, nome = item
+            if expira_em < time.monotonic():
+                self._remover(poke_id)
+                self.expirados += 1
+                self.misses += 1
+                return None
+            self._itens.move_to_end(poke_id)
+            self.hits += 1
+            return poke_id, nome, corpo
+
+    def guardar(self, poke_id: int, nome: str, corpo: bytes, geracao: int | None = None) -> None:
+        if len(corpo) > self.max_bytes:
+            return
+        with self._lock:
+            if geracao is not None and self._versoes.get(poke_id, self._versao_minima) > geracao:
+                return
+            self._remover(poke_id)
+            self._itens[poke_id] = (corpo, time.monotonic() + self.ttl, nome)
+            self._chaves[str(poke_id)] = poke_id
+            self._chaves[nome] = poke_id
+            self._bytes += len(corpo)
+            while self._bytes > self.max_bytes:
+                antigo = next(iter(self._itens))
+                self._remover(antigo)
+                self.evictions += 1
+
+    def invalidar(self, *ids: int) -> None:
+        # só os ids pedidos: buscas em andamento de outros pokémons continuam podendo guardar
+        if not ids:
+            return
+        with self._lock:
+            self._geracao += 1
+            for poke_id in ids:
+                self._versoes[poke_id] = self._geracao
+                if self._remover(poke_id):
+                    self.invalidacoes += 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._geracao += 1
+            self._versoes.clear()
+            self._versao_minima = self._geracao
+            self._itens.clear()
+            self._chaves.clear()
+            self._bytes = 0
+
+    def _remover(self, poke_id: int) -> bool:
+        item = self._itens.pop(poke_id, None)
+        if item is None:
+            return False
+        corpo, _, nome = item
+        self._bytes -= len(corpo)
+        self._chaves.pop(str(poke_id), None)
+        self._chaves.pop(nome, None)
+        return True
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirados": self.expirados,
+                "invalidacoes": self.invalidacoes,
+            }
+
+
+cache_respostas = CacheRespostas()
@@ -0,0 +1,226 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+
+# Cache HTTP em disco para as respostas da PokeAPI, compartilhado pela API e pelo
+# importador. Os corpos são guardados comprimidos e endereçados pelo sha256 do conteúdo
+# (/pokemon/25 e /pokemon/pikachu ocupam um corpo só); cada URL guarda o hash, os
+# validadores (ETag/Last-Modified) e a validade. Vencida a validade, a entrada é
+# revalidada com uma requisição condicional; passando de POKEAPI_CACHE_HTTP_MAX_BYTES,
+# as URLs acessadas há mais tempo saem primeiro. Caminho vazio desliga o cache.
+POKEAPI_CACHE_HTTP = os.getenv("POKEAPI_CACHE_HTTP", str(Path(__file__).resolve().parent.parent / ".cache" / "pokeapi.sqlite3"))
+POKEAPI_CACHE_HTTP_MAX_BYTES = int(os.getenv("POKEAPI_CACHE_HTTP_MAX_BYTES", str(512 * 1024 * 1024)))
+POKEAPI_CACHE_HTTP_TTL = float(os.getenv("POKEAPI_CACHE_HTTP_TTL", "86400"))  # sem Cache-Control: max-age
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+CHECAR_TAMANHO_A_CADA = 50  # gravações entre uma soma do tamanho total e outra
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS corpo (
+    hash TEXT PRIMARY KEY,
+    dados BLOB NOT NULL,
+    tamanho INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resposta (
+    url TEXT PRIMARY KEY,
+    hash TEXT NOT NULL REFERENCES corpo(hash),
+    etag TEXT,
+    last_modified TEXT,
+    expira_em REAL NOT NULL,
+    acessado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_resposta_acessado_em ON resposta (acessado_em);
+CREATE INDEX IF NOT EXISTS ix_resposta_hash ON resposta (hash);
+"""
+
+
+@dataclass(frozen=True)
+class RespostaGuardada:
+    url: str
+    corpo: bytes
+    etag: str | None
+    last_modified: str | None
+    expira_em: float
+
+    @property
+    def fresca(self) -> bool:
+        return self.expira_em > time.time()
+
+    def validadores(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def resposta(self, headers_pedido: dict | None, origem: str) -> httpx.Response:
+        # quem pediu com os mesmos validadores (importador --incremental) recebe 304
+        headers = {"X-Cache": origem}
+        if self.etag:
+            headers["ETag"] = self.etag
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        pedido = httpx.Request("GET", self.url)
+        if self.etag and (headers_pedido or {}).get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers=headers, request=pedido)
+        headers["Content-Type"] = "application/json"
+        return httpx.Response(200, content=self.corpo, headers=headers, request=pedido)
+
+
+def validade(headers: httpx.Headers, ttl_padrao: float) -> float | None:
+    # segundos de validade pelo Cache-Control; None = não guardar
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    encontrado = MAX_AGE.search(cache_control)
+    return float(encontrado.group(1)) if encontrado else ttl_padrao
+
+
+class CacheHTTP:
+
+    def __init__(self, caminho: str = POKEAPI_CACHE_HTTP, max_bytes: int = POKEAPI_CACHE_HTTP_MAX_BYTES,
+                 ttl: float = POKEAPI_CACHE_HTTP_TTL):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._conexao: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidados = 0
+        self.velhos_servidos = 0
+        self.misses = 0
+        self.gravados = 0
+        self.evictions = 0
+        self._gravacoes_sem_checar = CHECAR_TAMANHO_A_CADA
+
+    @property
+    def ligado(self) -> bool:
+        return bool(self.caminho)
+
+    def _banco(self) -> sqlite3.Connection:
+        # aberto no primeiro uso; WAL para a API e o importador lerem e gravarem juntos
+        if self._conexao is None:
+            Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.executescript(ESQUEMA)
+            self._conexao = conexao
+        return self._conexao
+
+    def obter(self, url: str) -> RespostaGuardada | None:
+        with self._lock:
+            banco = self._banco()
+            linha = banco.execute(
+                "SELECT c.dados, r.etag, r.last_modified, r.expira_em FROM resposta r JOIN corpo c ON c.hash = r.hash WHERE r.url = ?",
+                (url,),
+            ).fetchone()
+            if linha is None:
+                self.misses += 1
+                return None
+            banco.execute("UPDATE resposta SET acessado_em = ? WHERE url = ?", (time.time(), url))
+        dados, etag, last_modified, expira_em = linha
+        return RespostaGuardada(url, zlib.decompress(dados), etag, last_modified, expira_em)
+
+    def guardar(self, url: str, corpo: bytes, headers: httpx.Headers) -> None:
+        segundos = validade(headers, self.ttl)
+        if segundos is None:
+            return
+        chave = hashlib.sha256(corpo).hexdigest()
+        agora = time.time()
+        with self._lock:
+            banco = self._banco()
+            banco.execute("BEGIN IMMEDIATE")
+            try:
+                anterior = banco.execute("SELECT hash FROM resposta WHERE url = ?", (url,)).fetchone()
+                if banco.execute("SELECT 1 FROM corpo WHERE hash = ?", (chave,)).fetchone() is None:
+                    banco.execute("INSERT INTO corpo (hash, dados, tamanho) VALUES (?, ?, ?)",
+                                  (chave, zlib.compress(corpo, 6), len(corpo)))
+                banco.execute(
+                    "INSERT INTO resposta (url, hash, etag, last_modified, expira_em, acessado_em) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (url) DO UPDATE SET hash = excluded.hash, etag = excluded.etag, "
+                    "last_modified = excluded.last_modified, expira_em = excluded.expira_em, acessado_em = excluded.acessado_em",
+                    (url, chave, headers.get("ETag"), headers.get("Last-Modified"), agora + segundos, agora),
+                )
+                if anterior is not None and anterior[0] != chave:
+                    # payload mudou: o corpo antigo sai se nenhuma outra URL apontar para ele
+                    banco.execute("DELETE FROM corpo WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM resposta WHERE hash = ?)",
+                                  (anterior[0], anterior[0]))
+                self._gravacoes_sem_checar += 1
+                if self._gravacoes_sem_checar >= CHECAR_TAMANHO_A_CADA:
+                    self._gravacoes_sem_checar = 0
+                    self._despejar(banco)
+                banco.execute("COMMIT")
+            except Exception:
+                banco.execute("ROLLBACK")
+                raise
+            self.gravados += 1
+
+    def renovar(self, guardada: RespostaGuardada, headers: httpx.Headers) -> None:
+        # 304 da PokeAPI: mesmo corpo, validade nova (e validadores novos, se vierem)
+        segundos = validade(headers, self.ttl) or self.ttl
+        with self._lock:
+            self._banco().execute(
+                "UPDATE resposta SET expira_em = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time() + segundos, headers.get("ETag"), headers.get("Last-Modified"), guardada.url),
+            )
+            self.revalidados += 1
+
+    def _despejar(self, banco: sqlite3.Connection) -> None:
+        # tamanho contado pelos corpos descomprimidos; sai a URL acessada há mais tempo
+        total = banco.execute("SELECT COALESCE(SUM(tamanho), 0) FROM corpo").fetchone()[0]
+        while total > self.max_bytes:
+            urls = [url for (url,) in banco.execute("SELECT url FROM resposta ORDER BY acessado_em LIMIT 20")]
+            if not urls:
+                break
+            banco.execute(f"DELETE FROM resposta WHERE url IN ({','.join('?' * len(urls))})", urls)
+            self.evictions += len(urls)
+            banco.execute("DELETE FROM corpo WHERE hash NOT IN (SELECT hash FROM resposta)")
+            total = banco.execute("SELECT COALESCE(SUM(tamanho), 0) FROM corpo").fetchone()[0]
+
+    def esquecer(self, url: str) -> None:
+        # payload recusado (ex: JSON truncado): a próxima busca vai de novo à PokeAPI
+        with self._lock:
+            banco = self._banco()
+            linha = banco.execute("SELECT hash FROM resposta WHERE url = ?", (url,)).fetchone()
+            if linha is None:
+                return
+            banco.execute("DELETE FROM resposta WHERE url = ?", (url,))
+            banco.execute("DELETE FROM corpo WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM resposta WHERE hash = ?)",
+                          (linha[0], linha[0]))
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._banco().executescript("DELETE FROM resposta; DELETE FROM corpo;")
+
+    def estatisticas(self) -> dict:
+        dados = {
+            "ligado": self.ligado,
+            "hits": self.hits,
+            "revalidados": self.revalidados,
+            "velhos_servidos": self.velhos_servidos,
+            "misses": self.misses,
+            "gravados": self.gravados,
+            "evictions": self.evictions,
+        }
+        if self.ligado and self._conexao is not None:
+            with self._lock:
+                urls, corpos, tamanho, comprimido = self._conexao.execute(
+                    "SELECT (SELECT COUNT(*) FROM resposta), COUNT(*), COALESCE(SUM(tamanho), 0), "
+                    "COALESCE(SUM(LENGTH(dados)), 0) FROM corpo"
+                ).fetchone()
+            dados.update({"urls": urls, "corpos": corpos, "bytes": tamanho, "bytes_comprimidos": comprimido,
+                          "max_bytes": self.max_bytes})
+        return dados
+
+
+cache_http = CacheHTTP()
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from db.dimensoes import insert_do_dialeto
+from models import Pokemon, PokemonInexistente
+
+# Cache negativo: nomes e ids que a PokeAPI respondeu 404. Enquanto o TTL não
+# vence, pedidos repetidos (bots, clientes com bug) viram 404 local sem gastar
+# o orçamento de requisições da PokeAPI.
+CACHE_NEGATIVO_MAX_ITENS = int(os.getenv("POKEDEX_CACHE_NEGATIVO_MAX", "10000"))
+CACHE_NEGATIVO_TTL = float(os.getenv("POKEDEX_CACHE_NEGATIVO_TTL", "3600"))
+# também grava na tabela pokemon_inexistente, para todos os workers aproveitarem
+CACHE_NEGATIVO_NO_BANCO = os.getenv("POKEDEX_CACHE_NEGATIVO_BANCO", "1") == "1"
+CACHE_NEGATIVO_MAX_BANCO = int(os.getenv("POKEDEX_CACHE_NEGATIVO_MAX_BANCO", "100000"))  # linhas na tabela
+CACHE_NEGATIVO_LIMPEZA = float(os.getenv("POKEDEX_CACHE_NEGATIVO_LIMPEZA", "60"))  # segundos entre limpezas da tabela
+FRACAO_APOS_CORTE = 0.9  # o corte deixa folga, para não cortar de novo a cada 404
+
+
+def agora_utc() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class CacheNegativo:
+
+    def __init__(self, max_itens: int = CACHE_NEGATIVO_MAX_ITENS, ttl: float = CACHE_NEGATIVO_TTL,
+                 no_banco: bool = CACHE_NEGATIVO_NO_BANCO, max_banco: int = CACHE_NEGATIVO_MAX_BANCO):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.no_banco = no_banco
+        self.max_banco = max_banco
+        self._linhas_banco = 0  # estimativa: contada na limpeza, somada a cada registro deste worker
+        self._proxima_limpeza = 0.0
+        self._itens: OrderedDict[str, float] = OrderedDict()  # chave -> expira_em (monotonic)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.hits_banco = 0
+        self.misses = 0
+        self.registrados = 0
+
+    def contem(self, chave: str) -> bool:
+        # só memória: pode ser chamado direto do event loop
+        with self._lock:
+            expira_em = self._itens.get(chave)
+            if expira_em is None or expira_em < time.monotonic():
+                if expira_em is not None:
+                    del self._itens[chave]
+                self.misses += 1
+                return False
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return True
+
+    def _guardar(self, chave: str, ttl: float) -> None:
+        with self._lock:
+            self._itens[chave] = time.monotonic() + ttl
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def contem_no_banco(self, db: Session, chave: str) -> bool:
+        # registrado por outro worker? traz para a memória com o TTL que ainda resta
+        if not self.no_banco:
+            return False
+        expira_em = db.execute(select(PokemonInexistente.expira_em).where(PokemonInexistente.chave == chave)).scalar()
+        restante = (expira_em - agora_utc()).total_seconds() if expira_em is not None else 0
+        if restante <= 0:
+            return False
+        self._guardar(chave, restante)
+        self.hits_banco += 1
+        return True
+
+    def contidos_no_banco(self, db: Session, chaves: list[str]) -> set[str]:
+        # contem_no_banco de várias chaves numa consulta
+        if not self.no_banco or not chaves:
+            return set()
+        agora = agora_utc()
+        linhas = db.execute(
+            select(PokemonInexistente.chave, PokemonInexistente.expira_em)
+            .where(PokemonInexistente.chave.in_(chaves), PokemonInexistente.expira_em > agora)
+        ).all()
+        for chave, expira_em in linhas:
+            self._guardar(chave, (expira_em - agora).total_seconds())
+            self.hits_banco += 1
+        return {chave for chave, _ in linhas}
+
+    def registrar(self, db: Session, chave: str) -> None:
+        self._guardar(chave, self.ttl)
+        self.registrados += 1
+        if not self.no_banco:
+            return
+        agora = agora_utc()
+        expira_em = agora + timedelta(seconds=self.ttl)
+        consulta = insert_do_dialeto(db, PokemonInexistente).values(chave=chave, expira_em=expira_em)
+        db.execute(consulta.on_conflict_do_update(index_elements=[PokemonInexistente.chave], set_={"expira_em": expira_em}))
+        with self._lock:
+            self._linhas_banco += 1
+            limpar = self._linhas_banco > self.max_banco or time.monotonic() >= self._proxima_limpeza
+            if limpar:
+                self._proxima_limpeza = time.monotonic() + CACHE_NEGATIVO_LIMPEZA
+        if limpar:
+            self._limpar_banco(db, agora)
+        db.commit()
+
+    def _limpar_banco(self, db: Session, agora: datetime) -> None:
+        # de CACHE_NEGATIVO_LIMPEZA em CACHE_NEGATIVO_LIMPEZA segundos, ou quando a estimativa
+        # passa de max_banco: as linhas vencidas saem e, se ainda passar, as que vencem primeiro
+        db.execute(delete(PokemonInexistente).where(PokemonInexistente.expira_em <= agora))
+        linhas = db.execute(select(func.count()).select_from(PokemonInexistente)).scalar()
+        if linhas > self.max_banco:
+            manter = int(self.max_banco * FRACAO_APOS_CORTE)
+            excedentes = (
+                select(PokemonInexistente.chave)
+                .order_by(PokemonInexistente.expira_em.desc(), PokemonInexistente.chave)
+                .offset(manter)
+            )
+            db.execute(delete(PokemonInexistente).where(PokemonInexistente.chave.in_(excedentes)))
+            linhas = manter
+        with self._lock:
+            self._linhas_banco = linhas
+
+    def esquecer(self, *chaves: str) -> None:
+        with self._lock:
+            for chave in chaves:
+                self._itens.pop(chave, None)
+
+    def esquecer_pokemons(self, db: Session, ids: list[int]) -> None:
+        # pokémons gravados por outro processo deixam de ser "inexistentes" (nome e id)
+        nomes = [nome for (nome,) in db.execute(select(Pokemon.nome).where(Pokemon.id.in_(ids)))] if ids else []
+        self.esquecer(*nomes, *(str(poke_id) for poke_id in ids))
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl": self.ttl,
+                "no_banco": self.no_banco,
+                "max_banco": self.max_banco,
+                "hits": self.hits,
+                "hits_banco": self.hits_banco,
+                "misses": self.misses,
+                "registrados": self.registrados,
+            }
+
+
+def apagar_inexistentes(db: Session, pokemons: list[tuple[int, str]]) -> None:
+    # pokémons recém-gravados saem da tabela, pelo nome e pelo id. Sem commit.
+    chaves = [chave for poke_id, nome in pokemons for chave in (str(poke_id), nome)]
+    if chaves:
+        db.execute(delete(PokemonInexistente).where(PokemonInexistente.chave.in_(chaves)))
+
+
+cache_negativo = CacheNegativo()
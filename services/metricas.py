@@ -0,0 +1,221 @@
+import bisect
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+# Métricas no formato de texto do Prometheus (GET /metrics), sem dependência externa:
+# contadores e histogramas com rótulos, mais métricas "coletadas" que leem na hora do
+# scrape os contadores que os serviços já mantêm (cache, pool, índices).
+BALDES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BALDES_CONTAGEM = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(nomes: tuple[str, ...], valores: tuple, extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) and not valor.is_integer() else str(int(valor))
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores_rotulos, valor: float = 1) -> None:
+        with self._lock:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + valor
+
+    def amostras(self) -> list[str]:
+        with self._lock:
+            return [f"{self.nome}{_rotulos(self.rotulos, chave)} {_numero(v)}" for chave, v in sorted(self._valores.items())]
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str] = (), baldes: tuple = BALDES_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.baldes = tuple(baldes)
+        self._series: dict[tuple, list] = {}  # rótulos -> [contagens por balde..., soma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores_rotulos) -> None:
+        indice = bisect.bisect_left(self.baldes, valor)
+        with self._lock:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [0] * (len(self.baldes) + 1) + [0.0, 0]
+            serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def amostras(self) -> list[str]:
+        linhas = []
+        with self._lock:
+            for chave, serie in sorted(self._series.items()):
+                acumulado = 0
+                for limite, contagem in zip((*self.baldes, math.inf), serie):
+                    acumulado += contagem
+                    le = f'le="{_numero(limite)}"'
+                    linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, chave, le)} {acumulado}")
+                linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {_numero(serie[-2])}")
+                linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, chave)} {serie[-1]}")
+        return linhas
+
+
+class Coletada:
+    # valores lidos na hora do scrape: funcao() -> {(valores dos rótulos): valor}
+
+    def __init__(self, nome: str, ajuda: str, tipo: str, rotulos: Iterable[str], funcao: Callable[[], dict]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.tipo = tipo
+        self.rotulos = tuple(rotulos)
+        self.funcao = funcao
+
+    def amostras(self) -> list[str]:
+        return [f"{self.nome}{_rotulos(self.rotulos, chave)} {_numero(v)}"
+                for chave, v in sorted(self.funcao().items()) if v is not None]
+
+
+class RegistroMetricas:
+
+    def __init__(self):
+        self._metricas: dict[str, Contador | Histograma | Coletada] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            # registrar duas vezes (reload, import repetido) devolve a mesma métrica
+            return self._metricas.setdefault(metrica.nome, metrica)
+
+    def contador(self, nome: str, ajuda: str, rotulos: Iterable[str] = ()) -> Contador:
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def histograma(self, nome: str, ajuda: str, rotulos: Iterable[str] = (), baldes: tuple = BALDES_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(nome, ajuda, rotulos, baldes))
+
+    def coletada(self, nome: str, ajuda: str, tipo: str, rotulos: Iterable[str], funcao: Callable[[], dict]) -> Coletada:
+        return self._registrar(Coletada(nome, ajuda, tipo, rotulos, funcao))
+
+    def exportar(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+        linhas = []
+        for metrica in metricas:
+            try:
+                amostras = metrica.amostras()
+            except Exception:
+                # uma fonte quebrada não derruba o scrape inteiro
+                continue
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(amostras)
+        return "\n".join(linhas) + "\n"
+
+
+metricas = RegistroMetricas()
+
+
+# Perfil por requisição: cada etapa instrumentada (banco, commit, PokeAPI...) soma o tempo
+# no perfil da requisição atual. O contextvar acompanha a requisição no threadpool.
+_perfil: contextvars.ContextVar[dict | None] = contextvars.ContextVar("perfil_requisicao", default=None)
+
+
+def iniciar_perfil() -> tuple[dict, contextvars.Token]:
+    perfil: dict[str, list] = {}  # etapa -> [vezes, segundos]
+    return perfil, _perfil.set(perfil)
+
+
+def encerrar_perfil(token: contextvars.Token) -> None:
+    _perfil.reset(token)
+
+
+def registrar_etapa(etapa: str, segundos: float) -> None:
+    perfil = _perfil.get()
+    if perfil is not None:
+        atual = perfil.setdefault(etapa, [0, 0.0])
+        atual[0] += 1
+        atual[1] += segundos
+
+
+@contextmanager
+def medir(etapa: str, histograma: Histograma | None = None, *valores_rotulos):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        registrar_etapa(etapa, segundos)
+        if histograma is not None:
+            histograma.observar(segundos, *valores_rotulos)
+
+
+def server_timing(perfil: dict, total: float) -> str:
+    # cabeçalho Server-Timing: "db;desc=\"3x\";dur=1.2, pokeapi;dur=80.1, total;dur=85.0"
+    partes = [f'{etapa};desc="{vezes}x";dur={segundos * 1000:.2f}' for etapa, (vezes, segundos) in perfil.items()]
+    partes.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(partes)
+
+
+latencia_http = metricas.histograma("pokedex_http_requisicao_segundos", "Latência das requisições HTTP por rota.", ("metodo", "rota", "status"))
+consultas_por_requisicao = metricas.histograma("pokedex_http_consultas_por_requisicao", "Consultas SQL feitas por requisição.", ("rota",), BALDES_CONTAGEM)
+
+# X-Pokedex-Perfil: 1 na requisição devolve o Server-Timing com o tempo de cada etapa
+CABECALHO_PERFIL = b"x-pokedex-perfil"
+PERFIL_SEMPRE = os.getenv("POKEDEX_PERFIL", "0") == "1"
+
+
+class MiddlewareMetricas:
+    # ASGI puro (sem BaseHTTPMiddleware): mede a requisição inteira, inclusive respostas em stream
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        inicio = time.perf_counter()
+        perfil, token = iniciar_perfil()
+        quer_perfil = PERFIL_SEMPRE or dict(scope["headers"]).get(CABECALHO_PERFIL) == b"1"
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                if quer_perfil:
+                    cabecalho = server_timing(perfil, time.perf_counter() - inicio).encode("latin-1")
+                    mensagem["headers"] = [*mensagem.get("headers", []), (b"server-timing", cabecalho)]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            encerrar_perfil(token)
+            # o template da rota ("/pokemon/{nome}"), nunca o caminho pedido
+            rota = getattr(scope.get("route"), "path", "sem_rota")
+            latencia_http.observar(time.perf_counter() - inicio, scope["method"], rota, status)
+            consultas_por_requisicao.observar(perfil.get("db", (0,))[0], rota)
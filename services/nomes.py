@@ -0,0 +1,146 @@
+import threading
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db.documentos import id_da_chave
+from models import Pokemon
+
+# Índice de nomes em memória para autocomplete e erros de digitação: trie para
+# prefixo e trigramas + distância de edição para nomes parecidos. Guarda os nomes
+# do banco e, quando carregado, o catálogo completo da PokeAPI (/pokemon?limit=...),
+# para que um nome que não existe seja recusado sem ir à PokeAPI.
+TAMANHO_NGRAMA = 3
+CANDIDATOS_FUZZY = 50
+
+
+class _No:
+    __slots__ = ("filhos", "fim")
+
+    def __init__(self):
+        self.filhos: dict[str, "_No"] = {}
+        self.fim = False
+
+
+def trigramas(nome: str) -> set[str]:
+    texto = f"  {nome} "
+    return {texto[i:i + TAMANHO_NGRAMA] for i in range(len(texto) - TAMANHO_NGRAMA + 1)}
+
+
+def distancia_edicao(a: str, b: str, limite: int) -> int:
+    # Levenshtein com corte: devolve limite + 1 assim que não há como ficar dentro do limite
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(atual) > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
+
+
+def distancia_maxima(nome: str) -> int:
+    # 1 erro em nomes curtos, até 3 nos longos
+    return min(3, max(1, len(nome) // 4))
+
+
+class IndiceNomes:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._raiz = _No()
+        self._ids: dict[str, int] = {}  # nome -> id
+        self._nomes_por_id: dict[int, str] = {}
+        self._trigramas: dict[str, set[str]] = {}
+        self._no_banco: set[str] = set()
+        self.catalogo_carregado = False
+
+    def carregar(self, db: Session) -> None:
+        self.adicionar(db.execute(select(Pokemon.nome, Pokemon.id)).all(), no_banco=True)
+
+    def atualizar(self, db: Session, ids: list[int]) -> None:
+        if ids:
+            self.adicionar(db.execute(select(Pokemon.nome, Pokemon.id).where(Pokemon.id.in_(ids))).all(), no_banco=True)
+
+    def carregar_catalogo(self, itens: Iterable[dict]) -> None:
+        # resultados de /pokemon?limit=... da PokeAPI: {"name": ..., "url": ".../pokemon/25/"}
+        nomes = [(item["name"].lower(), int(item["url"].rstrip("/").split("/")[-1])) for item in itens]
+        self.adicionar(nomes)
+        self.catalogo_carregado = True
+
+    def adicionar(self, nomes: Iterable[tuple[str, int]], no_banco: bool = False) -> None:
+        with self._lock:
+            for nome, poke_id in nomes:
+                if no_banco:
+                    self._no_banco.add(nome)
+                if nome in self._ids:
+                    continue
+                self._ids[nome] = poke_id
+                self._nomes_por_id[poke_id] = nome
+                no = self._raiz
+                for letra in nome:
+                    no = no.filhos.setdefault(letra, _No())
+                no.fim = True
+                for trigrama in trigramas(nome):
+                    self._trigramas.setdefault(trigrama, set()).add(nome)
+
+    def existe(self, chave: str) -> bool:
+        # nome ou id conhecido (no banco ou no catálogo da PokeAPI)
+        poke_id = id_da_chave(chave)
+        if poke_id is not None:
+            return poke_id in self._nomes_por_id
+        return chave in self._ids
+
+    def _prefixo(self, prefixo: str, limite: int) -> list[str]:
+        no = self._raiz
+        for letra in prefixo:
+            no = no.filhos.get(letra)
+            if no is None:
+                return []
+        encontrados: list[str] = []
+        # DFS em ordem alfabética, parando no limite
+        pilha = [(no, prefixo)]
+        while pilha and len(encontrados) < limite:
+            no, nome = pilha.pop()
+            if no.fim:
+                encontrados.append(nome)
+            pilha.extend((filho, nome + letra) for letra, filho in sorted(no.filhos.items(), reverse=True))
+        return encontrados
+
+    def _parecidos(self, nome: str, limite: int) -> list[str]:
+        # candidatos que dividem mais trigramas com o nome, ordenados pela distância de edição
+        contagem: dict[str, int] = {}
+        for trigrama in trigramas(nome):
+            for candidato in self._trigramas.get(trigrama, ()):
+                contagem[candidato] = contagem.get(candidato, 0) + 1
+        candidatos = sorted(contagem, key=lambda c: (-contagem[c], c))[:CANDIDATOS_FUZZY]
+        maximo = distancia_maxima(nome)
+        distancias = [(distancia_edicao(nome, c, maximo), c) for c in candidatos]
+        return [c for d, c in sorted(distancias) if d <= maximo][:limite]
+
+    def sugerir(self, texto: str, limite: int = 10) -> list[dict]:
+        # completa pelo prefixo e, se faltar, completa com nomes parecidos
+        texto = texto.strip().lower()
+        if not texto:
+            return []
+        with self._lock:
+            nomes = self._prefixo(texto, limite)
+            if len(nomes) < limite:
+                nomes += [n for n in self._parecidos(texto, limite) if n not in nomes][:limite - len(nomes)]
+            return [{"id": self._ids[n], "nome": n, "no_banco": n in self._no_banco} for n in nomes]
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "nomes": len(self._ids),
+                "no_banco": len(self._no_banco),
+                "trigramas": len(self._trigramas),
+                "catalogo_carregado": self.catalogo_carregado,
+            }
+
+
+indice_nomes = IndiceNomes()
@@ -0,0 +1,81 @@
+import select
+import threading
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Avisos entre processos (API, workers e importador) via LISTEN/NOTIFY do Postgres:
+# quem grava um pokémon notifica os ids e cada worker da API invalida o que tiver em memória.
+CANAL_POKEMON = "pokemon_alterado"
+CANAL_TIPOS = "tipos_alterados"
+IDS_POR_NOTIFICACAO = 1000  # o payload do NOTIFY é limitado a 8000 bytes
+
+
+def notificar_alteracao(db: Session, ids: Iterable[int], canal: str = CANAL_POKEMON) -> None:
+    # só é entregue quando a transação do db for commitada
+    ids = sorted(set(ids))
+    if not ids or db.get_bind().dialect.name != "postgresql":
+        return
+    for i in range(0, len(ids), IDS_POR_NOTIFICACAO):
+        payload = ",".join(str(poke_id) for poke_id in ids[i:i + IDS_POR_NOTIFICACAO])
+        db.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": canal, "payload": payload})
+
+
+class OuvinteAlteracoes:
+    # Thread que fica em LISTEN e repassa os ids alterados para os callbacks de cada canal
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._callbacks: dict[str, list[Callable[[list[int]], None]]] = {}
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def registrar(self, callback: Callable[[list[int]], None], canal: str = CANAL_POKEMON) -> None:
+        self._callbacks.setdefault(canal, []).append(callback)
+
+    def iniciar(self) -> None:
+        if self.engine.dialect.name != "postgresql" or self._thread is not None:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="ouvinte-pokemon", daemon=True)
+        self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _despachar(self, canal: str, ids: list[int]) -> None:
+        for callback in self._callbacks.get(canal, []):
+            try:
+                callback(ids)
+            except Exception as e:
+                print(f"[Aviso] callback de alteração falhou: {e.__class__.__name__}: {e}")
+
+    def _executar(self) -> None:
+        while not self._parar.is_set():
+            conexao = None
+            try:
+                conexao = self.engine.raw_connection()
+                dbapi = conexao.driver_connection
+                dbapi.autocommit = True
+                with dbapi.cursor() as cursor:
+                    for canal in self._callbacks:
+                        cursor.execute(f"LISTEN {canal}")
+                while not self._parar.is_set():
+                    if select.select([dbapi], [], [], 1.0) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    while dbapi.notifies:
+                        aviso = dbapi.notifies.pop(0)
+                        self._despachar(aviso.channel, [int(i) for i in aviso.payload.split(",") if i])
+            except Exception as e:
+                print(f"[Aviso] ouvinte de alterações reconectando: {e.__class__.__name__}: {e}")
+                time.sleep(1)
+            finally:
+                if conexao is not None:
+                    conexao.invalidate()
@@ -0,0 +1,352 @@
+import asyncio
+import email.utils
+import os
+import random
+import time
+from urllib.parse import quote, urlsplit
+
+import httpx
+
+from services.cache_http import CacheHTTP, cache_http
+from services.metricas import metricas, registrar_etapa
+
+# Configuração do cliente compartilhado da PokeAPI
+POKEAPI_BASE_URL = os.getenv("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2").rstrip("/")
+POKEAPI_TIMEOUT = float(os.getenv("POKEAPI_TIMEOUT", "10"))
+POKEAPI_MAX_CONEXOES = int(os.getenv("POKEAPI_MAX_CONEXOES", "20"))
+POKEAPI_CONCORRENCIA = int(os.getenv("POKEAPI_CONCORRENCIA", "10"))
+POKEAPI_TAXA = float(os.getenv("POKEAPI_TAXA", "50"))  # requisições por segundo (token bucket)
+POKEAPI_RAJADA = int(os.getenv("POKEAPI_RAJADA", "20"))
+POKEAPI_TENTATIVAS = int(os.getenv("POKEAPI_TENTATIVAS", "5"))
+POKEAPI_BACKOFF_BASE = float(os.getenv("POKEAPI_BACKOFF_BASE", "0.5"))
+POKEAPI_BACKOFF_MAX = float(os.getenv("POKEAPI_BACKOFF_MAX", "30"))
+POKEAPI_FALHAS_PARA_ABRIR = int(os.getenv("POKEAPI_FALHAS_PARA_ABRIR", "5"))
+POKEAPI_TEMPO_ABERTO = float(os.getenv("POKEAPI_TEMPO_ABERTO", "30"))
+
+STATUS_SOBRECARGA = {429, 500, 502, 503, 504}
+
+requisicoes_upstream = metricas.contador("pokedex_pokeapi_requisicoes_total", "Requisições à PokeAPI por recurso e status (cada tentativa conta).", ("recurso", "status"))
+tempo_upstream = metricas.histograma("pokedex_pokeapi_requisicao_segundos", "Latência das requisições à PokeAPI por recurso.", ("recurso",))
+
+
+class ErroUpstream(Exception):
+    # a PokeAPI continuou falhando (429/5xx/rede) depois de todas as tentativas, ou
+    # respondeu um status que não é 200 nem 404 (ex: 400, 403)
+    pass
+
+
+class PayloadInvalido(ErroUpstream):
+    # 200 da PokeAPI sem os campos mínimos de um pokémon (id e name): não é gravado
+    pass
+
+
+class CircuitoAberto(ErroUpstream):
+    def __init__(self, retry_after: float):
+        super().__init__(f"PokeAPI indisponível, circuito aberto por mais {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    # limita a taxa média de requisições, permitindo rajadas de até `capacidade`
+
+    def __init__(self, taxa: float, capacidade: int):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self) -> None:
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.taxa)
+
+
+class LimiteAIMD:
+    # Concorrência adaptativa: +1/limite a cada sucesso, metade a cada 429/5xx
+
+    def __init__(self, maximo: int, minimo: int = 1):
+        self.maximo = maximo
+        self.minimo = minimo
+        self.limite = float(maximo)
+        self.em_voo = 0
+        self._condicao = asyncio.Condition()
+
+    async def entrar(self) -> None:
+        async with self._condicao:
+            await self._condicao.wait_for(lambda: self.em_voo < int(self.limite))
+            self.em_voo += 1
+
+    async def sair(self, sobrecarga: bool) -> None:
+        async with self._condicao:
+            self.em_voo -= 1
+            if sobrecarga:
+                self.limite = max(self.minimo, self.limite / 2)
+            else:
+                self.limite = min(self.maximo, self.limite + 1 / self.limite)
+            self._condicao.notify_all()
+
+
+class CircuitBreaker:
+    # fechado -> aberto depois de N falhas seguidas; depois de `tempo_aberto`,
+    # meio-aberto deixa passar uma requisição de teste
+
+    def __init__(self, falhas_para_abrir: int, tempo_aberto: float):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0
+        self._testando = False
+
+    @property
+    def estado(self) -> str:
+        if self.falhas_seguidas < self.falhas_para_abrir:
+            return "fechado"
+        return "aberto" if time.monotonic() < self.aberto_ate else "meio-aberto"
+
+    def verificar(self) -> None:
+        estado = self.estado
+        if estado == "aberto" or (estado == "meio-aberto" and self._testando):
+            raise CircuitoAberto(max(0.0, self.aberto_ate - time.monotonic()))
+        if estado == "meio-aberto":
+            self._testando = True
+
+    def sucesso(self) -> None:
+        self.falhas_seguidas = 0
+        self._testando = False
+
+    def falha(self) -> None:
+        self.falhas_seguidas += 1
+        self._testando = False
+        if self.falhas_seguidas >= self.falhas_para_abrir:
+            self.aberto_ate = time.monotonic() + self.tempo_aberto
+
+
+def segundos_retry_after(valor: str | None) -> float | None:
+    # Retry-After pode vir em segundos ou como data HTTP
+    if not valor:
+        return None
+    if valor.strip().isdigit():
+        return float(valor)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ClientePokeAPI:
+    # Camada única de acesso à PokeAPI, usada pela API e pelo importador: um
+    # httpx.AsyncClient com keep-alive, token bucket, concorrência AIMD, backoff
+    # exponencial com jitter (respeitando Retry-After), circuit breaker e cache HTTP em disco.
+
+    def __init__(self, base_url: str = POKEAPI_BASE_URL, timeout: float = POKEAPI_TIMEOUT,
+                 max_conexoes: int = POKEAPI_MAX_CONEXOES, concorrencia: int = POKEAPI_CONCORRENCIA,
+                 taxa: float = POKEAPI_TAXA, rajada: int = POKEAPI_RAJADA, tentativas: int = POKEAPI_TENTATIVAS,
+                 transport: httpx.AsyncBaseTransport | None = None, cache: CacheHTTP = cache_http):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_conexoes = max(max_conexoes, concorrencia)
+        self.concorrencia = concorrencia
+        self.taxa = taxa
+        self.rajada = rajada
+        self.tentativas = tentativas
+        self.transport = transport
+        self.circuito = CircuitBreaker(POKEAPI_FALHAS_PARA_ABRIR, POKEAPI_TEMPO_ABERTO)
+        self.cache = cache
+        self._client: httpx.AsyncClient | None = None
+        self._bucket: TokenBucket | None = None
+        self._limite: LimiteAIMD | None = None
+        self.requisicoes = 0
+        self.retentativas = 0
+        self.sobrecargas = 0
+
+    async def iniciar(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+            limits=httpx.Limits(max_connections=self.max_conexoes,
+                                max_keepalive_connections=self.max_conexoes),
+            transport=self.transport,
+            follow_redirects=True,
+        )
+        self._bucket = TokenBucket(self.taxa, self.rajada)
+        self._limite = LimiteAIMD(self.concorrencia)
+
+    async def fechar(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    async def __aenter__(self) -> "ClientePokeAPI":
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.fechar()
+
+    def _espera(self, tentativa: int, resposta: httpx.Response | None) -> float:
+        retry_after = segundos_retry_after(resposta.headers.get("Retry-After")) if resposta is not None else None
+        if retry_after is not None:
+            return min(retry_after, POKEAPI_BACKOFF_MAX)
+        # backoff exponencial com "full jitter"
+        return random.uniform(0, min(POKEAPI_BACKOFF_MAX, POKEAPI_BACKOFF_BASE * 2 ** (tentativa - 1)))
+
+    async def requisitar(self, url: str, headers: dict | None = None) -> httpx.Response:
+        # Devolve a resposta final (200, 304, 404...). Levanta ErroUpstream se 429/5xx/erros
+        # de rede persistirem e CircuitoAberto enquanto a PokeAPI estiver fora.
+        if self._client is None:
+            await self.iniciar()
+        if not self.cache.ligado:
+            return await self._requisitar_upstream(url, headers)
+
+        # cache HTTP em disco: fresco não gasta rede nem rate limit; vencido é revalidado.
+        # Quem manda os próprios validadores (importador --incremental) quer saber se a
+        # PokeAPI mudou: sempre revalida, nunca recebe um 304 tirado só do cache
+        pedido = httpx.Headers(headers or {})
+        proprios = "If-None-Match" in pedido or "If-Modified-Since" in pedido
+        guardada = await asyncio.to_thread(self.cache.obter, url)
+        if guardada is not None and guardada.fresca and not proprios:
+            self.cache.hits += 1
+            return guardada.resposta(headers, "HIT")
+        # 304 só renova a entrada do cache se foi a versão dela que a PokeAPI confirmou
+        revalida_cache = guardada is not None and (not proprios or pedido.get("If-None-Match") == guardada.etag)
+        try:
+            resposta = await self._requisitar_upstream(url, headers if proprios or guardada is None else guardada.validadores())
+        except ErroUpstream:
+            if guardada is None:
+                raise
+            # PokeAPI fora (ou circuito aberto): melhor um payload velho do que um 503
+            self.cache.velhos_servidos += 1
+            return guardada.resposta(headers, "STALE")
+        if revalida_cache and resposta.status_code == 304:
+            await asyncio.to_thread(self.cache.renovar, guardada, resposta.headers)
+            return guardada.resposta(headers, "REVALIDATED")
+        if resposta.status_code == 200:
+            await asyncio.to_thread(self.cache.guardar, url, resposta.content, resposta.headers)
+        return resposta
+
+    async def _requisitar_upstream(self, url: str, headers: dict | None) -> httpx.Response:
+        for tentativa in range(1, self.tentativas + 1):
+            self.circuito.verificar()
+            resposta = None
+            sobrecarga = False
+            concluida = False
+            try:
+                await self._bucket.adquirir()
+                await self._limite.entrar()
+                recurso = recurso_url(url)
+                inicio = time.perf_counter()
+                try:
+                    self.requisicoes += 1
+                    resposta = await self._client.get(url, headers=headers)
+                    sobrecarga = resposta.status_code in STATUS_SOBRECARGA
+                except httpx.RequestError:
+                    sobrecarga = True
+                finally:
+                    await self._limite.sair(sobrecarga)
+                    segundos = time.perf_counter() - inicio
+                    tempo_upstream.observar(segundos, recurso)
+                    requisicoes_upstream.inc(recurso, resposta.status_code if resposta is not None else "erro_rede")
+                    registrar_etapa("pokeapi", segundos)
+                concluida = True
+            finally:
+                if not concluida:
+                    # cancelada (cliente/desligamento) ou erro inesperado (ex: InvalidURL): conta como
+                    # falha, senão a requisição de teste do meio-aberto deixaria o circuito preso
+                    self.circuito.falha()
+
+            if not sobrecarga:
+                self.circuito.sucesso()
+                return resposta
+
+            self.sobrecargas += 1
+            self.circuito.falha()
+            if tentativa < self.tentativas:
+                self.retentativas += 1
+                await asyncio.sleep(self._espera(tentativa, resposta))
+        raise ErroUpstream(f"PokeAPI falhou {self.tentativas} vezes para {url}")
+
+    async def buscar_json(self, url: str) -> dict | None:
+        # None só para 404 (o que vai para o cache negativo); ErroUpstream para qualquer outro
+        # status, inclusive 4xx e 5xx fora dos que são retentados
+        resposta = await self.requisitar(url)
+        if resposta.status_code == 404:
+            return None
+        if resposta.status_code != 200:
+            raise ErroUpstream(f"PokeAPI respondeu {resposta.status_code} para {url}")
+        try:
+            return resposta.json()
+        except ValueError as e:
+            # 200 com corpo truncado ou que não é JSON: mesmo tratamento de um payload sem id/name
+            await self.recusar_payload(url)
+            raise PayloadInvalido(f"Resposta da PokeAPI não é JSON válido para {url}: {e}") from e
+
+    async def recusar_payload(self, url: str) -> None:
+        # o cache em disco não pode continuar servindo o payload recusado
+        if self.cache.ligado:
+            await asyncio.to_thread(self.cache.esquecer, url)
+
+    async def buscar_pokemon(self, identificador: int | str) -> dict | None:
+        url = url_recurso(self.base_url, "pokemon", identificador)
+        dados = await self.buscar_json(url)
+        if dados is not None and not (isinstance(dados, dict) and isinstance(dados.get("id"), int) and isinstance(dados.get("name"), str)):
+            await self.recusar_payload(url)
+            raise PayloadInvalido(f"Resposta da PokeAPI sem id/name para o pokémon {identificador!r}")
+        return dados
+
+    async def buscar_especie(self, identificador: int | str) -> dict | None:
+        return await self.buscar_json(url_recurso(self.base_url, "pokemon-species", identificador))
+
+    async def buscar_cadeia_evolutiva(self, url: str) -> dict | None:
+        return await self.buscar_json(url)
+
+    async def buscar_catalogo(self) -> list[dict]:
+        # nome e url de todos os pokémons, numa requisição só
+        dados = await self.buscar_json(f"{self.base_url}/pokemon?limit=100000")
+        return (dados or {}).get("results", [])
+
+    def estatisticas(self) -> dict:
+        return {
+            "requisicoes": self.requisicoes,
+            "retentativas": self.retentativas,
+            "sobrecargas": self.sobrecargas,
+            "concorrencia_atual": int(self._limite.limite) if self._limite else self.concorrencia,
+            "em_voo": self._limite.em_voo if self._limite else 0,
+            "circuito": self.circuito.estado,
+            "cache_http": self.cache.estatisticas(),
+        }
+
+
+def url_recurso(base_url: str, recurso: str, identificador: int | str) -> str:
+    # o identificador vem do path da requisição: escapado inteiro ("/", "?", "#", controle)
+    return f"{base_url}/{recurso}/{quote(str(identificador), safe='')}"
+
+
+def recurso_url(url: str) -> str:
+    # rótulo das métricas: o recurso da PokeAPI (pokemon, pokemon-species...), nunca o nome ou id
+    partes = [parte for parte in urlsplit(url).path.split("/") if parte]
+    if "v2" in partes[:-1]:
+        return partes[partes.index("v2") + 1]
+    return partes[0] if partes else "/"
+
+
+def extrair_nomes_cadeia(chain_node: dict, nomes: list[str] | None = None) -> list[str]:
+    # Percorre a árvore de evolução e devolve os nomes na ordem em que aparecem
+    if nomes is None:
+        nomes = []
+    nome = chain_node["species"]["name"].lower()
+    if nome not in nomes:
+        nomes.append(nome)
+    for proximo in chain_node["evolves_to"]:
+        extrair_nomes_cadeia(proximo, nomes)
+    return nomes
+
+
+pokeapi = ClientePokeAPI()
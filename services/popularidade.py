@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import Counter
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db.dimensoes import insert_do_dialeto
+from models import PokemonPopularidade
+
+# Contagem de buscas com sucesso por nome em /pokemon/{nome}. A requisição só soma num
+# Counter em memória; de POKEDEX_POPULARIDADE_INTERVALO em POKEDEX_POPULARIDADE_INTERVALO
+# segundos as contagens vão para a tabela pokemon_popularidade (somadas às dos outros
+# workers), de onde o aquecimento da subida tira os POKEDEX_AQUECER_TOP_N mais pedidos.
+POPULARIDADE_INTERVALO = float(os.getenv("POKEDEX_POPULARIDADE_INTERVALO", "60"))
+
+
+class ContadorPopularidade:
+
+    def __init__(self):
+        self._contagens: Counter = Counter()
+        self._lock = threading.Lock()
+        self.registrados = 0
+        self.gravacoes = 0
+
+    def registrar(self, chave: str) -> None:
+        # só memória: pode ser chamado direto do event loop
+        with self._lock:
+            self._contagens[chave] += 1
+            self.registrados += 1
+
+    def gravar(self, db: Session) -> int:
+        # soma o acumulado desde a última gravação às contagens do banco
+        with self._lock:
+            contagens, self._contagens = self._contagens, Counter()
+        if not contagens:
+            return 0
+        consulta = insert_do_dialeto(db, PokemonPopularidade)
+        try:
+            db.execute(
+                consulta.on_conflict_do_update(
+                    index_elements=[PokemonPopularidade.chave],
+                    set_={"acessos": PokemonPopularidade.acessos + consulta.excluded.acessos},
+                ),
+                [{"chave": chave, "acessos": acessos} for chave, acessos in contagens.items()],
+            )
+            db.commit()
+        except Exception:
+            # devolve as contagens para a próxima tentativa
+            db.rollback()
+            with self._lock:
+                self._contagens.update(contagens)
+            raise
+        self.gravacoes += 1
+        return len(contagens)
+
+    def mais_pedidos(self, db: Session, limite: int) -> list[str]:
+        consulta = (
+            select(PokemonPopularidade.chave)
+            .order_by(PokemonPopularidade.acessos.desc(), PokemonPopularidade.chave)
+            .limit(limite)
+        )
+        return list(db.execute(consulta).scalars())
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "registrados": self.registrados,
+                "pendentes": sum(self._contagens.values()),
+                "gravacoes": self.gravacoes,
+            }
+
+
+popularidade = ContadorPopularidade()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+from typing import Awaitable, Callable
+
+# Fila de tarefas em segundo plano da API: o que a requisição não precisa esperar (membros
+# da cadeia evolutiva do pokémon pedido, pokémons populares no aquecimento) entra aqui e
+# roda depois da resposta. Chaves repetidas enquanto a tarefa está na fila ou rodando são
+# ignoradas; POKEDEX_PREFETCH_CONCORRENCIA tarefas rodam ao mesmo tempo e, com a fila
+# cheia, o que chegar é descartado (a próxima busca pelo pokémon agenda de novo).
+PREFETCH_CONCORRENCIA = int(os.getenv("POKEDEX_PREFETCH_CONCORRENCIA", "4"))
+PREFETCH_MAX_PENDENTES = int(os.getenv("POKEDEX_PREFETCH_MAX_PENDENTES", "1000"))
+PREFETCH_ESPERA_PARADA = float(os.getenv("POKEDEX_PREFETCH_ESPERA_PARADA", "5"))  # segundos para esvaziar ao desligar
+
+
+class FilaPrefetch:
+
+    def __init__(self, concorrencia: int = PREFETCH_CONCORRENCIA, max_pendentes: int = PREFETCH_MAX_PENDENTES):
+        self.concorrencia = concorrencia
+        self.max_pendentes = max_pendentes
+        self._fila: asyncio.Queue = asyncio.Queue()
+        self._pendentes: set[str] = set()  # na fila ou rodando
+        self._workers: list[asyncio.Task] = []
+        self.agendadas = 0
+        self.duplicadas = 0
+        self.descartadas = 0
+        self.concluidas = 0
+        self.falhas = 0
+
+    def agendar(self, chave: str, funcao: Callable[[], Awaitable]) -> bool:
+        # só memória: chamado direto do event loop, sem esperar nada
+        if chave in self._pendentes:
+            self.duplicadas += 1
+            return False
+        if len(self._pendentes) >= self.max_pendentes:
+            self.descartadas += 1
+            return False
+        self._pendentes.add(chave)
+        self._fila.put_nowait((chave, funcao))
+        self.agendadas += 1
+        return True
+
+    async def _trabalhar(self) -> None:
+        while True:
+            chave, funcao = await self._fila.get()
+            try:
+                await funcao()
+                self.concluidas += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # a requisição que agendou já respondeu: a falha só vai para o log
+                self.falhas += 1
+                print(f"[Aviso] prefetch de {chave} falhou: {e.__class__.__name__}: {e}")
+            finally:
+                self._pendentes.discard(chave)
+                self._fila.task_done()
+
+    def iniciar(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._trabalhar()) for _ in range(self.concorrencia)]
+
+    async def esperar(self) -> None:
+        # até a fila esvaziar e a última tarefa terminar
+        await self._fila.join()
+
+    async def parar(self, espera: float = PREFETCH_ESPERA_PARADA) -> None:
+        # dá um tempo para o que já foi agendado terminar; o resto é cancelado
+        if self._workers and espera > 0:
+            try:
+                await asyncio.wait_for(self.esperar(), espera)
+            except asyncio.TimeoutError:
+                print(f"[Aviso] prefetch: {len(self._pendentes)} tarefas canceladas ao desligar")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def estatisticas(self) -> dict:
+        return {
+            "pendentes": len(self._pendentes),
+            "concorrencia": self.concorrencia,
+            "agendadas": self.agendadas,
+            "duplicadas": self.duplicadas,
+            "descartadas": self.descartadas,
+            "concluidas": self.concluidas,
+            "falhas": self.falhas,
+        }
+
+
+fila_prefetch = FilaPrefetch()
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from db.database import engine
+from db.documentos import id_da_chave
+
+# Com POKEDEX_ADVISORY_LOCK=1 (e Postgres) a garantia vale entre vários workers do uvicorn
+USAR_ADVISORY_LOCK = os.getenv("POKEDEX_ADVISORY_LOCK", "0") == "1"
+LOCK_INTERVALO = float(os.getenv("POKEDEX_LOCK_INTERVALO", "0.05"))  # segundos entre releituras de quem espera
+LOCK_ESPERA_MAX = float(os.getenv("POKEDEX_LOCK_ESPERA_MAX", "30"))  # depois disso, busca sem esperar o dono do lock
+LOCK_MAX_CONEXOES = int(os.getenv("POKEDEX_LOCK_MAX_CONEXOES", "10"))  # conexões dedicadas por worker
+
+_engine_lock = None
+_conexoes_lock = 0
+
+
+def normalizar_chave(identificador: str) -> str:
+    # "Pikachu ", "pikachu" e "025"/"25" caem na mesma chave
+    chave = identificador.strip().lower()
+    poke_id = id_da_chave(chave)
+    return str(poke_id) if poke_id is not None else chave
+
+
+class SingleFlight:
+    # Garante uma única execução em voo por chave; quem chega enquanto ela roda
+    # espera o mesmo resultado (ou a mesma exceção) em vez de repetir o trabalho.
+
+    def __init__(self):
+        self._em_voo: dict[str, asyncio.Task] = {}
+
+    def iniciar(self, chave: str, funcao: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        # registra a execução na hora (sem await), ou devolve a que já está em voo
+        tarefa = self._em_voo.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(funcao())
+            self._em_voo[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._em_voo.pop(chave, None))
+        return tarefa
+
+    async def executar(self, chave: str, funcao: Callable[[], Awaitable[Any]]) -> Any:
+        # shield: se um cliente desconectar, a busca continua para os outros
+        return await asyncio.shield(self.iniciar(chave, funcao))
+
+    def em_andamento(self, chave: str) -> bool:
+        return chave in self._em_voo
+
+    def em_voo(self) -> int:
+        return len(self._em_voo)
+
+
+def _engine_locks():
+    # conexões dos locks fora do pool da API (NullPool): quem segura o lock durante a busca na
+    # PokeAPI não tira conexão das consultas. Criado só quando o primeiro lock é pedido
+    global _engine_lock
+    if _engine_lock is None:
+        _engine_lock = create_engine(engine.url, poolclass=NullPool)
+    return _engine_lock
+
+
+def _tentar_lock(chave: str):
+    # conexão dedicada com o lock, ou None se outro worker já está com ele
+    conexao = _engine_locks().connect()
+    try:
+        pegou = conexao.execute(text("SELECT pg_try_advisory_lock(hashtext(:chave))"), {"chave": f"pokemon:{chave}"}).scalar()
+    except Exception:
+        conexao.close()
+        raise
+    if not pegou:
+        conexao.close()
+        return None
+    return conexao
+
+
+def _liberar_lock(conexao, chave: str) -> None:
+    # fechar a conexão também solta o lock de sessão, mesmo se o unlock falhar
+    try:
+        conexao.execute(text("SELECT pg_advisory_unlock(hashtext(:chave))"), {"chave": f"pokemon:{chave}"})
+    finally:
+        conexao.close()
+
+
+def _lock_livre(chave: str) -> bool:
+    # consulta rápida numa conexão do pool, devolvida na hora: o lock está sem dono?
+    with engine.connect() as conexao:
+        livre = conexao.execute(text("SELECT pg_try_advisory_lock(hashtext(:chave))"), {"chave": f"pokemon:{chave}"}).scalar()
+        if livre:
+            conexao.execute(text("SELECT pg_advisory_unlock(hashtext(:chave))"), {"chave": f"pokemon:{chave}"})
+    return bool(livre)
+
+
+def locks_ligados() -> bool:
+    return USAR_ADVISORY_LOCK and engine.dialect.name == "postgresql"
+
+
+async def uma_vez_entre_workers(chave: str, reler: Callable[[], Awaitable[tuple[bool, Any]]],
+                                executar: Callable[[], Awaitable[Any]]) -> Any:
+    # Advisory lock do Postgres: só um worker executa (busca na PokeAPI e grava) por chave; os
+    # outros não seguram conexão nenhuma enquanto esperam: a cada LOCK_INTERVALO releem o
+    # banco (reler devolve (pronto, resultado)) e, se o dono sumiu sem gravar, tentam o lock
+    # de novo. Passando de LOCK_ESPERA_MAX, ou sem conexão dedicada livre, executam sem lock:
+    # a gravação já é idempotente, o lock só evita buscas repetidas.
+    global _conexoes_lock
+    if not locks_ligados():
+        return await executar()
+    limite = time.monotonic() + LOCK_ESPERA_MAX
+    while True:
+        if _conexoes_lock >= LOCK_MAX_CONEXOES:
+            return await executar()
+        _conexoes_lock += 1
+        try:
+            conexao = await run_in_threadpool(_tentar_lock, chave)
+        except BaseException:
+            _conexoes_lock -= 1
+            raise
+        if conexao is not None:
+            try:
+                # quem tinha o lock antes pode ter gravado entre a última releitura e agora
+                pronto, resultado = await reler()
+                return resultado if pronto else await executar()
+            finally:
+                _conexoes_lock -= 1
+                await run_in_threadpool(_liberar_lock, conexao, chave)
+        _conexoes_lock -= 1
+        while True:
+            if time.monotonic() >= limite:
+                return await executar()
+            await asyncio.sleep(LOCK_INTERVALO)
+            pronto, resultado = await reler()
+            if pronto:
+                return resultado
+            if await run_in_threadpool(_lock_livre, chave):
+                break
+
+
+buscas_em_voo = SingleFlight()
@@ -0,0 +1,176 @@
+import threading
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Pokemon, PokemonTipo, Tipo, TipoEficacia
+
+# Tabela de eficácia de tipos em memória: uma matriz densa atacante x defensor
+# (18x18 com os tipos atuais) e os tipos de cada pokémon como índices dessa
+# matriz. Os cálculos de dano viram indexação do NumPy, sem consultas ao banco.
+
+
+class TipoDesconhecido(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class _Estado:
+    # trocado inteiro a cada recarga; quem lê pega uma referência e usa sem lock
+    nomes: tuple[str, ...]
+    indices: dict[str, int]
+    # última coluna extra com 1.0: é o "segundo tipo" de quem só tem um
+    matriz: np.ndarray
+    pokemon_ids: np.ndarray
+    pokemon_nomes: tuple[str, ...]
+    pokemon_tipos: np.ndarray  # (n, 2) com índices da matriz
+    posicoes: dict[str, int]  # nome e id -> linha em pokemon_*
+
+
+def _estado_vazio() -> _Estado:
+    return _Estado((), {}, np.ones((0, 1)), np.zeros(0, dtype=np.int64), (), np.zeros((0, 2), dtype=np.int64), {})
+
+
+class MatrizTipos:
+
+    def __init__(self):
+        self._estado = _estado_vazio()
+        self._tipos_por_pokemon: dict[int, tuple[str, list[str]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def carregada(self) -> bool:
+        return len(self._estado.nomes) > 0
+
+    def carregar(self, db: Session) -> None:
+        # tipos que têm alguma relação de dano (ficam de fora "unknown", "shadow"...)
+        linhas = db.execute(
+            select(TipoEficacia.id_atacante, TipoEficacia.id_defensor, TipoEficacia.multiplicador)
+        ).all()
+        usados = {a for a, _, _ in linhas} | {d for _, d, _ in linhas}
+        tipos = db.execute(select(Tipo.id, Tipo.nome).where(Tipo.id.in_(usados)).order_by(Tipo.id)).all() if usados else []
+        posicao_tipo = {tipo_id: i for i, (tipo_id, _) in enumerate(tipos)}
+
+        matriz = np.ones((len(tipos), len(tipos) + 1))
+        if linhas:
+            atacantes = np.array([posicao_tipo[a] for a, _, _ in linhas])
+            defensores = np.array([posicao_tipo[d] for _, d, _ in linhas])
+            matriz[atacantes, defensores] = [m for _, _, m in linhas]
+
+        consulta = (
+            select(PokemonTipo.id_pokemon, Pokemon.nome, Tipo.nome)
+            .join(Pokemon, Pokemon.id == PokemonTipo.id_pokemon)
+            .join(Tipo, Tipo.id == PokemonTipo.id_tipo)
+            .order_by(PokemonTipo.id)
+        )
+        tipos_por_pokemon: dict[int, tuple[str, list[str]]] = {}
+        for poke_id, nome, tipo_nome in db.execute(consulta):
+            tipos_por_pokemon.setdefault(poke_id, (nome, []))[1].append(tipo_nome)
+
+        with self._lock:
+            self._tipos_por_pokemon = tipos_por_pokemon
+            self._publicar(tuple(nome for _, nome in tipos), matriz)
+
+    def registrar_pokemons(self, pokemons: Iterable[tuple[int, str, list[str]]]) -> None:
+        # (id, nome, tipos) de pokémons recém-gravados, no formato de gravar_lote_pokemons
+        pokemons = list(pokemons)
+        if not pokemons:
+            return
+        with self._lock:
+            for poke_id, nome, tipos in pokemons:
+                self._tipos_por_pokemon[poke_id] = (nome, list(tipos))
+            self._publicar(self._estado.nomes, self._estado.matriz)
+
+    def atualizar_pokemons(self, db: Session, ids: list[int]) -> None:
+        # chamado pelo ouvinte de alterações com ids gravados por outro processo
+        consulta = (
+            select(PokemonTipo.id_pokemon, Pokemon.nome, Tipo.nome)
+            .join(Pokemon, Pokemon.id == PokemonTipo.id_pokemon)
+            .join(Tipo, Tipo.id == PokemonTipo.id_tipo)
+            .where(PokemonTipo.id_pokemon.in_(ids))
+            .order_by(PokemonTipo.id)
+        )
+        encontrados: dict[int, tuple[str, list[str]]] = {}
+        for poke_id, nome, tipo_nome in db.execute(consulta):
+            encontrados.setdefault(poke_id, (nome, []))[1].append(tipo_nome)
+        self.registrar_pokemons((poke_id, nome, tipos) for poke_id, (nome, tipos) in encontrados.items())
+
+    def _publicar(self, nomes: tuple[str, ...], matriz: np.ndarray) -> None:
+        indices = {nome: i for i, nome in enumerate(nomes)}
+        neutro = len(nomes)  # coluna de 1.0
+        ids = sorted(self._tipos_por_pokemon)
+        pokemon_tipos = np.full((len(ids), 2), neutro, dtype=np.int64)
+        pokemon_nomes = []
+        posicoes = {}
+        for linha, poke_id in enumerate(ids):
+            nome, tipos = self._tipos_por_pokemon[poke_id]
+            for coluna, tipo in enumerate(tipos[:2]):
+                pokemon_tipos[linha, coluna] = indices.get(tipo, neutro)
+            pokemon_nomes.append(nome)
+            posicoes[nome] = linha
+            posicoes[str(poke_id)] = linha
+        self._estado = _Estado(nomes, indices, matriz, np.array(ids, dtype=np.int64),
+                               tuple(pokemon_nomes), pokemon_tipos, posicoes)
+
+    def _indices(self, estado: _Estado, tipos: Iterable[str]) -> list[int]:
+        tipos = list(dict.fromkeys(tipos))
+        desconhecidos = [t for t in tipos if t not in estado.indices]
+        if desconhecidos:
+            raise TipoDesconhecido(f"Tipos inválidos: {', '.join(desconhecidos)}")
+        return [estado.indices[t] for t in tipos]
+
+    def tipos_do_pokemon(self, chave: str) -> dict | None:
+        estado = self._estado
+        linha = estado.posicoes.get(chave)
+        if linha is None:
+            return None
+        nome, tipos = self._tipos_por_pokemon.get(int(estado.pokemon_ids[linha]), (estado.pokemon_nomes[linha], []))
+        return {"id": int(estado.pokemon_ids[linha]), "nome": nome, "tipos": list(tipos)}
+
+    def defesa(self, tipos: Iterable[str]) -> dict[str, float]:
+        # multiplicador que cada tipo de ataque causa em quem tem esses tipos
+        estado = self._estado
+        colunas = self._indices(estado, tipos)
+        multiplicadores = estado.matriz[:, colunas].prod(axis=1)
+        return dict(zip(estado.nomes, multiplicadores.tolist()))
+
+    def ataque(self, tipos: Iterable[str]) -> dict[str, float]:
+        # melhor multiplicador entre os tipos de ataque contra cada tipo defensor
+        estado = self._estado
+        linhas = self._indices(estado, tipos)
+        multiplicadores = estado.matriz[linhas, :len(estado.nomes)].max(axis=0)
+        return dict(zip(estado.nomes, multiplicadores.tolist()))
+
+    def confronto(self, ataque: Iterable[str], alvos: list[str] | None = None) -> tuple[list[dict], list[str]]:
+        # Um atacante contra vários pokémons (ou a dex inteira quando alvos=None) com
+        # uma indexação só: M[a, tipo1] * M[a, tipo2], pegando o melhor tipo de ataque.
+        # Devolve (resultados na ordem dos alvos, alvos não encontrados).
+        estado = self._estado
+        linhas = self._indices(estado, ataque)
+        if alvos is None:
+            posicoes = np.arange(len(estado.pokemon_ids))
+            nao_encontrados = []
+        else:
+            posicoes = np.array([estado.posicoes[a] for a in alvos if a in estado.posicoes], dtype=np.int64)
+            nao_encontrados = [a for a in alvos if a not in estado.posicoes]
+
+        tipos = estado.pokemon_tipos[posicoes]
+        submatriz = estado.matriz[linhas]
+        multiplicadores = (submatriz[:, tipos[:, 0]] * submatriz[:, tipos[:, 1]]).max(axis=0)
+
+        ids = estado.pokemon_ids[posicoes].tolist()
+        resultados = [
+            {"id": poke_id, "nome": estado.pokemon_nomes[p], "multiplicador": m}
+            for poke_id, p, m in zip(ids, posicoes.tolist(), multiplicadores.tolist())
+        ]
+        return resultados, nao_encontrados
+
+    def estatisticas(self) -> dict:
+        estado = self._estado
+        return {"tipos": len(estado.nomes), "pokemons": len(estado.pokemon_ids)}
+
+
+matriz_tipos = MatrizTipos()